@@ -0,0 +1,270 @@
+import threading
+import time
+import wave
+import numpy as np
+
+# Constantes do PortAudio (iguais a pyaudio.paContinue / pyaudio.paInputOverflow),
+# repetidas aqui para o módulo funcionar sem PyAudio (ex: fonte sintética)
+PA_CONTINUE = 0
+PA_INPUT_OVERFLOW = 0x2
+
+
+class AudioRingBuffer:
+    """
+    Buffer circular pré-alocado de amostras int16.
+    Um produtor (thread de captura) e um consumidor (stream do Google):
+    cada lado só altera o próprio contador, então não há lock nos dados.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._written = 0   # Total escrito (só o produtor altera)
+        self._read = 0      # Total lido (só o consumidor altera)
+        self._data_ready = threading.Event()
+
+        self.overflows = 0          # Escritas descartadas por buffer cheio
+        self.dropped_samples = 0
+        self.underruns = 0          # Leituras que esperaram demais por áudio
+
+    def available(self):
+        return self._written - self._read
+
+    def write(self, data):
+        """Copia um bloco de áudio (bytes ou ndarray int16). Nunca bloqueia."""
+        samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data
+        n = len(samples)
+        if n > self.capacity - self.available():
+            self.overflows += 1
+            self.dropped_samples += n
+            return False
+
+        start = self._written % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self._buf[start:end] = samples
+        else:
+            split = self.capacity - start
+            self._buf[start:] = samples[:split]
+            self._buf[:end - self.capacity] = samples[split:]
+        self._written += n
+        self._data_ready.set()
+        return True
+
+    def read_into(self, out, timeout=None):
+        """
+        Preenche `out` (ndarray int16) com as próximas amostras.
+        Retorna False se o áudio não chegar dentro de `timeout`.
+        """
+        n = len(out)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.available() < n:
+            self._data_ready.clear()
+            if self.available() >= n:
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if (remaining is not None and remaining <= 0) or not self._data_ready.wait(remaining):
+                self.underruns += 1
+                return False
+
+        start = self._read % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out[:] = self._buf[start:end]
+        else:
+            split = self.capacity - start
+            out[:split] = self._buf[start:]
+            out[split:] = self._buf[:end - self.capacity]
+        self._read += n
+        return True
+
+    def read(self, n, timeout=None):
+        out = np.empty(n, dtype=np.int16)
+        if not self.read_into(out, timeout):
+            return None
+        return out.tobytes()
+
+    def clear(self):
+        """Descarta o áudio pendente (chamado pelo consumidor)."""
+        self._read = self._written
+
+
+class AudioCapture:
+    """
+    Captura em tempo real: o callback do PyAudio (thread do PortAudio) só copia
+    o áudio para o AudioRingBuffer, e o stream do Google lê do buffer.
+    Atrasos na rede nunca seguram a leitura do microfone.
+    """
+
+    def __init__(self, rate, channels, chunk, buffer_seconds=10.0):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.period = chunk / rate
+        self.buffer = AudioRingBuffer(int(buffer_seconds * rate) * channels)
+
+        self.driver_overflows = 0   # Overflows reportados pelo PortAudio
+        self.callbacks = 0
+        self._last_callback = None
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def callback(self, in_data, frame_count, time_info, status):
+        """Callback do PyAudio (stream_callback)."""
+        now = time.perf_counter()
+        if self._last_callback is not None:
+            jitter = abs((now - self._last_callback) - frame_count / self.rate)
+            self.jitter_total += jitter
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+        self._last_callback = now
+        self.callbacks += 1
+
+        if status & PA_INPUT_OVERFLOW:
+            self.driver_overflows += 1
+        self.buffer.write(in_data)
+        return None, PA_CONTINUE
+
+    def read(self, timeout=None):
+        """Lê um chunk (bytes) do buffer; None se o áudio atrasar."""
+        if timeout is None:
+            timeout = 2 * self.period
+        return self.buffer.read(self.chunk * self.channels, timeout)
+
+    def buffered_seconds(self):
+        """Áudio esperando no buffer (atraso entre a captura e a leitura)."""
+        return self.buffer.available() / (self.rate * self.channels)
+
+    def average_jitter(self):
+        if self.callbacks < 2:
+            return 0.0
+        return self.jitter_total / (self.callbacks - 1)
+
+    def stats(self):
+        return {
+            'overflows': self.buffer.overflows + self.driver_overflows,
+            'underruns': self.buffer.underruns,
+            'amostras_descartadas': self.buffer.dropped_samples,
+            'jitter_medio': self.average_jitter(),
+            'jitter_max': self.jitter_max,
+        }
+
+
+class SyntheticAudioSource:
+    """
+    Fonte de áudio sintética (senoide + ruído) que chama o callback no mesmo
+    ritmo do PyAudio, numa thread própria. Serve para medir jitter e perdas
+    sem microfone.
+    """
+
+    def __init__(self, capture, frequency=220.0, amplitude=0.2, seed=0):
+        self.capture = capture
+        self._stop = threading.Event()
+        self._thread = None
+        rng = np.random.default_rng(seed)
+        t = np.arange(capture.rate) / capture.rate
+        tone = amplitude * np.sin(2 * np.pi * frequency * t) + 0.01 * rng.standard_normal(capture.rate)
+        mono = (tone * 32767).astype(np.int16)
+        # Um segundo de áudio, repetido em loop
+        self._signal = np.repeat(mono, capture.channels)
+
+    def _run(self):
+        block = self.capture.chunk * self.capture.channels
+        position = 0
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            end = position + block
+            if end <= len(self._signal):
+                data = self._signal[position:end].tobytes()
+            else:
+                data = np.concatenate((self._signal[position:], self._signal[:end - len(self._signal)])).tobytes()
+            position = end % len(self._signal)
+            self.capture.callback(data, self.capture.chunk, None, 0)
+            next_time += self.capture.period
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class WavAudioSource:
+    """
+    Toca um arquivo WAV (16 bits) no callback da captura, no ritmo do
+    microfone (ou `speed` vezes mais rápido). Usado no modo replay.
+    """
+
+    def __init__(self, capture, path, speed=1.0):
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("O WAV precisa ser PCM de 16 bits")
+            if wav.getframerate() != capture.rate or wav.getnchannels() != capture.channels:
+                raise ValueError(
+                    f"O WAV é {wav.getframerate()} Hz/{wav.getnchannels()} canal(is), "
+                    f"mas a captura espera {capture.rate} Hz/{capture.channels}"
+                )
+            self._signal = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        self.capture = capture
+        self.speed = speed
+        self.duration = len(self._signal) / (capture.rate * capture.channels)
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._frames_played = 0
+
+    def position(self):
+        """Segundos de áudio já entregues à captura."""
+        return self._frames_played / self.capture.rate
+
+    def _run(self):
+        block = self.capture.chunk * self.capture.channels
+        period = self.capture.period / self.speed
+        next_time = time.perf_counter()
+        for start in range(0, len(self._signal) - block + 1, block):
+            if self._stop.is_set():
+                break
+            self.capture.callback(self._signal[start:start + block].tobytes(), self.capture.chunk, None, 0)
+            self._frames_played += self.capture.chunk
+            next_time += period
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.finished.set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+if __name__ == '__main__':
+    # Benchmark: captura sintética com um consumidor que trava de vez em quando
+    capture = AudioCapture(rate=16000, channels=1, chunk=160, buffer_seconds=1.0)
+    source = SyntheticAudioSource(capture)
+    source.start()
+
+    chunks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 5.0:
+        if capture.read() is None:
+            continue
+        chunks += 1
+        if chunks % 100 == 0:
+            time.sleep(0.3)   # Simula atraso da rede no stream do Google
+    source.stop()
+
+    stats = capture.stats()
+    print(f"Chunks lidos: {chunks}  Callbacks: {capture.callbacks}")
+    print(f"Overflows: {stats['overflows']}  Underruns: {stats['underruns']}")
+    print(f"Jitter médio: {stats['jitter_medio']*1000:.3f}ms  máx: {stats['jitter_max']*1000:.3f}ms")
@@ -0,0 +1,235 @@
+"""
+Compressão do áudio enviado ao Google: FLAC (sem perdas) ou OGG_OPUS no
+lugar de LINEAR16, para dividir o uplink da igreja com a transmissão ao vivo.
+
+Cada stream do Google precisa do cabeçalho do codec no começo, então cada
+stream (inclusive os abertos na troca) ganha o seu codificador. A
+codificação roda numa thread própria: a captura e o loop asyncio nunca
+esperam pelo codec.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Nome do codec (AUDIO_ENCODING) → RecognitionConfig.AudioEncoding do Google
+GOOGLE_ENCODINGS = {
+    'linear16': "LINEAR16",
+    'flac': "FLAC",
+    'ogg_opus': "OGG_OPUS",
+}
+# sndfile.h: tempo máximo de áudio numa página OGG (o padrão de 1 s atrasaria os finais)
+SFC_SET_OGG_PAGE_LATENCY_MS = 0x1302
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class _StreamSink:
+    """
+    "Arquivo" para o libsndfile que só guarda os bytes novos. Ao fechar, o
+    FLAC volta ao início para reescrever o cabeçalho; esses bytes já foram
+    enviados e são ignorados.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self._end = 0
+
+    def write(self, data):
+        if self._position == self._end:
+            self._chunks.append(bytes(data))
+            self._end += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self._position = offset
+        elif whence == 1:
+            self._position += offset
+        else:
+            self._position = self._end + offset
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def read(self, size=-1):
+        return b""
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class StreamEncoder:
+    """Codificador de um stream: chunks int16 entram, bytes do codec saem."""
+
+    def __init__(self, codec, rate, channels, stats, page_ms=20):
+        import soundfile
+
+        self.stats = stats
+        self.rate = rate
+        self.channels = channels
+        self._sink = _StreamSink()
+        if codec == "flac":
+            self._file = soundfile.SoundFile(self._sink, "w", rate, channels, format="FLAC", subtype="PCM_16")
+        else:
+            self._file = soundfile.SoundFile(self._sink, "w", rate, channels, format="OGG", subtype="OPUS")
+            latency = soundfile._ffi.new("double*", float(page_ms))
+            soundfile._snd.sf_command(self._file._file, SFC_SET_OGG_PAGE_LATENCY_MS,
+                                      latency, soundfile._ffi.sizeof("double"))
+        # Posição (segundos de áudio) do fim de cada chunk que ainda não saiu codificado
+        self._waiting = deque()
+        self._position = 0.0
+
+    def encode(self, chunk):
+        """Retorna os bytes prontos (pode ser vazio: o codec ainda está juntando um quadro)."""
+        start = time.perf_counter()
+        self._position += len(chunk) / (2 * self.channels * self.rate)
+        self._waiting.append(self._position)
+        self._file.buffer_write(chunk, dtype="int16")
+        data = self._sink.take()
+        elapsed = time.perf_counter() - start
+
+        self.stats['chunks'] += 1
+        self.stats['bytes_entrada'] += len(chunk)
+        self.stats['bytes_saida'] += len(data)
+        self.stats['audio'] += len(chunk) / (2 * self.channels * self.rate)
+        self.stats['tempo'] += elapsed
+        if data:
+            # Atraso de cada chunk: o áudio que chegou depois dele enquanto
+            # esperava dentro do codec (no ritmo real, é tempo de parede) + a CPU
+            while self._waiting:
+                self.stats['atraso_total'] += self._position - self._waiting.popleft() + elapsed
+                self.stats['atrasos'] += 1
+        return data
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+
+class AudioEncoder:
+    """
+    Cria um StreamEncoder por stream e codifica numa thread dedicada.
+    As estatísticas somam todos os streams da sessão.
+    """
+
+    def __init__(self, codec, rate, channels=1, page_ms=20):
+        self.codec = codec
+        self.google_encoding = GOOGLE_ENCODINGS[codec]
+        self.rate = rate
+        self.channels = channels
+        self.page_ms = page_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="codificacao")
+
+        self.stats = {
+            'chunks': 0,
+            'bytes_entrada': 0,
+            'bytes_saida': 0,
+            'audio': 0.0,           # Segundos de áudio codificados
+            'tempo': 0.0,           # CPU gasta codificando
+            'atraso_total': 0.0,    # Espera dos chunks dentro do codec
+            'atrasos': 0,
+        }
+
+    def new_stream(self):
+        return StreamEncoder(self.codec, self.rate, self.channels, self.stats, self.page_ms)
+
+    async def encode(self, encoder, chunk):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, encoder.encode, chunk)
+
+    def bytes_per_minute(self):
+        if not self.stats['audio']:
+            return 0.0
+        return self.stats['bytes_saida'] / self.stats['audio'] * 60
+
+    def compression_ratio(self):
+        """Bytes enviados por byte de LINEAR16."""
+        if not self.stats['bytes_entrada']:
+            return 1.0
+        return self.stats['bytes_saida'] / self.stats['bytes_entrada']
+
+    def average_delay(self):
+        if not self.stats['atrasos']:
+            return 0.0
+        return self.stats['atraso_total'] / self.stats['atrasos']
+
+    def average_encode_time(self):
+        if not self.stats['chunks']:
+            return 0.0
+        return self.stats['tempo'] / self.stats['chunks']
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def create_audio_encoder(codec, rate, channels=1):
+    """
+    None para "linear16" (áudio sem compressão, como antes). Volta para
+    LINEAR16 se o soundfile não estiver instalado ou o codec não servir.
+    """
+    codec = codec.lower()
+    if codec == "linear16":
+        return None
+    if codec not in GOOGLE_ENCODINGS:
+        print(f"[AVISO] AUDIO_ENCODING '{codec}' desconhecido; usando LINEAR16")
+        return None
+    try:
+        import soundfile
+    except ImportError as e:
+        print(f"[AVISO] Compressão de áudio indisponível ({e}); usando LINEAR16")
+        return None
+    if codec == "ogg_opus" and ("OPUS" not in soundfile.available_subtypes("OGG") or rate not in OPUS_RATES):
+        print(f"[AVISO] OGG_OPUS indisponível a {rate} Hz nesta instalação; usando FLAC")
+        codec = "flac"
+    return AudioEncoder(codec, rate, channels)
+
+
+if __name__ == '__main__':
+    # LINEAR16, FLAC e OGG_OPUS lado a lado: bytes por minuto enviados ao
+    # Google e atraso que o codec acrescenta (chunks de 100 ms)
+    #   python audio_encoding.py [gravacao.wav]
+    import sys
+    import wave
+
+    import numpy as np
+
+    if len(sys.argv) > 1:
+        with wave.open(sys.argv[1], "rb") as wav:
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            audio = wav.readframes(min(wav.getnframes(), rate * 60))
+    else:
+        # Sinal parecido com fala: harmônicos com sílabas (envelope) e ruído de sala
+        rate, channels = 16000, 1
+        rng = np.random.default_rng(0)
+        t = np.arange(rate * 20) / rate
+        pitch = 2 * np.pi * np.cumsum(140 + 30 * np.sin(2 * np.pi * 0.7 * t)) / rate
+        voice = sum(np.sin(k * pitch) / k for k in range(1, 12))
+        envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+        signal = 0.15 * voice * envelope + 0.003 * rng.standard_normal(len(t))
+        audio = (signal * 32767).astype(np.int16).tobytes()
+
+    chunk_bytes = rate // 10 * channels * 2
+    seconds = len(audio) / (2 * channels * rate)
+    print(f"{seconds:.0f}s de áudio, {rate} Hz, {channels} canal(is)")
+    print(f"  {'LINEAR16':<9} {len(audio) / seconds * 60 / 1024:7.0f} KB/min  100%  atraso    0ms")
+
+    async def measure(codec):
+        encoder = AudioEncoder(codec, rate, channels)
+        stream = encoder.new_stream()
+        for position in range(0, len(audio), chunk_bytes):
+            await encoder.encode(stream, audio[position:position + chunk_bytes])
+        stream.close()
+        encoder.close()
+        print(f"  {codec.upper():<9} {encoder.bytes_per_minute() / 1024:7.0f} KB/min  "
+              f"{encoder.compression_ratio() * 100:3.0f}%  atraso {encoder.average_delay() * 1000:4.0f}ms  "
+              f"(CPU {encoder.average_encode_time() * 1e6:.0f}µs por chunk)")
+
+    for codec in ("flac", "ogg_opus"):
+        asyncio.run(measure(codec))
@@ -0,0 +1,105 @@
+import math
+import numpy as np
+
+FULL_SCALE = 32768.0
+
+
+class LevelMeter:
+    """
+    Medidor de nível (RMS, pico e dBFS) para chunks int16.
+    Usa um buffer int64 pré-alocado e produto escalar inteiro, então não
+    aloca arrays novos a cada chunk. A soma dos quadrados é exata.
+    """
+
+    def __init__(self, max_samples):
+        self._wide = np.empty(max_samples, dtype=np.int64)
+        self.rms_value = 0.0
+        self.peak_value = 0.0
+
+    def _load(self, data):
+        samples = np.frombuffer(data, dtype=np.int16) if isinstance(data, (bytes, bytearray)) else data
+        n = len(samples)
+        if n > len(self._wide):
+            self._wide = np.empty(n, dtype=np.int64)
+        wide = self._wide[:n]
+        np.copyto(wide, samples)
+        return wide
+
+    def measure(self, data):
+        """Calcula RMS e pico (0.0 a 1.0) de um chunk. Retorna o RMS."""
+        wide = self._load(data)
+        n = len(wide)
+        if not n:
+            self.rms_value = self.peak_value = 0.0
+            return 0.0
+        sum_squares = int(np.dot(wide, wide))
+        self.rms_value = math.sqrt(sum_squares / n) / FULL_SCALE
+        self.peak_value = max(int(wide.max()), -int(wide.min())) / FULL_SCALE
+        return self.rms_value
+
+    def rms(self, data):
+        """Só o RMS (0.0 a 1.0), como o limiar SILENCE_THRESHOLD espera."""
+        wide = self._load(data)
+        if not len(wide):
+            return 0.0
+        return math.sqrt(int(np.dot(wide, wide)) / len(wide)) / FULL_SCALE
+
+    def dbfs(self):
+        return to_dbfs(self.rms_value)
+
+
+def to_dbfs(level):
+    return 20.0 * math.log10(level) if level > 0 else float("-inf")
+
+
+def block_levels(samples, block):
+    """
+    Níveis de vários chunks de uma vez (arquivos gravados).
+    Retorna (rms, pico) por bloco de `block` amostras; sobras no final são ignoradas.
+    """
+    samples = np.frombuffer(samples, dtype=np.int16) if isinstance(samples, (bytes, bytearray)) else samples
+    count = len(samples) // block
+    blocks = samples[:count * block].reshape(count, block).astype(np.int64)
+    sum_squares = np.einsum("ij,ij->i", blocks, blocks)
+    rms = np.sqrt(sum_squares / block) / FULL_SCALE
+    peak = np.maximum(blocks.max(axis=1), -blocks.min(axis=1)) / FULL_SCALE
+    return rms, peak
+
+
+if __name__ == '__main__':
+    # Microbenchmark contra o cálculo antigo de audio_generator + checagem exata
+    import timeit
+
+    chunk = 1600
+    rng = np.random.default_rng(0)
+    chunks = [rng.integers(-32768, 32768, chunk, dtype=np.int16).tobytes() for _ in range(200)]
+    chunks.append(np.full(chunk, -32768, dtype=np.int16).tobytes())
+    chunks.append(np.zeros(chunk, dtype=np.int16).tobytes())
+    meter = LevelMeter(chunk)
+
+    def legacy(data):
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+        return np.sqrt(np.mean(samples**2)) / 32768.0
+
+    def reference(data):
+        # Quadrados de int16 somados em float64 são exatos (< 2^53)
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float64)
+        return math.sqrt(float(np.sum(samples * samples)) / len(samples)) / FULL_SCALE
+
+    exact = all(meter.rms(c) == reference(c) for c in chunks)
+    legacy_diff = max(abs(float(legacy(c)) - meter.rms(c)) for c in chunks)
+    joined = b"".join(chunks)
+    rms_blocks, _ = block_levels(joined, chunk)
+    blocks_exact = all(rms_blocks[i] == reference(c) for i, c in enumerate(chunks))
+    failures = (not exact) + (not blocks_exact)
+
+    n = 20000
+    t_legacy = timeit.timeit(lambda: legacy(chunks[0]), number=n) / n
+    t_meter = timeit.timeit(lambda: meter.rms(chunks[0]), number=n) / n
+    t_blocks = timeit.timeit(lambda: block_levels(joined, chunk), number=200) / 200 / len(chunks)
+
+    print(f"Igual à referência exata: {exact}  (blocos: {blocks_exact})")
+    print(f"Diferença máx. para o cálculo antigo (float32): {legacy_diff:.2e}")
+    print(f"Antigo: {t_legacy*1e6:.1f}us/chunk  LevelMeter: {t_meter*1e6:.1f}us/chunk  "
+          f"block_levels: {t_blocks*1e6:.1f}us/chunk")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,344 @@
+"""
+Pré-processamento do áudio entre a captura e o reconhecimento:
+
+    downmix para mono → reamostragem polifásica (16 kHz) → passa-altas → ganho
+
+Mesas de som costumam entregar estéreo a 44.1/48 kHz, 3 a 6 vezes mais dados
+do que o reconhecimento precisa. Cada etapa guarda o próprio estado entre os
+chunks (histórico do filtro, última amostra, nível), então o resultado em
+pedaços é igual ao do sinal inteiro. Tudo vetorizado em NumPy, com buffers
+pré-alocados (crescem só se chegar um chunk maior).
+"""
+import math
+import time
+
+import numpy as np
+
+FULL_SCALE = 32768.0
+
+
+class PolyphaseResampler:
+    """
+    Reamostragem racional (up/down) com um FIR passa-baixas (sinc janelado
+    com Kaiser) dividido em `up` fases: cada amostra de saída usa só os
+    `taps` coeficientes da sua fase, sem inserir zeros.
+    """
+
+    def __init__(self, in_rate, out_rate, zero_crossings=12, rolloff=0.92, beta=8.6):
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        # Coeficientes por fase (em amostras de entrada)
+        self.taps = 2 * zero_crossings * max(1, -(-self.down // self.up))
+        length = self.up * self.taps
+        cutoff = rolloff * 0.5 / max(self.up, self.down)   # Ciclos por amostra na taxa intermediária
+        m = np.arange(length) - (length - 1) / 2.0
+        h = 2 * cutoff * np.sinc(2 * cutoff * m) * np.kaiser(length, beta) * self.up
+        # bank[p] = h[p], h[p+up], h[p+2up]... invertido, para multiplicar a janela em ordem crescente
+        self.bank = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self.delay = (length - 1) / 2.0 / self.up   # Atraso do filtro (amostras de entrada)
+
+        self._history = self.taps - 1
+        self._consumed = 0      # Amostras de entrada já recebidas
+        self._produced = 0      # Amostras de saída já geradas
+        self._ext = np.zeros(0, dtype=np.float32)
+        self._allocate(0)
+
+    def _allocate(self, n_in):
+        """Buffers para chunks de até `n_in` amostras de entrada."""
+        old = self._ext
+        self._ext = np.zeros(self._history + n_in, dtype=np.float32)
+        if len(old):
+            self._ext[:self._history] = old[:self._history]
+        n_out = n_in * self.up // self.down + 2
+        self._ramp = np.arange(n_out, dtype=np.int64)
+        self._index = np.empty(n_out, dtype=np.int64)
+        self._phase = np.empty(n_out, dtype=np.int64)
+        self._windows = np.empty((n_out, self.taps), dtype=np.float32)
+        self._coefs = np.empty((n_out, self.taps), dtype=np.float32)
+        self._out = np.empty(n_out, dtype=np.float32)
+
+    def input_buffer(self, n_in):
+        """Área onde o próximo chunk (float32, mono) deve ser escrito."""
+        if self._history + n_in > len(self._ext):
+            self._allocate(n_in)
+        return self._ext[self._history:self._history + n_in]
+
+    def process(self, n_in):
+        """Reamostra as `n_in` amostras escritas em input_buffer(). Retorna uma view da saída."""
+        total = self._consumed + n_in
+        stop = -(-total * self.up // self.down)     # Saídas cujo instante já tem entrada
+        count = stop - self._produced
+        index = self._index[:count]
+        phase = self._phase[:count]
+        np.add(self._ramp[:count], self._produced, out=index)
+        np.multiply(index, self.down, out=index)
+        np.remainder(index, self.up, out=phase)
+        np.floor_divide(index, self.up, out=index)
+        # Posição da janela no buffer: [histórico | chunk] começa em consumed - (taps - 1)
+        np.subtract(index, self._consumed, out=index)
+
+        windows = np.lib.stride_tricks.sliding_window_view(self._ext[:self._history + n_in], self.taps)
+        np.take(windows, index, axis=0, out=self._windows[:count])
+        np.take(self.bank, phase, axis=0, out=self._coefs[:count])
+        out = self._out[:count]
+        np.einsum('ij,ij->i', self._windows[:count], self._coefs[:count], out=out)
+
+        self._ext[:self._history] = self._ext[n_in:n_in + self._history]
+        self._consumed = total
+        self._produced = stop
+        return out
+
+
+class HighPassFilter:
+    """
+    Passa-altas de 1ª ordem (remove DC e ronco de palco):
+        y[n] = a·y[n-1] + b·(x[n] - x[n-1])
+    A recursão é resolvida em blocos com potências de `a` pré-calculadas
+    (soma acumulada em vez de laço Python), com estado entre os chunks.
+    """
+
+    def __init__(self, rate, cutoff=80.0):
+        self.a = math.exp(-2 * math.pi * cutoff / rate)
+        self.b = (1 + self.a) / 2
+        # Blocos curtos o bastante para a^-n não perder precisão (a^-n <= e^27)
+        self.block = max(16, min(512, int(27.0 / -math.log(self.a))))
+        k = np.arange(self.block, dtype=np.float64)
+        self._powers = self.a ** k              # a^j
+        self._inverse = self.a ** -k            # a^-k
+        self._work = np.empty(self.block, dtype=np.float64)
+        self._x_prev = 0.0
+        self._y_prev = 0.0
+
+    def process(self, samples):
+        """Filtra `samples` (float32) no lugar."""
+        work = self._work
+        for start in range(0, len(samples), self.block):
+            x = samples[start:start + self.block]
+            n = len(x)
+            d = work[:n]
+            d[0] = x[0] - self._x_prev
+            np.subtract(x[1:], x[:-1], out=d[1:])
+            self._x_prev = float(x[-1])
+            np.multiply(d, self._inverse[:n], out=d)
+            np.cumsum(d, out=d)
+            d *= self.b
+            d += self.a * self._y_prev
+            np.multiply(d, self._powers[:n], out=d)
+            self._y_prev = float(d[-1])
+            x[:] = d
+        return samples
+
+
+class GainNormalizer:
+    """
+    Leva o nível da fala para perto de `target_dbfs`, com no máximo
+    `max_gain_db` de ganho. O nível só é atualizado em chunks acima de
+    `gate_dbfs` (o silêncio não faz o ganho subir) e o ganho muda em rampa
+    dentro do chunk, sem estalos.
+    """
+
+    def __init__(self, rate, target_dbfs=-20.0, max_gain_db=6.0, gate_dbfs=-50.0,
+                 attack=0.3, release=3.0):
+        self.rate = rate
+        self.target = 10 ** (target_dbfs / 20)
+        self.max_gain = 10 ** (max_gain_db / 20)
+        self.min_gain = 0.1
+        self.gate = 10 ** (gate_dbfs / 20)
+        self.attack = attack
+        self.release = release
+        self.level = self.target
+        self.gain = 1.0
+        self._steps = np.zeros(0, dtype=np.float32)
+        self._ramp = np.zeros(0, dtype=np.float32)
+
+    def process(self, samples):
+        """Aplica o ganho em `samples` (float32, -1 a 1) no lugar."""
+        n = len(samples)
+        if not n:
+            return samples
+        if n > len(self._steps):
+            self._steps = np.arange(1, n + 1, dtype=np.float32)
+            self._ramp = np.empty(n, dtype=np.float32)
+        rms = math.sqrt(float(np.dot(samples, samples)) / n)
+        if rms > self.gate:
+            seconds = n / self.rate
+            tau = self.attack if rms > self.level else self.release
+            self.level += (rms - self.level) * (1 - math.exp(-seconds / tau))
+        gain = min(self.max_gain, max(self.min_gain, self.target / max(self.level, 1e-9)))
+        ramp = self._ramp[:n]
+        np.multiply(self._steps[:n], (gain - self.gain) / n, out=ramp)
+        ramp += self.gain
+        samples *= ramp
+        self.gain = gain
+        return samples
+
+
+class AudioPreprocessor:
+    """
+    Recebe chunks int16 intercalados (`in_channels`, `in_rate`) e devolve
+    chunks int16 mono em `out_rate`. `highpass_hz` = 0 desliga o passa-altas
+    e `max_gain_db` = 0 desliga a normalização de ganho.
+    """
+
+    def __init__(self, in_rate, in_channels, out_rate=16000, highpass_hz=80.0,
+                 target_dbfs=-20.0, max_gain_db=6.0):
+        self.in_rate = in_rate
+        self.in_channels = in_channels
+        self.out_rate = out_rate
+        self.resampler = PolyphaseResampler(in_rate, out_rate) if in_rate != out_rate else None
+        self.highpass = HighPassFilter(out_rate, highpass_hz) if highpass_hz else None
+        self.gain = GainNormalizer(out_rate, target_dbfs, max_gain_db) if max_gain_db else None
+        self._mono = np.zeros(0, dtype=np.float32)
+        self._out = np.zeros(0, dtype=np.int16)
+
+        self.stats = {
+            'bytes_entrada': 0,
+            'bytes_saida': 0,
+            'tempo': 0.0,
+            'audio': 0.0,           # Segundos de áudio processados
+        }
+
+    def _buffer(self, name, n, dtype):
+        buffer = getattr(self, name)
+        if n > len(buffer):
+            buffer = np.zeros(n, dtype=dtype)
+            setattr(self, name, buffer)
+        return buffer[:n]
+
+    def process(self, data):
+        """Chunk (bytes) → chunk pré-processado (bytes)."""
+        start = time.perf_counter()
+        samples = np.frombuffer(data, dtype=np.int16)
+        frames = len(samples) // self.in_channels
+        samples = samples[:frames * self.in_channels]
+
+        # Downmix direto para o buffer de entrada do reamostrador
+        mono = self.resampler.input_buffer(frames) if self.resampler else self._buffer('_mono', frames, np.float32)
+        if self.in_channels > 1:
+            np.mean(samples.reshape(frames, self.in_channels), axis=1, dtype=np.float32, out=mono)
+            mono *= 1.0 / FULL_SCALE
+        else:
+            np.multiply(samples, 1.0 / FULL_SCALE, out=mono)
+
+        out = self.resampler.process(frames) if self.resampler else mono
+        if self.highpass is not None:
+            self.highpass.process(out)
+        if self.gain is not None:
+            self.gain.process(out)
+
+        out *= FULL_SCALE
+        np.clip(out, -FULL_SCALE, FULL_SCALE - 1, out=out)
+        result = self._buffer('_out', len(out), np.int16)
+        np.rint(out, out=out)
+        result[:] = out
+        encoded = result.tobytes()
+
+        self.stats['bytes_entrada'] += len(data)
+        self.stats['bytes_saida'] += len(encoded)
+        self.stats['tempo'] += time.perf_counter() - start
+        self.stats['audio'] += frames / self.in_rate
+        return encoded
+
+    def bandwidth_ratio(self):
+        """Bytes de saída por byte de entrada."""
+        if not self.stats['bytes_entrada']:
+            return 1.0
+        return self.stats['bytes_saida'] / self.stats['bytes_entrada']
+
+    def real_time_factor(self):
+        if not self.stats['audio']:
+            return 0.0
+        return self.stats['tempo'] / self.stats['audio']
+
+
+def create_preprocessor(in_rate, in_channels, out_rate, highpass_hz=80.0, target_dbfs=-20.0, max_gain_db=6.0):
+    """None se `out_rate` = 0 (áudio vai como chega da placa)."""
+    if not out_rate:
+        return None
+    return AudioPreprocessor(in_rate, in_channels, out_rate, highpass_hz, target_dbfs, max_gain_db)
+
+
+if __name__ == '__main__':
+    # Conferências contra sinais de referência e vazão (tempo real = 1x)
+    def tone(frequency, rate, seconds, amplitude=0.5, channels=1, dc=0.0):
+        t = np.arange(int(rate * seconds)) / rate
+        signal = amplitude * np.sin(2 * np.pi * frequency * t) + dc
+        return np.repeat((signal * 32767).astype(np.int16), channels).tobytes()
+
+    def run_chunks(pre, data, frames):
+        size = frames * pre.in_channels * 2
+        return np.frombuffer(b"".join(pre.process(data[i:i + size]) for i in range(0, len(data), size)),
+                             dtype=np.int16).astype(np.float64) / FULL_SCALE
+
+    def sine_snr(signal, frequency, rate):
+        """SNR (dB) do melhor ajuste de uma senoide na frequência esperada."""
+        t = np.arange(len(signal)) / rate
+        basis = np.stack([np.sin(2 * np.pi * frequency * t), np.cos(2 * np.pi * frequency * t)], axis=1)
+        coef, *_ = np.linalg.lstsq(basis, signal, rcond=None)
+        fit = basis @ coef
+        return 10 * np.log10(np.sum(fit ** 2) / np.sum((signal - fit) ** 2))
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    results = []
+    print("Referências:")
+    for in_rate, channels in ((48000, 2), (44100, 2), (16000, 1)):
+        pre = AudioPreprocessor(in_rate, channels, 16000, highpass_hz=0, max_gain_db=0)
+        out = run_chunks(pre, tone(1000, in_rate, 2.0, channels=channels), in_rate // 10)[1600:]
+        snr = sine_snr(out, 1000, 16000)
+        results.append(check(f"senoide 1 kHz, {in_rate} Hz/{channels} canal(is) → 16 kHz", snr > 60, f"SNR {snr:.1f} dB"))
+    for in_rate in (48000, 44100):
+        pre = AudioPreprocessor(in_rate, 1, 16000, highpass_hz=0, max_gain_db=0)
+        out = run_chunks(pre, tone(11000, in_rate, 1.0), in_rate // 10)[1600:]
+        rejection = 20 * np.log10(np.sqrt(np.mean(out ** 2)) / (0.5 / np.sqrt(2)) + 1e-12)
+        results.append(check(f"rejeição de alias (11 kHz a {in_rate} Hz)", rejection < -50, f"{rejection:.1f} dB"))
+
+    data = tone(300, 44100, 3.0, amplitude=0.3, channels=2)
+    # O ganho é decidido por chunk; reamostragem e passa-altas têm de bater exatamente
+    whole = run_chunks(AudioPreprocessor(44100, 2, 16000, max_gain_db=0), data, 44100 * 3)
+    rng = np.random.default_rng(0)
+    pre = AudioPreprocessor(44100, 2, 16000, max_gain_db=0)
+    parts, position = [], 0
+    while position < len(data):
+        size = int(rng.integers(1, 3000)) * 4
+        parts.append(pre.process(data[position:position + size]))
+        position += size
+    chunked = np.frombuffer(b"".join(parts), dtype=np.int16).astype(np.float64) / FULL_SCALE
+    difference = np.max(np.abs(whole[:len(chunked)] - chunked)) * FULL_SCALE
+    results.append(check("chunks de tamanho aleatório = sinal inteiro", len(whole) == len(chunked) and difference <= 1,
+                         f"{len(chunked)} amostras, diferença máx. {difference:.0f} LSB"))
+
+    pre = AudioPreprocessor(16000, 1, 16000, highpass_hz=80, max_gain_db=0)
+    out = run_chunks(pre, tone(1000, 16000, 2.0, amplitude=0.3, dc=0.2), 1600)[16000:]
+    results.append(check("remoção de DC (offset 0.2)", abs(out.mean()) < 1e-3, f"média {out.mean():.5f}"))
+
+    x = rng.standard_normal(5000).astype(np.float32) * 0.1
+    highpass = HighPassFilter(16000, 80.0)
+    y = highpass.process(x.copy())
+    reference, x_prev, y_prev = np.empty_like(x), 0.0, 0.0
+    for i, sample in enumerate(x):
+        y_prev = highpass.a * y_prev + highpass.b * (float(sample) - x_prev)
+        x_prev = float(sample)
+        reference[i] = y_prev
+    error = np.max(np.abs(y - reference))
+    results.append(check("passa-altas em blocos = recursão amostra a amostra", error < 1e-5, f"erro máx. {error:.1e}"))
+
+    pre = AudioPreprocessor(16000, 1, 16000, highpass_hz=80, target_dbfs=-20, max_gain_db=12)
+    out = run_chunks(pre, tone(300, 16000, 10.0, amplitude=0.02 * np.sqrt(2)), 1600)[-16000:]
+    level = 20 * np.log10(np.sqrt(np.mean(out ** 2)))
+    results.append(check("normalização de ganho (-34 dBFS, alvo -20, máx. +12 dB)", abs(level + 22) < 1,
+                         f"saída {level:.1f} dBFS"))
+
+    print("Vazão (chunks de 100 ms):")
+    for in_rate, channels in ((48000, 2), (44100, 2), (48000, 1), (16000, 1)):
+        pre = AudioPreprocessor(in_rate, channels, 16000)
+        data = tone(440, in_rate, 30.0, amplitude=0.2, channels=channels)
+        run_chunks(pre, data, in_rate // 10)
+        print(f"  {in_rate} Hz/{channels} canal(is): {1 / pre.real_time_factor():.0f}x tempo real, "
+              f"{pre.stats['tempo'] / (pre.stats['audio'] * 10) * 1e6:.0f}µs por chunk, "
+              f"banda {pre.bandwidth_ratio() * 100:.0f}% da original")
+    print("Tudo certo." if all(results) else "Há conferências com falha.")
+    raise SystemExit(0 if all(results) else 1)
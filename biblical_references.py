@@ -0,0 +1,545 @@
+"""
+Normalização de referências bíblicas, compilada uma única vez na importação.
+Antes da tradução: "First Corinthians thirteen verses four to seven" → "1 Corinthians 13:4-7"
+Depois da tradução: "1 Corinthians 13:4-7" → "1 Coríntios 13:4-7"
+"""
+import re
+
+# Nome em inglês (como o Google transcreve) → nome canônico
+BOOK_ALIASES = {
+    'genesis': 'Genesis', 'exodus': 'Exodus', 'leviticus': 'Leviticus',
+    'numbers': 'Numbers', 'number': 'Numbers', 'deuteronomy': 'Deuteronomy',
+    'joshua': 'Joshua', 'judges': 'Judges', 'ruth': 'Ruth', 'samuel': 'Samuel',
+    'kings': 'Kings', 'chronicles': 'Chronicles', 'ezra': 'Ezra',
+    'nehemiah': 'Nehemiah', 'esther': 'Esther', 'job': 'Job',
+    'psalms': 'Psalms', 'psalm': 'Psalms', 'proverbs': 'Proverbs',
+    'ecclesiastes': 'Ecclesiastes', 'song of solomon': 'Song of Solomon',
+    'song of songs': 'Song of Solomon', 'isaiah': 'Isaiah', 'jeremiah': 'Jeremiah',
+    'lamentations': 'Lamentations', 'ezekiel': 'Ezekiel', 'daniel': 'Daniel',
+    'hosea': 'Hosea', 'joel': 'Joel', 'amos': 'Amos', 'obadiah': 'Obadiah',
+    'jonah': 'Jonah', 'micah': 'Micah', 'nahum': 'Nahum', 'habakkuk': 'Habakkuk',
+    'zephaniah': 'Zephaniah', 'haggai': 'Haggai', 'zechariah': 'Zechariah',
+    'malachi': 'Malachi', 'matthew': 'Matthew', 'mark': 'Mark', 'luke': 'Luke',
+    'john': 'John', 'acts': 'Acts', 'romans': 'Romans', 'corinthians': 'Corinthians',
+    'galatians': 'Galatians', 'ephesians': 'Ephesians', 'philippians': 'Philippians',
+    'colossians': 'Colossians', 'thessalonians': 'Thessalonians', 'timothy': 'Timothy',
+    'titus': 'Titus', 'philemon': 'Philemon', 'hebrews': 'Hebrews', 'james': 'James',
+    'peter': 'Peter', 'jude': 'Jude', 'revelation': 'Revelation', 'revelations': 'Revelation',
+}
+
+# Livros que aceitam número na frente (1 Samuel, 2 Kings, 3 John...)
+NUMBERED_BOOKS = {
+    'Samuel', 'Kings', 'Chronicles', 'Corinthians', 'Thessalonians',
+    'Timothy', 'Peter', 'John',
+}
+
+# Nome canônico em inglês → português
+BOOK_TRANSLATIONS = {
+    'Genesis': 'Gênesis', 'Exodus': 'Êxodo', 'Leviticus': 'Levítico',
+    'Numbers': 'Números', 'Deuteronomy': 'Deuteronômio', 'Joshua': 'Josué',
+    'Judges': 'Juízes', 'Ruth': 'Rute', 'Samuel': 'Samuel', 'Kings': 'Reis',
+    'Chronicles': 'Crônicas', 'Ezra': 'Esdras', 'Nehemiah': 'Neemias',
+    'Esther': 'Ester', 'Job': 'Jó', 'Psalms': 'Salmos', 'Proverbs': 'Provérbios',
+    'Ecclesiastes': 'Eclesiastes', 'Song of Solomon': 'Cânticos', 'Isaiah': 'Isaías',
+    'Jeremiah': 'Jeremias', 'Lamentations': 'Lamentações', 'Ezekiel': 'Ezequiel',
+    'Daniel': 'Daniel', 'Hosea': 'Oséias', 'Joel': 'Joel', 'Amos': 'Amós',
+    'Obadiah': 'Obadias', 'Jonah': 'Jonas', 'Micah': 'Miquéias', 'Nahum': 'Naum',
+    'Habakkuk': 'Habacuque', 'Zephaniah': 'Sofonias', 'Haggai': 'Ageu',
+    'Zechariah': 'Zacarias', 'Malachi': 'Malaquias', 'Matthew': 'Mateus',
+    'Mark': 'Marcos', 'Luke': 'Lucas', 'John': 'João', 'Acts': 'Atos',
+    'Romans': 'Romanos', 'Corinthians': 'Coríntios', 'Galatians': 'Gálatas',
+    'Ephesians': 'Efésios', 'Philippians': 'Filipenses', 'Colossians': 'Colossenses',
+    'Thessalonians': 'Tessalonicenses', 'Timothy': 'Timóteo', 'Titus': 'Tito',
+    'Philemon': 'Filemom', 'Hebrews': 'Hebreus', 'James': 'Tiago', 'Peter': 'Pedro',
+    'Jude': 'Judas', 'Revelation': 'Apocalipse',
+}
+
+ORDINALS = {
+    'first': 1, '1st': 1, '1': 1,
+    'second': 2, '2nd': 2, '2': 2,
+    'third': 3, '3rd': 3, '3': 3,
+}
+
+UNITS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+}
+TEENS = {
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+    'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+}
+TENS = {
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+    'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90,
+}
+RANGE_WORDS = {'to', 'through', 'thru', '-'}
+
+# Número de capítulos de cada livro; os numerados sem ordinal ("Kings five
+# fourteen") aceitam até o maior dos volumes
+BOOK_CHAPTERS = {
+    'Genesis': 50, 'Exodus': 40, 'Leviticus': 27, 'Numbers': 36, 'Deuteronomy': 34,
+    'Joshua': 24, 'Judges': 21, 'Ruth': 4,
+    'Samuel': 31, '1 Samuel': 31, '2 Samuel': 24,
+    'Kings': 25, '1 Kings': 22, '2 Kings': 25,
+    'Chronicles': 36, '1 Chronicles': 29, '2 Chronicles': 36,
+    'Ezra': 10, 'Nehemiah': 13, 'Esther': 10, 'Job': 42, 'Psalms': 150,
+    'Proverbs': 31, 'Ecclesiastes': 12, 'Song of Solomon': 8, 'Isaiah': 66,
+    'Jeremiah': 52, 'Lamentations': 5, 'Ezekiel': 48, 'Daniel': 12, 'Hosea': 14,
+    'Joel': 3, 'Amos': 9, 'Obadiah': 1, 'Jonah': 4, 'Micah': 7, 'Nahum': 3,
+    'Habakkuk': 3, 'Zephaniah': 3, 'Haggai': 2, 'Zechariah': 14, 'Malachi': 4,
+    'Matthew': 28, 'Mark': 16, 'Luke': 24, 'John': 21, '1 John': 5, '2 John': 1, '3 John': 1,
+    'Acts': 28, 'Romans': 16,
+    'Corinthians': 16, '1 Corinthians': 16, '2 Corinthians': 13,
+    'Galatians': 6, 'Ephesians': 6, 'Philippians': 4, 'Colossians': 4,
+    'Thessalonians': 5, '1 Thessalonians': 5, '2 Thessalonians': 3,
+    'Timothy': 6, '1 Timothy': 6, '2 Timothy': 4, 'Titus': 3, 'Philemon': 1,
+    'Hebrews': 13, 'James': 5, 'Peter': 5, '1 Peter': 5, '2 Peter': 3,
+    'Jude': 1, 'Revelation': 22,
+}
+
+# Maior versículo da Bíblia (Salmos 119:176)
+MAX_VERSE = 176
+
+
+def _alternation(words):
+    """
+    Monta uma alternação em forma de trie ("j(?:ob|o(?:el|hn)...)"), para o
+    regex testar cada letra uma vez em vez de cada nome inteiro.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [
+            re.escape(ch).replace(r"\ ", r"\s+") + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        if '' in node:
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+_NUMBER_WORDS = _alternation(list(UNITS) + list(TEENS) + list(TENS) + ['hundred'])
+
+# O ordinal ("First Corinthians") fica fora: testá-lo em cada palavra do texto
+# custa mais que procurá-lo só antes dos livros encontrados
+_REFERENCE_RE = re.compile(
+    rf"\b(?P<book>{_alternation(BOOK_ALIASES)})"
+    rf"(?P<tail>(?:(?:\s*[,:]\s*|\s*-\s*|\s+)(?:chapter|verses?|and|{_alternation(RANGE_WORDS - {'-'})}|{_NUMBER_WORDS}|\d+)\b)+)",
+    re.IGNORECASE
+)
+_ORDINAL_BEFORE_RE = re.compile(rf"\b(?P<ordinal>{_alternation(ORDINALS)})\s+$", re.IGNORECASE)
+# Maior "ordinal + espaços" que vale a pena olhar antes do livro
+_ORDINAL_LOOKBEHIND = 16
+# "thirty-eight" vira um token só, para o hífen não ser lido como intervalo
+_TOKEN_RE = re.compile(
+    rf"(?:{_alternation(TENS)})-(?:{_alternation(UNITS)})\b|[a-z]+|\d+|-",
+    re.IGNORECASE
+)
+
+# Caminho rápido: "livro número [número]" ("John three sixteen", "Romans 8 28",
+# "Psalm twenty-three")
+_SIMPLE_TAIL_RE = re.compile(r"\s+([a-z]+|\d+)(?:(\s+|-)([a-z]+|\d+))?", re.IGNORECASE)
+_SIMPLE_NUMBERS = {**UNITS, **TEENS, **TENS}
+
+_TRANSLATED_RE = re.compile(
+    rf"\b(?:(?P<ordinal>[123])\s+)?(?P<book>{_alternation(BOOK_ALIASES)})\s+(?P<ref>\d+:\d+(?:-\d+)?)\b",
+    re.IGNORECASE
+)
+
+
+def word_to_number(word: str) -> int:
+    """
+    Converte palavra numérica em inglês para número.
+    Ex: "eleven" → 11, "twenty three" → 23, "one hundred nineteen" → 119
+    """
+    tokens = word.lower().replace('-', ' ').split()
+    value, used = _parse_number(tokens, 0)
+    if value is None or used != len(tokens):
+        return word  # Retorna original se não conseguir converter
+    return value
+
+
+def _parse_number(tokens, i):
+    """
+    Lê um número (dígitos ou por extenso) começando em tokens[i].
+    Retorna (valor, próximo índice) ou (None, i).
+    """
+    if i >= len(tokens):
+        return None, i
+    token = tokens[i]
+    if token.isdigit():
+        return int(token), i + 1
+
+    value = 0
+    start = i
+    if token in UNITS and i + 1 < len(tokens) and tokens[i + 1] == 'hundred':
+        value = UNITS[token] * 100
+        i += 2
+    elif token == 'hundred':
+        value = 100
+        i += 1
+    if value and i + 1 < len(tokens) and tokens[i] == 'and' and (
+            tokens[i + 1] in UNITS or tokens[i + 1] in TEENS or tokens[i + 1] in TENS):
+        i += 1
+
+    if i < len(tokens) and tokens[i] in TENS:
+        value += TENS[tokens[i]]
+        i += 1
+        if i < len(tokens) and tokens[i] in UNITS:
+            value += UNITS[tokens[i]]
+            i += 1
+    elif i < len(tokens) and tokens[i] in TEENS:
+        value += TEENS[tokens[i]]
+        i += 1
+    elif i < len(tokens) and tokens[i] in UNITS:
+        value += UNITS[tokens[i]]
+        i += 1
+
+    if i == start:
+        return None, i
+    return value, i
+
+
+def _tokenize(tail):
+    """
+    Separa o texto em tokens minúsculos, desdobrando os compostos com hífen
+    ("thirty-eight" → "thirty", "eight"). Retorna (tokens, fim de cada token em `tail`).
+    """
+    tail = tail.lower()
+    if '-' not in tail and ',' not in tail and ':' not in tail:
+        # Só palavras e números separados por espaço (o caso comum)
+        tokens = tail.split()
+        ends = []
+        end = 0
+        for token in tokens:
+            end = tail.index(token, end) + len(token)
+            ends.append(end)
+        return tokens, ends
+    tokens = []
+    ends = []
+    for m in _TOKEN_RE.finditer(tail):
+        token = m.group()
+        if len(token) > 1 and '-' in token:
+            tokens.extend(token.split('-'))
+            ends.extend((m.end(), m.end()))
+        else:
+            tokens.append(token)
+            ends.append(m.end())
+    return tokens, ends
+
+
+def _parse_tail(tail):
+    """
+    Interpreta "capítulo [versículo [até versículo]]" no texto após o livro.
+    Retorna (capítulo, versículo, fim, posição consumida em `tail`, explícito), onde
+    explícito diz se o capítulo veio com "chapter" ou como número composto.
+    """
+    tokens, ends = _tokenize(tail)
+    chapter = verse = verse_end = None
+    explicit = False
+    i = 0
+
+    if i < len(tokens) and tokens[i] == 'chapter':
+        explicit = True
+        i += 1
+    chapter, j = _parse_number(tokens, i)
+    if chapter is None:
+        return None
+    explicit = explicit or j - i > 1
+    i = consumed = j
+
+    if i < len(tokens) and tokens[i] in ('verse', 'verses'):
+        i += 1
+    verse, j = _parse_number(tokens, i)
+    if verse is not None:
+        i = consumed = j
+        if i < len(tokens) and tokens[i] in RANGE_WORDS:
+            verse_end, j = _parse_number(tokens, i + 1)
+            if verse_end is not None and verse_end > verse:
+                consumed = j
+            else:
+                verse_end = None
+
+    end = ends[consumed - 1] if consumed else 0
+    return chapter, verse, verse_end, end, explicit
+
+
+def _parse_simple_tail(tail):
+    """
+    As formas mais comuns ("three sixteen", "twenty three", "one") sem
+    tokenizar. Retorna o mesmo que _parse_tail, ou None para o _parse_tail
+    cuidar dos outros casos.
+    """
+    m = _SIMPLE_TAIL_RE.fullmatch(tail)
+    if m is None:
+        return None
+    first, separator, second = m.groups()
+    first = first.lower()
+    chapter = int(first) if first.isdigit() else _SIMPLE_NUMBERS.get(first)
+    if chapter is None:
+        return None
+    if second is None:
+        return chapter, None, None, len(tail), False
+    second = second.lower()
+    if first in TENS and second in UNITS:
+        # "twenty three" é um número só: capítulo explícito
+        return chapter + UNITS[second], None, None, len(tail), True
+    if separator == '-':
+        return None
+    verse = int(second) if second.isdigit() else _SIMPLE_NUMBERS.get(second)
+    if verse is None:
+        return None
+    return chapter, verse, None, len(tail), False
+
+
+def _reference(match, ordinal):
+    """Referência normalizada para o livro + resto em `match`; None se não for uma."""
+    book = BOOK_ALIASES[' '.join(match.group('book').lower().split())]
+    if ordinal and book not in NUMBERED_BOOKS:
+        return None
+
+    tail = match.group('tail')
+    parsed = _parse_simple_tail(tail) or _parse_tail(tail)
+    if parsed is None:
+        return None
+    chapter, verse, verse_end, end, explicit = parsed
+    # Só capítulo ("John one") é ambíguo demais, a não ser que venha
+    # com "chapter" ou seja número composto ("Psalms twenty three")
+    if verse is None and not explicit:
+        return None
+    prefix = f"{ORDINALS[ordinal.lower()]} " if ordinal else ""
+    if not 0 < chapter <= BOOK_CHAPTERS.get(prefix + book, 0):
+        return None
+    if verse is not None and not 0 < verse <= MAX_VERSE:
+        return None
+
+    reference = f"{prefix}{book} {chapter}"
+    if verse is not None:
+        reference += f":{verse}"
+        if verse_end is not None:
+            reference += f"-{verse_end}"
+    return reference + tail[end:]
+
+
+def preprocess_biblical_references(text: str) -> str:
+    """
+    Pré-processa o texto em inglês para melhorar o reconhecimento de referências bíblicas.
+    Ex: "Numbers eleven seventeen" → "Numbers 11:17"
+    """
+    parts = []
+    last = 0
+    for match in _REFERENCE_RE.finditer(text):
+        start = match.start()
+        before = _ORDINAL_BEFORE_RE.search(text, max(last, start - _ORDINAL_LOOKBEHIND), start)
+        ordinal = before.group('ordinal') if before is not None else None
+        reference = _reference(match, ordinal)
+        if reference is None:
+            continue
+        if before is not None:
+            start = before.start()
+        parts.append(text[last:start])
+        parts.append(reference)
+        last = match.end()
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return ''.join(parts)
+
+
+def _replace_translated(match):
+    book = BOOK_TRANSLATIONS[BOOK_ALIASES[re.sub(r"\s+", " ", match.group('book').lower())]]
+    ordinal = match.group('ordinal')
+    prefix = f"{ordinal} " if ordinal else ""
+    return f"{prefix}{book} {match.group('ref')}"
+
+
+def postprocess_biblical_references(text: str, target_language: str = "pt-BR") -> str:
+    """
+    Pós-processa a tradução para corrigir nomes de livros bíblicos em português.
+    Em outras línguas a tradução volta intacta (a tabela só tem nomes em português).
+    """
+    if not target_language.lower().startswith("pt"):
+        return text
+    return _TRANSLATED_RE.sub(_replace_translated, text)
+
+
+# Corpus de referência: (texto transcrito, pré-processado)
+GOLDEN_PREPROCESS = [
+    ("Numbers eleven seventeen", "Numbers 11:17"),
+    ("Let's read John three sixteen.", "Let's read John 3:16."),
+    ("Open to Psalms one hundred nineteen one hundred five", "Open to Psalms 119:105"),
+    ("Psalm twenty three", "Psalms 23"),
+    ("First Corinthians thirteen verses four to seven", "1 Corinthians 13:4-7"),
+    ("second Kings five fourteen", "2 Kings 5:14"),
+    ("1st John one nine", "1 John 1:9"),
+    ("Romans chapter eight", "Romans 8"),
+    ("Romans eight twenty eight and", "Romans 8:28 and"),
+    ("Genesis one one", "Genesis 1:1"),
+    ("Isaiah forty thirty one", "Isaiah 40:31"),
+    ("Revelations twenty one four", "Revelation 21:4"),
+    ("Ephesians two eight through nine", "Ephesians 2:8-9"),
+    ("John 3 16", "John 3:16"),
+    ("Acts two, thirty-eight", "Acts 2:38"),
+    ("Psalm twenty-three", "Psalms 23"),
+    ("Romans eight twenty-eight to thirty-nine", "Romans 8:28-39"),
+    ("Job one hundred and twenty", "Job one hundred and twenty"),
+    ("third Samuel two", "third Samuel two"),
+    ("Song of Solomon two four", "Song of Solomon 2:4"),
+    ("Mark my words", "Mark my words"),
+    ("John one", "John one"),
+    ("James and John went", "James and John went"),
+]
+
+# (língua de destino, tradução do Google, pós-processado)
+GOLDEN_POSTPROCESS = [
+    ("pt-BR", "Vamos ler John 3:16.", "Vamos ler João 3:16."),
+    ("pt-BR", "1 Corinthians 13:4-7 diz", "1 Coríntios 13:4-7 diz"),
+    ("pt", "Em Psalms 119:105", "Em Salmos 119:105"),
+    ("pt-PT", "Song of Solomon 2:4", "Cânticos 2:4"),
+    ("pt-BR", "Tiago 1:5", "Tiago 1:5"),
+    ("es", "Leamos John 3:16 y 1 Corinthians 13:4-7.", "Leamos John 3:16 y 1 Corinthians 13:4-7."),
+    ("es", "Juan 3:16", "Juan 3:16"),
+]
+
+
+if __name__ == '__main__':
+    # Golden + benchmark contra as funções da versão anterior (regex montada a cada chamada)
+    import timeit
+
+    failures = 0
+    for text, expected in GOLDEN_PREPROCESS:
+        got = preprocess_biblical_references(text)
+        if got != expected:
+            failures += 1
+            print(f"  FALHOU pre: {text!r} → {got!r} (esperado {expected!r})")
+    for language, text, expected in GOLDEN_POSTPROCESS:
+        got = postprocess_biblical_references(text, language)
+        if got != expected:
+            failures += 1
+            print(f"  FALHOU pos ({language}): {text!r} → {got!r} (esperado {expected!r})")
+    print(f"Golden: {len(GOLDEN_PREPROCESS) + len(GOLDEN_POSTPROCESS) - failures} ok, {failures} falhas")
+
+    # Funções da versão anterior, copiadas sem alteração (antes moravam em main.py)
+    def baseline_preprocess_biblical_references(text: str) -> str:
+        common_errors = {
+            r'\bnumber\s+eleven\b': 'Numbers 11',
+            r'\bnumbers?\s+(\w+)\s+(\d+)': lambda m: f'Numbers {baseline_word_to_number(m.group(1))}:{m.group(2)}',
+            r'\b(genesis|exodus|leviticus|deuteronomy)\s+(\w+)\s+(\d+)':
+                lambda m: f'{m.group(1).title()} {baseline_word_to_number(m.group(2))}:{m.group(3)}',
+        }
+
+        text_lower = text.lower()
+        result = text
+
+        bible_pattern = re.compile(
+            r'\b(genesis|exodus|leviticus|numbers|deuteronomy|joshua|judges|ruth|samuel|kings|chronicles|'
+            r'ezra|nehemiah|esther|job|psalms|proverbs|ecclesiastes|isaiah|jeremiah|ezekiel|daniel|'
+            r'hosea|joel|amos|obadiah|jonah|micah|nahum|habakkuk|zephaniah|haggai|zechariah|malachi|'
+            r'matthew|mark|luke|john|acts|romans|corinthians|galatians|ephesians|philippians|'
+            r'colossians|thessalonians|timothy|titus|philemon|hebrews|james|peter|jude|revelation)\s+'
+            r'(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
+            r'sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)\s+'
+            r'(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
+            r'sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred|'
+            r'\d+)',
+            re.IGNORECASE
+        )
+
+        def replace_reference(match):
+            book = match.group(1).title()
+            chapter = baseline_word_to_number(match.group(2))
+            verse = match.group(3)
+            if verse.isdigit():
+                verse_num = verse
+            else:
+                verse_num = str(baseline_word_to_number(verse))
+            return f'{book} {chapter}:{verse_num}'
+
+        result = bible_pattern.sub(replace_reference, result)
+
+        return result
+
+    def baseline_word_to_number(word: str) -> int:
+        word = word.lower().strip()
+
+        numbers = {
+            'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+            'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+            'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+            'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18,
+            'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40,
+            'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80,
+            'ninety': 90, 'hundred': 100
+        }
+
+        if word in numbers:
+            return numbers[word]
+
+        if word.isdigit():
+            return int(word)
+
+        return word
+
+    def baseline_postprocess_biblical_references(text: str) -> str:
+        book_translations = {
+            'Genesis': 'Gênesis', 'Exodus': 'Êxodo', 'Leviticus': 'Levítico',
+            'Numbers': 'Números', 'Deuteronomy': 'Deuteronômio', 'Joshua': 'Josué',
+            'Judges': 'Juízes', 'Samuel': 'Samuel', 'Kings': 'Reis',
+            'Chronicles': 'Crônicas', 'Psalms': 'Salmos', 'Proverbs': 'Provérbios',
+            'Ecclesiastes': 'Eclesiastes', 'Isaiah': 'Isaías', 'Jeremiah': 'Jeremias',
+            'Ezekiel': 'Ezequiel', 'Daniel': 'Daniel', 'Matthew': 'Mateus',
+            'Mark': 'Marcos', 'Luke': 'Lucas', 'John': 'João', 'Acts': 'Atos',
+            'Romans': 'Romanos', 'Corinthians': 'Coríntios', 'Galatians': 'Gálatas',
+            'Ephesians': 'Efésios', 'Philippians': 'Filipenses', 'Colossians': 'Colossenses',
+            'Thessalonians': 'Tessalonicenses', 'Timothy': 'Timóteo', 'Hebrews': 'Hebreus',
+            'James': 'Tiago', 'Peter': 'Pedro', 'Revelation': 'Apocalipse'
+        }
+
+        result = text
+
+        for eng, por in book_translations.items():
+            pattern = rf'\b{eng}\s+(\d+):(\d+)\b'
+            replacement = rf'{por} \1:\2'
+            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
+
+        return result
+
+    # "livro número número", a forma que a versão anterior já convertia
+    simple_references = [
+        "Numbers eleven seventeen", "Let's read John three sixteen.", "second Kings five fourteen",
+        "1st John one nine", "Genesis one one", "Song of Solomon two four",
+    ]
+    other_references = [text for text, _ in GOLDEN_PREPROCESS if text not in simple_references]
+    plain = [
+        "And the Lord said unto Moses, gather unto me seventy men of the elders of Israel.",
+        "We are going to talk today about faith, hope and love.",
+        "Turn to your neighbor and say, God is good all the time.",
+    ]
+    translated = [text for language, text, _ in GOLDEN_POSTPROCESS if language.startswith("pt")] + ["E o Senhor disse a Moisés."]
+
+    def per_sentence(func, corpus, n=2000):
+        best = min(timeit.repeat(lambda: [func(s) for s in corpus], number=n, repeat=3))
+        return best / (n * len(corpus)) * 1e6
+
+    for label, func, baseline, corpus in (
+            ("Pré (frases comuns)", preprocess_biblical_references, baseline_preprocess_biblical_references, plain),
+            ("Pré (livro número número)", preprocess_biblical_references, baseline_preprocess_biblical_references, simple_references),
+            ("Pré (outras referências)", preprocess_biblical_references, baseline_preprocess_biblical_references, other_references),
+            ("Pós-processamento", postprocess_biblical_references, baseline_postprocess_biblical_references, translated)):
+        print(f"{label + ':':<28}antigo {per_sentence(baseline, corpus):.1f}us, novo {per_sentence(func, corpus):.1f}us")
+    # A forma simples tem caminho rápido (_parse_simple_tail) e fica mais
+    # rápida que antes. As outras referências ("chapter", intervalos, ordinais,
+    # números compostos) a versão anterior nem convertia; aqui passam pelo
+    # _parse_tail em Python e podem custar mais que o antigo, que só desistia.
+    raise SystemExit(1 if failures else 0)
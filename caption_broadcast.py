@@ -0,0 +1,468 @@
+"""
+Servidor de legendas para celulares e telas extras (salas anexas).
+
+Cada legenda é serializada uma vez (JSON → evento SSE e quadro WebSocket) e
+os mesmos bytes vão para todos os inscritos do idioma. Cada cliente tem o seu
+buffer limitado e a sua tarefa de envio: um celular lento perde as legendas
+mais antigas (a mais nova é a que importa) e, se nem assim acompanhar, é
+desconectado - nunca atrasa os outros. Quem entra no meio recebe as últimas
+legendas (backfill).
+
+    GET /                  página simples para o celular (?lang=pt-BR)
+    GET /events?lang=...   Server-Sent Events (retoma com Last-Event-ID)
+    GET /ws?lang=...       WebSocket (RFC 6455, só texto do servidor)
+
+Só biblioteca padrão (asyncio), como o MetricsServer.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+PAGE = """<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Legendas</title>
+<style>
+body { background: #000; color: #fff; font: 1.6em/1.4 Helvetica, Arial, sans-serif; margin: 0; padding: 1em; }
+p { margin: 0 0 .6em; } p:last-child { color: #ff0; }
+#estado { position: fixed; top: 0; right: .5em; font-size: .5em; color: #888; }
+</style></head>
+<body><div id="estado">conectando...</div><div id="legendas"></div>
+<script>
+var lang = new URLSearchParams(location.search).get("lang") || "";
+var box = document.getElementById("legendas"), state = document.getElementById("estado");
+var source = new EventSource("/events?lang=" + encodeURIComponent(lang));
+source.onopen = function () { state.textContent = ""; };
+source.onerror = function () { state.textContent = "reconectando..."; };
+source.addEventListener("legenda", function (event) {
+  var caption = JSON.parse(event.data);
+  if (!caption.texto) return;
+  var p = document.createElement("p");
+  p.textContent = caption.texto;
+  box.appendChild(p);
+  while (box.children.length > 20) box.removeChild(box.firstChild);
+  window.scrollTo(0, document.body.scrollHeight);
+});
+</script></body></html>
+"""
+
+
+def websocket_frame(payload, opcode=0x1):
+    """Quadro do servidor (sem máscara): os mesmos bytes servem a todos os clientes."""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 65536:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return header + payload
+
+
+class _Message:
+    """Uma legenda já serializada nos dois formatos."""
+
+    __slots__ = ("id", "sse", "ws")
+
+    def __init__(self, message_id, language, text, timestamp):
+        self.id = message_id
+        data = json.dumps({"id": message_id, "idioma": language, "texto": text, "t": round(timestamp, 3)},
+                          ensure_ascii=False)
+        self.sse = f"id: {message_id}\nevent: legenda\ndata: {data}\n\n".encode()
+        self.ws = websocket_frame(data.encode())
+
+
+class _Subscriber:
+    """Um cliente conectado: buffer limitado (descarta a mais antiga) + sinal de dados novos."""
+
+    def __init__(self, writer, language, kind, buffer_size):
+        self.writer = writer
+        self.language = language
+        self.kind = kind
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, message):
+        if len(self.buffer) >= self.buffer_size:
+            self.buffer.popleft()
+            self.dropped += 1
+        self.buffer.append(message)
+        self.ready.set()
+
+
+class BroadcastServer:
+    """
+    `publish(idioma, texto)` não bloqueia: só coloca a legenda nos buffers.
+    Deve ser chamado no loop asyncio do servidor.
+    """
+
+    def __init__(self, languages, host="0.0.0.0", port=8765, backfill=20, client_buffer=32,
+                 max_clients=1000, send_timeout=5.0, keepalive=15.0, write_limit=16384,
+                 socket_buffer=65536):
+        self.languages = list(languages)
+        self.host = host
+        self.port = port
+        self.backfill = backfill
+        self.client_buffer = max(client_buffer, 1)
+        self.max_clients = max_clients
+        self.send_timeout = send_timeout
+        self.keepalive = keepalive
+        self.write_limit = write_limit
+        self.socket_buffer = socket_buffer
+
+        self._server = None
+        self._connections = {}    # Tarefa da conexão → writer
+        self._subscribers = {language: set() for language in self.languages}
+        self._history = {language: deque(maxlen=backfill) for language in self.languages}
+        self._next_id = 0
+
+        self.stats = {
+            'conexoes': 0,
+            'recusadas': 0,
+            'legendas': 0,
+            'enviadas': 0,          # Mensagens escritas nos sockets (todas as conexões)
+            'descartadas': 0,       # Legendas antigas descartadas de buffers cheios
+            'lentos_desconectados': 0,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def client_count(self):
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, language, text):
+        if language not in self._subscribers:
+            return
+        self._next_id += 1
+        message = _Message(self._next_id, language, text, time.time())
+        self._history[language].append(message)
+        self.stats['legendas'] += 1
+        for subscriber in self._subscribers[language]:
+            subscriber.push(message)
+
+    # Conexões ----------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            await self._serve(reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _serve(self, reader, writer):
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        language = query.get("lang", [""])[0] or self.languages[0]
+
+        if method != "GET":
+            await self._respond(writer, "405 Method Not Allowed")
+            return
+        if url.path == "/":
+            await self._respond(writer, "200 OK", PAGE.encode(), "text/html; charset=utf-8")
+            return
+        if url.path not in ("/events", "/ws"):
+            await self._respond(writer, "404 Not Found")
+            return
+        if language not in self._subscribers:
+            await self._respond(writer, "404 Not Found", f"Idioma sem legendas: {language}\n".encode())
+            return
+        if self.client_count() >= self.max_clients:
+            self.stats['recusadas'] += 1
+            await self._respond(writer, "503 Service Unavailable")
+            return
+
+        if url.path == "/ws":
+            key = headers.get("sec-websocket-key")
+            if headers.get("upgrade", "").lower() != "websocket" or not key:
+                await self._respond(writer, "400 Bad Request")
+                return
+            accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+            writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            last_id = query.get("since", ["0"])[0]
+            kind = "ws"
+        else:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                         b"Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\nretry: 2000\n\n")
+            last_id = headers.get("last-event-id") or query.get("since", ["0"])[0]
+            kind = "sse"
+        last_id = int(last_id) if last_id.isdigit() else 0
+
+        # Memória por cliente limitada: buffer do asyncio + buffer do kernel fixo
+        # (sem isso o kernel cresce o buffer de envio até 4 MB por conexão)
+        writer.transport.set_write_buffer_limits(high=self.write_limit)
+        sock = writer.get_extra_info("socket")
+        if sock is not None and self.socket_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.socket_buffer)
+        subscriber = _Subscriber(writer, language, kind, self.client_buffer)
+        # Backfill: as últimas legendas que o cliente ainda não viu
+        for message in self._history[language]:
+            if message.id > last_id:
+                subscriber.push(message)
+        self._subscribers[language].add(subscriber)
+        self.stats['conexoes'] += 1
+        sender = asyncio.create_task(self._send_loop(subscriber))
+        listener = asyncio.create_task(self._listen(reader, subscriber))
+        try:
+            await asyncio.wait({sender, listener}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._subscribers[language].discard(subscriber)
+            self.stats['descartadas'] += subscriber.dropped
+            sender.cancel()
+            listener.cancel()
+            await asyncio.gather(sender, listener, return_exceptions=True)
+
+    async def _respond(self, writer, status, body=b"", content_type="text/plain; charset=utf-8"):
+        writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _send_loop(self, subscriber):
+        writer = subscriber.writer
+        ping = b": ping\n\n" if subscriber.kind == "sse" else websocket_frame(b"", opcode=0x9)
+        while True:
+            if not subscriber.buffer:
+                subscriber.ready.clear()
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    writer.write(ping)
+            # Escreve tudo o que está no buffer e espera o socket uma vez só
+            while subscriber.buffer:
+                message = subscriber.buffer.popleft()
+                writer.write(message.sse if subscriber.kind == "sse" else message.ws)
+                self.stats['enviadas'] += 1
+            try:
+                await asyncio.wait_for(writer.drain(), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.stats['lentos_desconectados'] += 1
+                return
+
+    async def _listen(self, reader, subscriber):
+        """Espera o cliente sair. No WebSocket responde ping e close."""
+        if subscriber.kind == "sse":
+            while await reader.read(1024):
+                pass
+            return
+        writer = subscriber.writer
+        while True:
+            header = await reader.readexactly(2)
+            opcode = header[0] & 0x0F
+            length = header[1] & 0x7F
+            if length == 126:
+                length = int.from_bytes(await reader.readexactly(2), "big")
+            elif length == 127:
+                length = int.from_bytes(await reader.readexactly(8), "big")
+            if length > 65536:
+                return
+            mask = await reader.readexactly(4) if header[1] & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+            if opcode == 0x8:
+                writer.write(websocket_frame(payload[:2], opcode=0x8))
+                return
+            if opcode == 0x9:
+                writer.write(websocket_frame(payload, opcode=0xA))
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        # Derruba as conexões: as tarefas terminam sozinhas (leitura/escrita falham)
+        for writer in list(self._connections.values()):
+            writer.transport.abort()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+
+if __name__ == '__main__':
+    # Teste de carga local: centenas de clientes SSE/WebSocket simulados e
+    # alguns que nunca leem o socket. Mede a latência do publish até cada
+    # cliente receber a legenda (os clientes rodam no mesmo loop do servidor,
+    # então a latência inclui o trabalho deles).
+    #   python caption_broadcast.py [--clients 500] [--captions 60] [--slow 5]
+    import argparse
+    import os
+
+    from metrics import percentile
+
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de legendas")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--captions", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=0.05, help="Intervalo entre legendas (s)")
+    parser.add_argument("--slow", type=int, default=5, help="Clientes que nunca leem")
+    args = parser.parse_args()
+
+    TEXT = "E disse Deus: Haja luz; e houve luz. E viu Deus que era boa a luz; e fez Deus separação entre a luz e as trevas. "
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    async def sse_client(port, received, ready, since=0):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+        writer.write(f"GET /events?lang=pt-BR&since={since} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+        await reader.readuntil(b"\n\n")    # retry:
+        ready()
+        try:
+            while True:
+                event = await reader.readuntil(b"\n\n")
+                if event.startswith(b"id: "):
+                    received.append((int(event[4:event.index(b"\n")]), time.perf_counter()))
+        finally:
+            writer.close()
+
+    async def ws_client(port, received, ready, since=0):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((f"GET /ws?lang=pt-BR&since={since} HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        head = await reader.readuntil(b"\r\n\r\n")
+        expected = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest())
+        assert b"101" in head.split(b"\r\n")[0] and expected in head
+        ready()
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                length = header[1] & 0x7F
+                if length == 126:
+                    length = int.from_bytes(await reader.readexactly(2), "big")
+                payload = await reader.readexactly(length)
+                if header[0] & 0x0F == 0x1:
+                    received.append((json.loads(payload)["id"], time.perf_counter()))
+        finally:
+            writer.close()
+
+    async def deliver(server):
+        """Conecta os clientes e publica as legendas; retorna (recebidas, publicadas, tarefas)."""
+        first = server._next_id    # Sem o backfill da rajada
+        connected = [0]
+        def ready():
+            connected[0] += 1
+        received = [[] for _ in range(args.clients)]
+        tasks = [asyncio.create_task((sse_client if i % 2 == 0 else ws_client)(server.port, received[i], ready, since=first))
+                 for i in range(args.clients)]
+        # Com prazo: cliente que não conseguiu conectar aparece como falha abaixo
+        expected_clients = server.client_count() + args.clients
+        deadline = time.perf_counter() + 10
+        while ((connected[0] < args.clients or server.client_count() < expected_clients)
+               and time.perf_counter() < deadline):
+            await asyncio.sleep(0.01)
+
+        published = {}
+        for n in range(args.captions):
+            published[server._next_id + 1] = time.perf_counter()
+            # Legendas longas fazem os clientes lentos encherem os buffers
+            server.publish("pt-BR", f"{n}: " + TEXT * 8)
+            await asyncio.sleep(args.interval)
+        deadline = time.perf_counter() + 5
+        while (any(len(r) < args.captions for r in received) and time.perf_counter() < deadline):
+            await asyncio.sleep(0.01)
+        return received, published, tasks
+
+    def latencies_of(received, published):
+        return sorted(at - published[message_id] for r in received for message_id, at in r)
+
+    async def run():
+        # Referência: os mesmos clientes, sem nenhum lento, no mesmo processo
+        server = await BroadcastServer(["pt-BR"], host="127.0.0.1", port=0, backfill=10, client_buffer=32,
+                                       max_clients=args.clients + 10).start()
+        received, published, tasks = await deliver(server)
+        baseline = latencies_of(received, published)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.close()
+        print(f"Referência sem clientes lentos: p99 {percentile(baseline, 99)*1000:.1f}ms")
+
+        server = await BroadcastServer(["pt-BR"], host="127.0.0.1", port=0, backfill=10, client_buffer=32,
+                                       max_clients=args.clients + args.slow + 10, send_timeout=2.0).start()
+        print(f"{args.clients} clientes ({args.clients // 2} SSE, {args.clients - args.clients // 2} WebSocket), "
+              f"{args.slow} que nunca leem, {args.captions} legendas a cada {args.interval*1000:.0f}ms")
+
+        # Clientes lentos: socket com buffer de recepção mínimo, nunca lido.
+        # Uma rajada antes do teste deixa os sockets deles cheios.
+        slow = []
+        for _ in range(args.slow):
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+            sock.connect(("127.0.0.1", server.port))
+            sock.sendall(b"GET /events?lang=pt-BR HTTP/1.1\r\nHost: x\r\n\r\n")
+            slow.append(sock)
+        while server.client_count() < args.slow:
+            await asyncio.sleep(0.01)
+        for n in range(300):
+            server.publish("pt-BR", TEXT * 8)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        stuck = sum(len(s.buffer) > 0 for s in server._subscribers["pt-BR"])
+        print(f"  {stuck}/{args.slow} clientes lentos com o socket cheio antes do teste")
+
+        received, published, tasks = await deliver(server)
+        latencies = latencies_of(received, published)
+        complete = sum(len(r) == args.captions and [m for m, _ in r] == sorted(published) for r in received)
+        results = []
+        results.append(check("todos os clientes receberam todas as legendas, em ordem", complete == args.clients,
+                             f"{complete}/{args.clients}"))
+        print(f"  Latência do publish até o cliente ({len(latencies)} entregas): "
+              f"p50 {percentile(latencies, 50)*1000:.1f}ms  p95 {percentile(latencies, 95)*1000:.1f}ms  "
+              f"p99 {percentile(latencies, 99)*1000:.1f}ms  máx. {latencies[-1]*1000:.1f}ms")
+        # Comparado à referência (não a um limite fixo, que depende da máquina)
+        ratio = percentile(latencies, 99) / max(percentile(baseline, 99), 1e-3)
+        results.append(check("clientes lentos não atrasam os outros", ratio <= 2.0,
+                             f"p99 {percentile(latencies, 99)*1000:.1f}ms, {ratio:.1f}x a referência"))
+        await asyncio.sleep(2.5)    # send_timeout dos lentos
+        lagging = [s for s in server._subscribers["pt-BR"] if s.dropped]
+        results.append(check("clientes lentos descartam ou são desconectados",
+                             server.stats['lentos_desconectados'] + len(lagging) >= args.slow,
+                             f"{server.stats['lentos_desconectados']} desconectados, "
+                             f"{server.stats['descartadas'] + sum(s.dropped for s in lagging)} legendas descartadas"))
+        print(f"  Serialização: {server.stats['legendas']} legendas codificadas uma vez, "
+              f"{server.stats['enviadas']} mensagens escritas")
+
+        # Backfill: quem entra agora recebe as 10 últimas; com Last-Event-ID, só as que faltam
+        for since, expected in ((0, 10), (server._next_id - 3, 3)):
+            late = []
+            task = asyncio.create_task(sse_client(server.port, late, lambda: None, since=since))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            ids = [message_id for message_id, _ in late]
+            results.append(check(f"backfill (since={since})", ids == sorted(published)[-expected:],
+                                 f"{len(ids)} legendas recebidas ao conectar"))
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for sock in slow:
+            sock.close()
+        await server.close()
+        print("Tudo certo." if all(results) else "Há conferências com falha.")
+        return all(results)
+
+    raise SystemExit(0 if asyncio.run(run()) else 1)
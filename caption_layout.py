@@ -0,0 +1,289 @@
+"""
+Diagramação das legendas pela largura real do texto na tela.
+
+A largura de cada palavra vem de uma tabela de métricas da fonte (avanço de
+cada caractere em unidades de 1/1000 em, como nos arquivos AFM) e fica em
+cache. Texto maior que uma tela é dividido em várias telas (Frame), cada uma
+com tempo de leitura proporcional ao tamanho; nenhuma palavra é cortada.
+Quando uma legenda só cresce (texto anterior + palavras novas), as linhas já
+fechadas são reaproveitadas e só o final é diagramado de novo.
+"""
+import json
+import unicodedata
+
+# Helvetica/Arial (métricas AFM padrão), em 1/1000 em
+HELVETICA_WIDTHS = {
+    ' ': 278, '!': 278, '"': 355, '#': 556, '$': 556, '%': 889, '&': 667, "'": 191,
+    '(': 333, ')': 333, '*': 389, '+': 584, ',': 278, '-': 333, '.': 278, '/': 278,
+    '0': 556, '1': 556, '2': 556, '3': 556, '4': 556, '5': 556, '6': 556, '7': 556,
+    '8': 556, '9': 556, ':': 278, ';': 278, '<': 584, '=': 584, '>': 584, '?': 556,
+    '@': 1015, 'A': 667, 'B': 667, 'C': 722, 'D': 722, 'E': 667, 'F': 611, 'G': 778,
+    'H': 722, 'I': 278, 'J': 500, 'K': 667, 'L': 556, 'M': 833, 'N': 722, 'O': 778,
+    'P': 667, 'Q': 778, 'R': 722, 'S': 667, 'T': 611, 'U': 722, 'V': 667, 'W': 944,
+    'X': 667, 'Y': 667, 'Z': 611, '[': 278, '\\': 278, ']': 278, '^': 469, '_': 556,
+    '`': 333, 'a': 556, 'b': 556, 'c': 500, 'd': 556, 'e': 556, 'f': 278, 'g': 556,
+    'h': 556, 'i': 222, 'j': 222, 'k': 500, 'l': 222, 'm': 833, 'n': 556, 'o': 556,
+    'p': 556, 'q': 556, 'r': 333, 's': 500, 't': 278, 'u': 556, 'v': 500, 'w': 722,
+    'x': 500, 'y': 500, 'z': 500, '{': 334, '|': 260, '}': 334, '~': 584,
+    '¡': 333, '¿': 611, '«': 556, '»': 556, 'ª': 370, 'º': 365, '°': 400,
+    '–': 556, '—': 1000, '‘': 222, '’': 222, '“': 333, '”': 333, '…': 1000,
+}
+
+
+class FontMetrics:
+    """
+    Largura (px) de textos numa fonte e tamanho. Letras acentuadas usam a
+    largura da letra base (como nas fontes comuns); o resto usa `default`.
+    """
+
+    def __init__(self, widths=None, size=48.0, units_per_em=1000, default=556):
+        self.widths = dict(HELVETICA_WIDTHS if widths is None else widths)
+        self.scale = size / units_per_em
+        self.default = default
+        self.space = self.char_width(' ')
+
+    def char_width(self, char):
+        width = self.widths.get(char)
+        if width is None:
+            base = unicodedata.normalize('NFD', char)[:1]
+            width = self.widths.get(base, self.default)
+            self.widths[char] = width
+        return width * self.scale
+
+    def text_width(self, text):
+        return sum(self.char_width(c) for c in text)
+
+
+def load_font_metrics(path=None, size=48.0):
+    """
+    Métricas da fonte usada no ProPresenter: JSON {"units_per_em": 1000,
+    "widths": {"a": 556, ...}}. Sem arquivo, Helvetica/Arial.
+    """
+    if not path:
+        return FontMetrics(size=size)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return FontMetrics(data["widths"], size, data.get("units_per_em", 1000), data.get("default", 556))
+
+
+class Frame:
+    """Uma tela de legenda: linhas e tempo de exibição (s)."""
+
+    __slots__ = ('lines', 'duration')
+
+    def __init__(self, lines, duration):
+        self.lines = lines
+        self.duration = duration
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+    def __repr__(self):
+        return f"Frame({self.lines!r}, {self.duration:.1f}s)"
+
+
+class Layout:
+    """Resultado da diagramação: palavras, início de cada linha e as telas."""
+
+    def __init__(self, text, words, line_starts, line_widths, frames):
+        self.text = text
+        self.words = words
+        self.line_starts = line_starts     # Índice da primeira palavra de cada linha
+        self.line_widths = line_widths     # Largura (px) de cada linha
+        self.frames = frames
+
+    def lines(self):
+        ends = self.line_starts[1:] + [len(self.words)]
+        return [' '.join(self.words[start:end]) for start, end in zip(self.line_starts, ends)]
+
+
+class CaptionLayout:
+    """
+    Quebra de linha pela largura em pixels (`max_width`) e paginação em telas
+    de `max_lines` linhas. Cada tela fica `len(texto) / reading_speed`
+    segundos (entre `min_duration` e `max_duration`).
+    """
+
+    def __init__(self, metrics, max_width=1320.0, max_lines=2, reading_speed=15.0,
+                 min_duration=1.5, max_duration=6.0, cache_size=20000):
+        self.metrics = metrics
+        self.max_width = max_width
+        self.max_lines = max_lines
+        self.reading_speed = reading_speed
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.cache_size = cache_size
+        self._word_widths = {}
+
+        self.stats = {
+            'diagramacoes': 0,
+            'incrementais': 0,       # Reaproveitaram as linhas da legenda anterior
+            'varias_telas': 0,       # Textos maiores que uma tela (antes eram cortados)
+            'cache_acertos': 0,
+            'cache_falhas': 0,
+        }
+
+    def word_width(self, word):
+        width = self._word_widths.get(word)
+        if width is not None:
+            self.stats['cache_acertos'] += 1
+            return width
+        self.stats['cache_falhas'] += 1
+        if len(self._word_widths) >= self.cache_size:
+            self._word_widths.clear()
+        width = self._word_widths[word] = self.metrics.text_width(word)
+        return width
+
+    def _split_long_word(self, word):
+        """Palavra mais larga que a linha (ex: URL): quebra por caracteres."""
+        pieces, current, width = [], "", 0.0
+        for char in word:
+            char_width = self.metrics.char_width(char)
+            if current and width + char_width > self.max_width:
+                pieces.append(current)
+                current, width = "", 0.0
+            current += char
+            width += char_width
+        pieces.append(current)
+        return pieces
+
+    def _words(self, text):
+        words = []
+        for word in text.split():
+            if self.word_width(word) > self.max_width:
+                words.extend(self._split_long_word(word))
+            else:
+                words.append(word)
+        return words
+
+    def _wrap(self, words, start, line_starts, line_widths):
+        """Quebra gulosa a partir da palavra `start` (as linhas anteriores já estão prontas)."""
+        space = self.metrics.space
+        line_start, width = start, 0.0
+        for i in range(start, len(words)):
+            word_width = self.word_width(words[i])
+            if i > line_start and width + space + word_width > self.max_width:
+                line_starts.append(line_start)
+                line_widths.append(width)
+                line_start, width = i, word_width
+            else:
+                width += word_width + (space if i > line_start else 0.0)
+        if line_start < len(words):
+            line_starts.append(line_start)
+            line_widths.append(width)
+
+    def duration(self, text):
+        return min(self.max_duration, max(self.min_duration, len(text) / self.reading_speed))
+
+    def _paginate(self, words, line_starts, first_page=0, frames=None):
+        """Telas a partir de `first_page` (as anteriores vêm prontas em `frames`)."""
+        frames = [] if frames is None else frames
+        ends = line_starts[1:] + [len(words)]
+        for i in range(first_page * self.max_lines, len(line_starts), self.max_lines):
+            page = [' '.join(words[start:end])
+                    for start, end in zip(line_starts[i:i + self.max_lines], ends[i:i + self.max_lines])]
+            frames.append(Frame(page, self.duration(' '.join(page))))
+        return frames
+
+    def layout(self, text, previous=None):
+        """
+        Diagrama `text`. Se `previous` (Layout) for o começo do mesmo texto
+        (terminando numa palavra inteira), as linhas fechadas e as telas
+        anteriores a ela são reaproveitadas; só o final é refeito.
+        """
+        self.stats['diagramacoes'] += 1
+        if (previous is not None and previous.line_starts and text.startswith(previous.text)
+                and text[len(previous.text):len(previous.text) + 1].isspace()):
+            self.stats['incrementais'] += 1
+            words = previous.words + self._words(text[len(previous.text):])
+            line_starts = previous.line_starts[:-1]
+            line_widths = previous.line_widths[:-1]
+            self._wrap(words, previous.line_starts[-1], line_starts, line_widths)
+            first_page = (len(previous.line_starts) - 1) // self.max_lines
+            frames = self._paginate(words, line_starts, first_page, previous.frames[:first_page])
+            return Layout(text, words, line_starts, line_widths, frames)
+        words = self._words(text)
+        line_starts, line_widths = [], []
+        self._wrap(words, 0, line_starts, line_widths)
+        return Layout(text, words, line_starts, line_widths, self._paginate(words, line_starts))
+
+    def paginate(self, text):
+        """Telas (Frame) do texto; lista vazia para texto vazio."""
+        frames = self.layout(text).frames
+        if len(frames) > 1:
+            self.stats['varias_telas'] += 1
+        return frames
+
+    def cache_hit_rate(self):
+        total = self.stats['cache_acertos'] + self.stats['cache_falhas']
+        return self.stats['cache_acertos'] / total if total else 0.0
+
+
+if __name__ == '__main__':
+    # Diagramações de referência (Helvetica 48px, 1320px, 2 linhas) e benchmark
+    import time
+
+    engine = CaptionLayout(FontMetrics(size=48))
+    golden = [
+        ("Deus é amor.", [["Deus é amor."]]),
+        ("Porque Deus amou o mundo de tal maneira que deu o seu Filho unigênito, para que todo aquele que nele crê "
+         "não pereça, mas tenha a vida eterna.",
+         [["Porque Deus amou o mundo de tal maneira que deu o seu",
+           "Filho unigênito, para que todo aquele que nele crê não"],
+          ["pereça, mas tenha a vida eterna."]]),
+        # Mesmo número de caracteres, larguras bem diferentes
+        ("iiiii " * 12, [["iiiii iiiii iiiii iiiii iiiii iiiii iiiii iiiii iiiii iiiii iiiii iiiii"]]),
+        ("WWWWW " * 12, [["WWWWW WWWWW WWWWW WWWWW WWWWW", "WWWWW WWWWW WWWWW WWWWW WWWWW"],
+                         ["WWWWW WWWWW"]]),
+        ("Veja https://www.bibliaonline.com.br/acf/jo/3/16-e-tambem-o-versiculo-17-do-mesmo-capitulo agora",
+         [["Veja", "https://www.bibliaonline.com.br/acf/jo/3/16-e-tambem-o-versic"],
+          ["ulo-17-do-mesmo-capitulo agora"]]),
+    ]
+    failures = 0
+    for text, expected in golden:
+        layout = engine.layout(text)
+        got = [frame.lines for frame in layout.frames]
+        widths_ok = all(width <= engine.max_width for width in layout.line_widths)
+        no_loss = ''.join(' '.join(f.text for f in layout.frames).split()) == ''.join(text.split())
+        ok = got == expected and widths_ok and no_loss
+        failures += not ok
+        print(f"  {'OK  ' if ok else 'FALHA'} {text[:40]!r}: {len(layout.frames)} tela(s), "
+              f"{[f'{d.duration:.1f}s' for d in layout.frames]}")
+        if got != expected:
+            print(f"        esperado {expected}\n        obtido   {got}")
+
+    sermon = ("Irmãos, hoje vamos falar sobre a graça de Deus que nos alcança mesmo quando não merecemos, "
+              "e sobre como essa graça transforma a nossa maneira de viver em família e na igreja. ") * 6
+    words = sermon.split()
+    previous, incremental_ok = None, True
+    for n in range(1, len(words) + 1):
+        previous = engine.layout(' '.join(words[:n]), previous)
+        if n % 17 == 0 or n == len(words):
+            full = CaptionLayout(FontMetrics(size=48)).layout(' '.join(words[:n]))
+            incremental_ok &= (full.line_starts == previous.line_starts
+                               and [f.lines for f in full.frames] == [f.lines for f in previous.frames])
+    failures += not incremental_ok
+    print(f"  {'OK  ' if incremental_ok else 'FALHA'} diagramação incremental = diagramação completa")
+
+    def bench(label, fn, repeat=2000):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        print(f"  {label:<44} {(time.perf_counter() - start) / repeat * 1e6:8.1f}µs")
+
+    caption = golden[1][0]
+    print("Benchmark:")
+    bench("caption típica, cache frio", lambda: CaptionLayout(FontMetrics(size=48)).layout(caption))
+    bench("caption típica, cache quente", lambda: engine.layout(caption))
+
+    def grow(step_words=3, incremental=True):
+        prev = None
+        for n in range(step_words, len(words) + 1, step_words):
+            prev = engine.layout(' '.join(words[:n]), prev if incremental else None)
+
+    bench(f"legenda crescendo até {len(words)} palavras, completa", lambda: grow(incremental=False), 50)
+    bench(f"legenda crescendo até {len(words)} palavras, incremental", grow, 50)
+    print(f"  cache de larguras: {engine.cache_hit_rate()*100:.1f}% de acertos")
+    print("Tudo certo." if not failures else f"{failures} falha(s).")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,148 @@
+from collections import deque
+
+SENTENCE_END = ('.', '?', '!')
+
+
+class CommitTracker:
+    """
+    Controla quanto da hipótese atual do Google já foi legendado.
+    Os resultados parciais repetem a frase inteira desde o último final;
+    aqui guardamos quantas palavras já foram enviadas e só liberamos o
+    trecho novo, e apenas quando ele se manteve igual em `stability`
+    parciais seguidos (o Google costuma reescrever as últimas palavras).
+    """
+
+    def __init__(self, max_words=12, stability=2, min_chars=10):
+        self.max_words = max_words
+        self.stability = stability
+        self.min_chars = min_chars
+        self.committed = 0                 # Palavras da hipótese atual já legendadas
+        self._history = deque(maxlen=stability)
+
+        self.stats = {
+            'parciais': 0,
+            'finais': 0,
+            'commits': 0,
+            'caracteres': 0,   # Caracteres enviados para tradução
+        }
+
+    def _stable_length(self, words):
+        """Quantas palavras iniciais se repetiram nos últimos parciais."""
+        if len(self._history) < self.stability:
+            return 0
+        stable = len(words)
+        for previous in self._history:
+            limit = min(stable, len(previous))
+            i = 0
+            while i < limit and previous[i] == words[i]:
+                i += 1
+            stable = i
+        return stable
+
+    def _commit(self, words, end, kind):
+        segment = " ".join(words[self.committed:end])
+        self.committed = end
+        self.stats['commits'] += 1
+        self.stats['caracteres'] += len(segment)
+        return [(segment, kind)]
+
+    def update(self, transcript, is_final):
+        """
+        Recebe o resultado do Google e retorna a lista de trechos novos para
+        legendar, como (texto, tipo) com tipo "final", "pontuacao" ou "limite".
+        """
+        words = transcript.split()
+
+        if is_final:
+            self.stats['finais'] += 1
+            # O final pode ser mais curto que o já comitado (o Google revisou)
+            self.committed = min(self.committed, len(words))
+            segments = self._commit(words, len(words), "final") if self.committed < len(words) else []
+            self.reset()
+            return segments
+
+        self.stats['parciais'] += 1
+        stable = self._stable_length(words)
+        self._history.append(words)
+        if stable <= self.committed:
+            return []
+
+        # 1. Pontuação: comita até o último fim de frase estável
+        for end in range(stable, self.committed, -1):
+            if words[end - 1].endswith(SENTENCE_END):
+                if len(" ".join(words[self.committed:end])) > self.min_chars:
+                    return self._commit(words, end, "pontuacao")
+                break
+
+        # 2. Limite de palavras: comita o trecho estável acumulado
+        if stable - self.committed >= self.max_words:
+            return self._commit(words, stable, "limite")
+        return []
+
+    def pending_words(self, transcript):
+        """Palavras da hipótese atual ainda não legendadas (para o preview)."""
+        return transcript.split()[self.committed:]
+
+    def reset(self):
+        self.committed = 0
+        self._history.clear()
+
+
+def legacy_commits(responses, max_words=12):
+    """Regras antigas de transcribe_stream (traduzem a hipótese inteira)."""
+    current_sentence = ""
+    segments = []
+    for transcript, is_final in responses:
+        words = transcript.split()
+        if is_final:
+            if transcript != current_sentence:
+                current_sentence = transcript
+                segments.append(transcript)
+        elif any(p in transcript for p in ['. ', '? ', '! ']) and len(words) >= 5:
+            last = max(transcript.rfind('. '), transcript.rfind('? '), transcript.rfind('! '))
+            complete_part = transcript[:last + 1].strip()
+            if last > 0 and complete_part != current_sentence and len(complete_part) > 10:
+                current_sentence = complete_part
+                segments.append(complete_part)
+        elif len(words) >= max_words and transcript != current_sentence and len(transcript) > 20:
+            current_sentence = transcript
+            segments.append(transcript)
+    return segments
+
+
+if __name__ == '__main__':
+    # Reproduz um stream de respostas gravado e compara chamadas/caracteres:
+    #   python commit_tracker.py respostas.jsonl
+    # Cada linha: {"transcript": "...", "is_final": false, "t": 12.3}
+    import json
+    import sys
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        responses = [(r["transcript"], r["is_final"]) for r in rows]
+        minutes = max((rows[-1].get("t", 0) - rows[0].get("t", 0)) / 60, 1 / 60)
+    else:
+        # Exemplo sintético: cada frase cresce palavra por palavra, como no Google
+        # (uma com pontuação nos parciais, outra longa sem pontuação)
+        utterances = [
+            "Today we are going to read the book of Romans. Paul writes to the church in Rome.",
+            "and he tells them that nothing can separate us from the love of God which is in "
+            "Christ Jesus our Lord so let us stand firm in the faith and encourage one another",
+        ]
+        responses = []
+        for utterance in utterances:
+            words = utterance.split()
+            for i in range(1, len(words) + 1):
+                responses.append((" ".join(words[:i]), False))
+                responses.append((" ".join(words[:i]), False))
+            responses.append((utterance, True))
+        words = " ".join(utterances).split()
+        minutes = len(words) / 130   # ~130 palavras por minuto
+
+    old = legacy_commits(responses)
+    tracker = CommitTracker()
+    new = [seg for transcript, is_final in responses for seg, _ in tracker.update(transcript, is_final)]
+    old_chars = sum(len(s) for s in old)
+    print(f"Antigo: {len(old)/minutes:.1f} traduções/min, {old_chars/minutes:.0f} caracteres/min")
+    print(f"Novo:   {len(new)/minutes:.1f} traduções/min, {tracker.stats['caracteres']/minutes:.0f} caracteres/min")
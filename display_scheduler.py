@@ -0,0 +1,367 @@
+"""
+Agenda o que aparece na tela do ProPresenter.
+
+- cada legenda fica pelo menos `min_dwell` segundos (telas intermediárias de
+  um texto longo ficam o tempo de leitura delas)
+- no máximo `max_rate` atualizações por segundo (poupa a API HTTP)
+- se chegam legendas enquanto a tela atual cumpre o tempo, elas são unidas e
+  diagramadas de novo numa só atualização (as que não ganharam tela própria
+  contam como suprimidas); a união é diagramada aos poucos, conforme as
+  legendas chegam: cada uma só estende o texto anterior
+- com fala contínua a tela não pode ficar mais que `max_lag` segundos atrás:
+  as telas que ainda faltam do texto atual são unidas às legendas novas e as
+  telas mais antigas da união são descartadas (a transcrição e os celulares
+  continuam com o texto inteiro)
+- a tela é limpa depois de `idle_clear` segundos sem legenda nova
+
+O relógio e o sleep são injetáveis: com VirtualClock o comportamento pode
+ser conferido sem esperar o tempo real.
+"""
+import asyncio
+import heapq
+import time
+
+
+class VirtualClock:
+    """
+    Relógio virtual: `sleep` só termina quando `advance` passa do instante
+    de acordar. Usado nas conferências do agendador.
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self._timers = []
+        self._seq = 0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._timers, (self.now + max(0.0, seconds), self._seq, future))
+        await future
+
+    @staticmethod
+    async def _settle():
+        # Deixa as tarefas acordadas rodarem até voltarem a esperar
+        for _ in range(20):
+            await asyncio.sleep(0)
+
+    async def advance(self, seconds):
+        target = self.now + seconds
+        await self._settle()
+        while self._timers and self._timers[0][0] <= target:
+            wake_at, _, future = heapq.heappop(self._timers)
+            if future.done():
+                continue
+            self.now = wake_at
+            future.set_result(None)
+            await self._settle()
+        self.now = target
+        await self._settle()
+
+
+class _Entry:
+    def __init__(self, text, frames, trace, submitted_at, continuation=False):
+        self.text = text
+        self.frames = frames
+        self.trace = trace
+        self.submitted_at = submitted_at
+        self.continuation = continuation    # Telas que sobraram de um texto já na tela
+
+
+class DisplayScheduler:
+    """
+    Um por tela (idioma). `show(texto, trace)` envia sem bloquear
+    (PresenterClient.submit); `layout(texto, anterior)` é o
+    CaptionLayout.layout, usado para diagramar as legendas unidas
+    reaproveitando a diagramação de `anterior` (o começo do mesmo texto).
+    """
+
+    def __init__(self, show, layout, min_dwell=1.0, max_rate=2.0, idle_clear=15.0, max_lag=8.0,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        self.show = show
+        self.layout = layout
+        self.min_dwell = min_dwell
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.idle_clear = idle_clear
+        self.max_lag = max_lag
+        self.clock = clock
+        self.sleep = sleep
+
+        self._queue = []
+        self._merged = None     # Layout da união da fila (com 2+ legendas)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._on_screen = False
+        self._last_update = float("-inf")
+        self._hold_until = float("-inf")    # Tela atual não pode ser trocada antes disso
+
+        self.stats = {
+            'recebidas': 0,
+            'atualizacoes': 0,    # Telas enviadas (inclui limpezas)
+            'suprimidas': 0,      # Legendas unidas a outras, sem tela própria
+            'agrupamentos': 0,
+            'telas_descartadas': 0,   # Telas antigas puladas para não passar de max_lag
+            'limpezas': 0,
+            'espera_total': 0.0,  # Tempo esperando o tempo mínimo/limite de taxa
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, text, frames, trace=None):
+        """Enfileira uma legenda (não bloqueia)."""
+        self.stats['recebidas'] += 1
+        self._queue.append(_Entry(text, frames, trace, self.clock()))
+        self._extend_merged(text)
+        self._wakeup.set()
+
+    @staticmethod
+    def _joined(entries):
+        return ' '.join(' '.join(entry.text.split()) for entry in entries if entry.text.strip())
+
+    def _extend_merged(self, text):
+        """Estende a diagramação da união da fila com a legenda que acabou de chegar."""
+        text = ' '.join(text.split())
+        if len(self._queue) < 2:
+            self._merged = None
+            return
+        if not text:
+            return
+        previous = self._merged
+        if previous is None:
+            previous = self.layout(self._joined(self._queue[:-1]))
+        self._merged = self.layout(f"{previous.text} {text}" if previous.text else text, previous)
+
+    def backlog(self):
+        return len(self._queue)
+
+    def _update(self, text, traces=()):
+        now = self.clock()
+        self._last_update = now
+        self.stats['atualizacoes'] += 1
+        # A primeira legenda (a mais antiga) mede a latência até a tela;
+        # as unidas a ela aparecem junto
+        first, *others = traces or (None,)
+        self.show(text, first)
+        for trace in others:
+            if trace is not None:
+                trace.finish(delivered=True)
+        return now
+
+    def clear_now(self):
+        """Limpa a tela já (comando do operador): descarta o que estava na fila."""
+        for entry in self._queue:
+            if entry.trace is not None:
+                entry.trace.finish(delivered=False)
+        self._queue.clear()
+        self._merged = None
+        self._update("")
+        self._on_screen = False
+        self._hold_until = self._last_update
+
+    async def _wait_for_caption(self, timeout):
+        """True se chegou legenda; False se passou `timeout` (None = sem limite)."""
+        self._wakeup.clear()
+        if self._queue:
+            return True
+        if timeout is None:
+            await self._wakeup.wait()
+            return True
+        if timeout <= 0:
+            return False
+        waiter = asyncio.ensure_future(self._wakeup.wait())
+        timer = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait({waiter, timer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            timer.cancel()
+        return bool(self._queue)
+
+    async def _wait_for_slot(self):
+        """Espera a tela atual cumprir o tempo mínimo e o limite de taxa."""
+        ready_at = max(self._hold_until, self._last_update + self.min_interval)
+        delay = ready_at - self.clock()
+        if delay > 0:
+            self.stats['espera_total'] += delay
+            await self.sleep(delay)
+
+    def _hold(self, frame):
+        """Tempo que uma tela intermediária segura a tela."""
+        return max(self.min_dwell, frame.duration)
+
+    def _take_pending(self):
+        """Telas das legendas da fila, a fila mais recente e os traces."""
+        entries, self._queue = self._queue, []
+        newest = entries[-1].submitted_at
+        if len(entries) == 1:
+            return entries[0].frames, [entries[0].trace], newest
+        self.stats['agrupamentos'] += 1
+        self.stats['suprimidas'] += sum(not entry.continuation for entry in entries) - 1
+        text = self._joined(entries)
+        merged, self._merged = self._merged, None
+        if merged is None or merged.text != text:
+            merged = self.layout(text)
+        frames = merged.frames
+        if self.max_lag:
+            # A última tela (a mais nova) não pode aparecer mais que max_lag
+            # depois da legenda mais antiga da fila: descarta as primeiras telas
+            budget = self.max_lag - (self.clock() - entries[0].submitted_at)
+            first = 0
+            pending = sum(self._hold(frame) for frame in frames[:-1])
+            while pending > budget and first < len(frames) - 1:
+                pending -= self._hold(frames[first])
+                first += 1
+            self.stats['telas_descartadas'] += first
+            frames = frames[first:]
+        return frames, [entry.trace for entry in entries], newest
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                timeout = None
+                if self._on_screen and self.idle_clear:
+                    clear_at = max(self._hold_until, self._last_update + self.idle_clear)
+                    timeout = clear_at - self.clock()
+                if not await self._wait_for_caption(timeout):
+                    self._update("")
+                    self._on_screen = False
+                    self.stats['limpezas'] += 1
+                continue
+
+            await self._wait_for_slot()
+            frames, traces, submitted_at = self._take_pending()
+            if not frames:
+                shown_at = self._update("", traces)
+                self._on_screen = False
+                self._hold_until = shown_at
+                continue
+            for i, frame in enumerate(frames):
+                if i:
+                    await self._wait_for_slot()
+                if i and self.max_lag and self._queue:
+                    # Chegou fala nova: o resto deste texto entra na próxima união
+                    rest = frames[i:]
+                    text = ' '.join(' '.join(f.lines) for f in rest)
+                    self._queue.insert(0, _Entry(text, rest, None, submitted_at, continuation=True))
+                    self._merged = None
+                    break
+                shown_at = self._update(frame.text, traces if i == 0 else ())
+                self._on_screen = True
+                # Telas intermediárias ficam o tempo de leitura; a última, o mínimo
+                last = i == len(frames) - 1
+                self._hold_until = shown_at + (self.min_dwell if last else self._hold(frame))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for entry in self._queue:
+            if entry.trace is not None:
+                entry.trace.finish(delivered=False)
+        self._queue.clear()
+
+
+if __name__ == '__main__':
+    # Conferências com relógio virtual (instantâneas e determinísticas)
+    from caption_layout import CaptionLayout, FontMetrics
+
+    engine = CaptionLayout(FontMetrics(size=48))
+
+    async def scenario(submissions, until, **options):
+        """`submissions`: [(instante, texto)]. Retorna [(instante, texto mostrado)] e o agendador."""
+        clock = VirtualClock()
+        shown = []
+        scheduler = DisplayScheduler(lambda text, trace: shown.append((clock(), text)), engine.layout,
+                                     clock=clock, sleep=clock.sleep, **options)
+        scheduler.start()
+        for at, text in submissions:
+            await clock.advance(at - clock())
+            scheduler.submit(text, engine.paginate(text))
+        await clock.advance(until - clock())
+        await scheduler.close()
+        return shown, scheduler
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    async def run():
+        results = []
+        options = dict(min_dwell=1.0, max_rate=2.0, idle_clear=5.0)
+
+        # Rajada: 10 commits de pontuação em 0.45s
+        burst = [(0.05 * i, f"Frase curta {i}.") for i in range(10)]
+        incremental = engine.stats['incrementais']
+        shown, scheduler = await scenario(burst, 20.0, **options)
+        incremental = engine.stats['incrementais'] - incremental
+        captions = [(t, text) for t, text in shown if text]
+        gaps = [b[0] - a[0] for a, b in zip(shown, shown[1:])]
+        words = ' '.join(text for _, text in captions).replace('\n', ' ')
+        results.append(check("rajada: nenhuma tela antes do tempo mínimo", min(gaps) >= 1.0 - 1e-9,
+                             f"{len(captions)} telas para 10 legendas, menor intervalo {min(gaps):.2f}s"))
+        results.append(check("rajada: nenhuma frase perdida", all(f"{i}." in words for i in range(10)),
+                             f"{scheduler.stats['suprimidas']} suprimidas em {scheduler.stats['agrupamentos']} agrupamento(s)"))
+        results.append(check("rajada: união diagramada aos poucos", incremental >= scheduler.stats['suprimidas'],
+                             f"{incremental} diagramações incrementais"))
+        results.append(check("tela limpa depois de 5s parada", shown[-1][1] == "" and abs(shown[-1][0] - (captions[-1][0] + 5.0)) < 1e-9,
+                             f"limpa em t={shown[-1][0]:.2f}s (última legenda em t={captions[-1][0]:.2f}s)"))
+
+        # Limite de taxa maior que o tempo mínimo
+        spaced = [(0.3 * i, f"Legenda {i}.") for i in range(6)]
+        shown, scheduler = await scenario(spaced, 4.0, min_dwell=0.1, max_rate=2.0, idle_clear=0)
+        gaps = [b[0] - a[0] for a, b in zip(shown, shown[1:])]
+        results.append(check("no máximo 2 atualizações por segundo", min(gaps) >= 0.5 - 1e-9,
+                             f"{len(shown)} atualizações, menor intervalo {min(gaps):.2f}s"))
+
+        # Texto longo: as telas ficam o tempo de leitura
+        long_text = ("Porque Deus amou o mundo de tal maneira que deu o seu Filho unigênito, para que todo "
+                     "aquele que nele crê não pereça, mas tenha a vida eterna.")
+        frames = engine.paginate(long_text)
+        shown, scheduler = await scenario([(0.0, long_text)], 20.0, **options)
+        page_gap = shown[1][0] - shown[0][0]
+        results.append(check("texto longo: primeira tela fica o tempo de leitura",
+                             abs(page_gap - frames[0].duration) < 1e-9 and len(shown) == len(frames) + 1,
+                             f"{len(frames)} telas, troca em {page_gap:.1f}s"))
+
+        # Legendas espaçadas: nada é suprimido nem atrasado
+        calm = [(2.0 * i, f"Legenda calma {i}.") for i in range(5)]
+        shown, scheduler = await scenario(calm, 12.0, **options)
+        delays = [t - at for (at, _), (t, _) in zip(calm, shown)]
+        results.append(check("ritmo normal: sem atraso nem supressão",
+                             scheduler.stats['suprimidas'] == 0 and max(delays) == 0,
+                             f"{scheduler.stats['atualizacoes']} atualizações"))
+
+        # Fala contínua por 60s, frases longas (duas telas) a cada 4s: sem
+        # limite cada frase atrasa a tela ~3s a mais; com max_lag fica limitado
+        speech = [(4.0 * i, "Porque Deus amou o mundo de tal maneira que deu o seu Filho unigênito, "
+                            f"para que todo aquele que nele crê não pereça marco{i}.") for i in range(15)]
+
+        def lags(shown):
+            """Atraso de cada legenda até a palavra final dela aparecer na tela."""
+            found = {}
+            for at, (submitted, text) in enumerate(speech):
+                marker = f"marco{at}."
+                for t, screen in shown:
+                    if t >= submitted and marker in screen.split():
+                        found[at] = t - submitted
+                        break
+            return found
+
+        shown, unlimited = await scenario(speech, 200.0, max_lag=0, **options)
+        behind = max(lags(shown).values())
+        shown, scheduler = await scenario(speech, 200.0, max_lag=8.0, **options)
+        limited = lags(shown)
+        bound = 8.0 + options['min_dwell'] + 1.0 / options['max_rate']
+        results.append(check("fala contínua: tela no máximo max_lag atrás",
+                             max(limited.values()) <= bound and len(speech) - 1 in limited and behind > bound,
+                             f"atraso máximo {max(limited.values()):.1f}s com max_lag=8 "
+                             f"(sem limite: {behind:.1f}s), {scheduler.stats['telas_descartadas']} telas descartadas"))
+        print("Tudo certo." if all(results) else "Há conferências com falha.")
+        return all(results)
+
+    raise SystemExit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,255 @@
+"""
+Serviços falsos (locais) para medir e testar o sistema sem rede,
+microfone ou credenciais do Google.
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from recognition_backends import make_response
+
+SILENCE = b"\x00"
+
+
+class _InjectedFailures:
+    """
+    Falhas sob demanda para os clientes de streaming falsos: `fail(streams)`
+    derruba o stream atual e faz as próximas `streams` aberturas falharem
+    (como o Google fora do ar).
+    """
+
+    def _init_failures(self):
+        self._failing_opens = 0
+        self._broken = False
+
+    def fail(self, streams=0):
+        self._broken = True
+        self._failing_opens = streams
+
+    def _check_open(self):
+        if self._failing_opens:
+            self._failing_opens -= 1
+            raise RuntimeError("UNAVAILABLE: falha injetada ao abrir o stream")
+
+    def _check_stream(self):
+        if self._broken:
+            self._broken = False
+            raise RuntimeError("UNAVAILABLE: falha injetada no stream")
+
+
+def synthetic_sentences(count, words_per_sentence=6):
+    """Frases determinísticas: 's0w0 s0w1 ...' (cada palavra é única)."""
+    return [
+        " ".join(f"s{i}w{j}" for j in range(words_per_sentence))
+        for i in range(count)
+    ]
+
+
+def synthetic_sermon(sentences, pause_chunks=6, pause_after=3):
+    """
+    Gera (chunk, em_pausa) simulando uma pregação: um chunk por palavra
+    e alguns chunks de silêncio entre as frases.
+    """
+    for sentence in sentences:
+        for word in sentence.split():
+            yield word.encode(), False
+        for i in range(pause_chunks):
+            yield SILENCE, i + 1 >= pause_after
+
+
+class FakeSpeechClient(_InjectedFailures):
+    """
+    Imita SpeechAsyncClient.streaming_recognize. Cada chunk de áudio é uma
+    palavra (ou SILENCE); emite resultados parciais a cada palavra e um
+    final no primeiro silêncio. Como o Google, derruba streams mais longos
+    que `max_duration`.
+    """
+
+    def __init__(self, max_duration=305.0, response_delay=0.0, clock=time.monotonic):
+        self.max_duration = max_duration
+        self.response_delay = response_delay
+        self.clock = clock
+        self.streams_opened = 0
+        self.audio_chunks = 0
+        self._init_failures()
+
+    async def streaming_recognize(self, requests):
+        self._check_open()
+        self.streams_opened += 1
+        return self._recognize(requests, self.clock())
+
+    async def _emit(self, response):
+        if self.response_delay:
+            await asyncio.sleep(self.response_delay)
+        return response
+
+    async def _recognize(self, requests, opened_at):
+        words = []
+        async for request in requests:
+            chunk = request.get("audio_content") if isinstance(request, dict) else getattr(request, "audio_content", None)
+            if not chunk:
+                continue
+            self.audio_chunks += 1
+            self._check_stream()
+            if self.clock() - opened_at > self.max_duration:
+                raise RuntimeError("OUT_OF_RANGE: Exceeded maximum allowed stream duration")
+            if chunk == SILENCE:
+                if words:
+                    yield await self._emit(make_response(" ".join(words), True))
+                    words = []
+                continue
+            words.append(chunk.decode())
+            yield await self._emit(make_response(" ".join(words), False))
+        if words:
+            yield await self._emit(make_response(" ".join(words), True))
+
+
+class ScriptedSpeechClient(_InjectedFailures):
+    """
+    Imita SpeechAsyncClient.streaming_recognize a partir de um roteiro:
+    [{"start": 1.0, "end": 3.2, "text": "..."}] em segundos de áudio.
+    As palavras são distribuídas entre start e end e viram resultados
+    parciais conforme o áudio passa (`audio_clock`); o final sai
+    `final_delay` segundos depois do fim da frase. Como o Google, os parciais
+    não trazem a pontuação final (só o final tem) e o parcial atual é repetido
+    a cada `repeat_interval` segundos de áudio (0 = não repete).
+    """
+
+    def __init__(self, script, audio_clock, interim_delay=0.1, final_delay=0.3, poll=0.02,
+                 repeat_interval=0.0):
+        self.script = sorted(script, key=lambda u: u["start"])
+        self.audio_clock = audio_clock
+        self.interim_delay = interim_delay
+        self.final_delay = final_delay
+        self.poll = poll
+        self.repeat_interval = repeat_interval
+        self._cursor = 0          # Próxima frase do roteiro (compartilhado entre streams)
+        self.streams_opened = 0
+        self.audio_bytes = 0
+        self.final_times = {}     # índice da frase → momento do final (time.monotonic)
+        self._init_failures()
+
+    async def streaming_recognize(self, requests):
+        self._check_open()
+        self.streams_opened += 1
+        return self._recognize(requests)
+
+    async def _drain(self, requests):
+        async for request in requests:
+            chunk = getattr(request, "audio_content", None) if not isinstance(request, dict) else request.get("audio_content")
+            if chunk:
+                self.audio_bytes += len(chunk)
+
+    async def _recognize(self, requests):
+        drain = asyncio.create_task(self._drain(requests))
+        words_sent = 0
+        last_sent_at = 0.0
+        try:
+            while not drain.done() and self._cursor < len(self.script):
+                self._check_stream()
+                utterance = self.script[self._cursor]
+                now = self.audio_clock()
+                words = utterance["text"].split()
+                duration = max(utterance["end"] - utterance["start"], 1e-6)
+
+                if now >= utterance["end"] + self.final_delay:
+                    self.final_times[self._cursor] = time.monotonic()
+                    self._cursor += 1
+                    words_sent = 0
+                    yield make_response(utterance["text"], True)
+                    continue
+
+                heard = int(len(words) * (now - utterance["start"] - self.interim_delay) / duration)
+                heard = max(0, min(heard, len(words)))
+                repeat = self.repeat_interval and words_sent and now - last_sent_at >= self.repeat_interval
+                if heard > words_sent or repeat:
+                    words_sent = max(heard, words_sent)
+                    last_sent_at = now
+                    yield make_response(" ".join(words[:words_sent]).rstrip(".?!"), False)
+                await asyncio.sleep(self.poll)
+            await drain
+        finally:
+            drain.cancel()
+
+
+class FakeTranslationClient:
+    """
+    Imita TranslationServiceAsyncClient.translate_text. A "tradução" é o
+    texto em maiúsculas, para ser reconhecível na saída.
+    `failure` injeta falhas: "erro" (responde com erro) ou "sem_resposta"
+    (a chamada nunca termina, como um endpoint morto).
+    """
+
+    def __init__(self, delay=0.15):
+        self.delay = delay
+        self.failure = None
+        self.calls = 0
+        self.characters = 0
+        self.transport = SimpleNamespace(close=self._close)
+
+    async def _close(self):
+        pass
+
+    async def translate_text(self, parent, contents, source_language_code,
+                             target_language_code, mime_type="text/plain"):
+        self.calls += 1
+        self.characters += sum(len(c) for c in contents)
+        if self.failure == "sem_resposta":
+            await asyncio.Event().wait()
+        if self.failure == "erro":
+            raise RuntimeError("503 Service Unavailable (falha injetada)")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return SimpleNamespace(translations=[
+            SimpleNamespace(translated_text=text.upper()) for text in contents
+        ])
+
+
+class FakePresenterServer:
+    """
+    Servidor HTTP local que imita a API /v1/stage/message do ProPresenter.
+    Guarda (momento, texto) de cada legenda recebida. Com `failing` ligado
+    responde 503 (falha injetada) e não guarda nada.
+    """
+
+    def __init__(self, delay=0.0, host="127.0.0.1", port=0):
+        self.delay = delay
+        self.failing = False
+        self.received = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_PUT(self):
+                length = int(self.headers.get("Content-Length", 0))
+                text = json.loads(self.rfile.read(length) or b'""')
+                if server.delay:
+                    time.sleep(server.delay)
+                if server.failing:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                server.received.append((time.monotonic(), text))
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.host, self.port = self._httpd.server_address
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -1,248 +1,285 @@
-import re
 import time
-import numpy as np
+# Antes das importações: base do tempo até "pronto"
+STARTED_AT = time.perf_counter()
+import math
 import asyncio
-import pyaudio
 import os
 import sys
+import threading
 from dotenv import load_dotenv
 from collections import deque
 
-# Importações do Google Cloud
-from google.cloud import speech_v1p1beta1 as speech
-from google.cloud import translate
-
-# Importação da sua API de Apresentação
-from presenter_api import send_text_to_presenter
+# Só módulos leves aqui: google.cloud, numpy, PyAudio, requests e os módulos de
+# áudio são importados em main(), numa thread, enquanto as conexões abrem (startup.py)
+from translator import TranslationClient
+from translation_backends import create_translation_backend, parse_model_paths
+from translation_cache import TranslationCache
+from commit_tracker import CommitTracker
+from biblical_references import preprocess_biblical_references, postprocess_biblical_references
+from stream_session import iterate_in_thread
+from audio_encoding import create_audio_encoder
+from metrics import Metrics, MetricsServer
+from pipeline import CaptionPipeline
+from speculation import SpeculativeTranslator
+from caption_layout import CaptionLayout, load_font_metrics
+from display_scheduler import DisplayScheduler
+from caption_broadcast import BroadcastServer
+from transcript_recorder import create_transcript_recorder, export_session
+from startup import StartupTimer, preload, prewarm
+from supervisor import CircuitOpenError, HealthMonitor, Supervisor
 
 load_dotenv()
 
-# Configurações do Áudio
-FORMAT = pyaudio.paInt16
+# Configurações do Áudio (formato: 16 bits, pyaudio.paInt16)
 CHANNELS = int(os.getenv("CHANNELS"))
 RATE = int(os.getenv("RATE"))
 CHUNK = int(os.getenv("CHUNK"))
 
+# Pré-processamento antes do reconhecimento: mono, reamostrado para AUDIO_TARGET_RATE
+# (0 = áudio como vem da placa), passa-altas e normalização de ganho (0 = desligados)
+AUDIO_TARGET_RATE = int(os.getenv("AUDIO_TARGET_RATE", "16000"))
+AUDIO_HIGHPASS_HZ = float(os.getenv("AUDIO_HIGHPASS_HZ", "80"))
+AUDIO_TARGET_LEVEL = float(os.getenv("AUDIO_TARGET_LEVEL", "-20"))
+AUDIO_MAX_GAIN = float(os.getenv("AUDIO_MAX_GAIN", "6"))
+# Formato do áudio que chega ao filtro de voz e ao reconhecimento
+STT_RATE = AUDIO_TARGET_RATE or RATE
+STT_CHANNELS = 1 if AUDIO_TARGET_RATE else CHANNELS
+STT_CHUNK = CHUNK * STT_RATE // RATE
+# Codec do áudio enviado ao Google: "linear16" (sem compressão), "flac" ou "ogg_opus"
+AUDIO_ENCODING = os.getenv("AUDIO_ENCODING", "linear16").lower()
+
 SILENCE_THRESHOLD = float(os.getenv("SILENCE_THRESHOLD"))
 # Para pregação com intérprete, queremos detectar pausas curtas (2-3 segundos)
 PAUSE_DETECTION_TIME = float(os.getenv("PAUSE_DETECTION_TIME", "2.0"))
+# Pausa curta usada para trocar de stream do Google sem cortar palavras
+ROLLOVER_PAUSE_TIME = float(os.getenv("ROLLOVER_PAUSE_TIME", "0.3"))
+
+# Detecção de voz: "rms" (limiar fixo), "webrtc" ou "adaptive" (ruído da sala)
+VAD_MODE = os.getenv("VAD_MODE", "webrtc").lower()
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+# Áudio guardado antes da fala, para não cortar as primeiras sílabas
+VAD_PREROLL = float(os.getenv("VAD_PREROLL", "0.3"))
+
 GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID')
 
+# Reconhecimento de fala: "google" (streaming na nuvem) ou "local" (Vosk na CPU, sem rede)
+RECOGNITION_BACKEND = os.getenv("RECOGNITION_BACKEND", "google").lower()
+LOCAL_RECOGNITION_MODEL = os.getenv("LOCAL_RECOGNITION_MODEL", "")
+
 # Modo de operação: "interpreter" ou "continuous"
 OPERATION_MODE = os.getenv("OPERATION_MODE", "interpreter").lower()
 
+# Diagramação das legendas: fonte/tamanho e área útil (px) do texto no ProPresenter,
+# linhas por tela e velocidade de leitura (caracteres/s) para o tempo de cada tela
+CAPTION_FONT_METRICS = os.getenv("CAPTION_FONT_METRICS", "")
+CAPTION_FONT_SIZE = float(os.getenv("CAPTION_FONT_SIZE", "48"))
+CAPTION_MAX_WIDTH = float(os.getenv("CAPTION_MAX_WIDTH", "1320"))
+CAPTION_MAX_LINES = int(os.getenv("CAPTION_MAX_LINES", "2"))
+CAPTION_READING_SPEED = float(os.getenv("CAPTION_READING_SPEED", "15"))
+CAPTION_MIN_DURATION = float(os.getenv("CAPTION_MIN_DURATION", "1.5"))
+CAPTION_MAX_DURATION = float(os.getenv("CAPTION_MAX_DURATION", "6.0"))
+# Ritmo da tela: tempo mínimo de cada legenda, atualizações por segundo, limpeza sem fala
+# e atraso máximo da tela em fala contínua
+DISPLAY_MIN_DWELL = float(os.getenv("DISPLAY_MIN_DWELL", "1.0"))
+DISPLAY_MAX_RATE = float(os.getenv("DISPLAY_MAX_RATE", "2.0"))
+DISPLAY_IDLE_CLEAR = float(os.getenv("DISPLAY_IDLE_CLEAR", "15"))
+DISPLAY_MAX_LAG = float(os.getenv("DISPLAY_MAX_LAG", "8"))
+
 # Limite de palavras para forçar commit (evita previews gigantes)
 MAX_WORDS_BEFORE_COMMIT = int(os.getenv("MAX_WORDS_BEFORE_COMMIT", "12"))
 
+# Métricas de latência por etapa: endpoint HTTP local (0 = desligado) e log JSON-lines
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LOG = os.getenv("METRICS_LOG", "")
+
+# Legendas para celulares e salas anexas (SSE/WebSocket na rede local, 0 = desligado)
+BROADCAST_PORT = int(os.getenv("BROADCAST_PORT", "0"))
+BROADCAST_HOST = os.getenv("BROADCAST_HOST", "0.0.0.0")
+BROADCAST_BACKFILL = int(os.getenv("BROADCAST_BACKFILL", "20"))
+BROADCAST_CLIENT_BUFFER = int(os.getenv("BROADCAST_CLIENT_BUFFER", "32"))
+BROADCAST_MAX_CLIENTS = int(os.getenv("BROADCAST_MAX_CLIENTS", "1000"))
+
+# Gravação da transcrição (log só de acréscimo + SRT/VTT/texto no fim; vazio = desligado)
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "")
+TRANSCRIPT_AUDIO = os.getenv("TRANSCRIPT_AUDIO", "0") == "1"
+TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "1.0"))
+
+# Resiliência: falhas seguidas que abrem o circuito da tradução/ProPresenter (as
+# chamadas passam a falhar na hora) e segundos até testar o serviço de novo
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "3"))
+CIRCUIT_RESET = float(os.getenv("CIRCUIT_RESET", "10"))
+# Tempo máximo de uma chamada ao Google Translate
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "3.0"))
+# Tradução fora do ar: "original" (texto em inglês na tela) ou "vazio" (tela limpa)
+TRANSLATION_DEGRADED_MODE = os.getenv("TRANSLATION_DEGRADED_MODE", "original").lower()
+# Espera máxima entre as reconexões do reconhecimento (cresce a cada falha seguida)
+RESTART_MAX_DELAY = float(os.getenv("RESTART_MAX_DELAY", "30"))
+
 # Eventos de controle
 STOP = asyncio.Event()
 RUNNING = asyncio.Event()
 RUNNING.set()
+# Pedido para descartar o áudio acumulado no buffer; quem limpa é a thread que
+# lê o buffer (audio_generator), o consumidor do AudioRingBuffer
+DROP_BUFFERED_AUDIO = threading.Event()
+# Cada reconexão cria um audio_generator novo; a trava garante que só uma
+# geração lê o buffer (e usa o filtro de fala) por vez
+AUDIO_READ_LOCK = threading.Lock()
 
 # Estatísticas da sessão
 session_stats = {
     'frases_transcritas': 0,
     'frases_traduzidas': 0,
+    'caracteres_traducao': 0,
+    'frases_sem_traducao': 0,
+    'traducoes_especulativas': 0,   # Chamadas de tradução de parciais, usadas ou não
     'inicio': time.time()
 }
 
-def translate_text_with_google_cloud(text: str) -> str:
+# Idiomas das legendas: uma transcrição alimenta todos (o primeiro é o principal)
+TARGET_LANGUAGES = [lang.strip() for lang in os.getenv("TARGET_LANGUAGES", "pt-BR").split(",") if lang.strip()]
+# ProPresenter de cada idioma ("es=10.5.0.3:20562,..."); o principal usa PROPRESENTER_IP/PORT
+PRESENTER_TARGETS = os.getenv("PRESENTER_TARGETS", "")
+
+# Cliente de tradução único, criado e aquecido em main()
+translation_client = None
+# Traduções em voo por idioma
+MAX_CONCURRENT_TRANSLATIONS = int(os.getenv("MAX_CONCURRENT_TRANSLATIONS", "4"))
+# Motor de tradução: "google", "local" (CPU, sem rede) ou "google+local" (reserva local
+# quando o Google falha ou passa de TRANSLATION_LATENCY_BUDGET segundos)
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google").lower()
+LOCAL_TRANSLATION_MODELS = parse_model_paths(os.getenv("LOCAL_TRANSLATION_MODELS", ""))
+LOCAL_TRANSLATION_THREADS = int(os.getenv("LOCAL_TRANSLATION_THREADS", "2"))
+TRANSLATION_LATENCY_BUDGET = float(os.getenv("TRANSLATION_LATENCY_BUDGET", "1.0"))
+# Micro-lotes: trechos que chegam dentro da janela (s) vão numa só chamada (0 = desligado)
+TRANSLATION_BATCH_WINDOW = float(os.getenv("TRANSLATION_BATCH_WINDOW", "0"))
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "8"))
+# Tradução especulativa: começa a traduzir o parcial repetido nesse número de
+# resultados seguidos (0 = desligada, padrão: gera chamadas pagas a mais);
+# caracteres extras limitados a uma fração do total
+SPECULATION_UPDATES = int(os.getenv("SPECULATION_UPDATES", "0"))
+SPECULATION_MAX_EXTRA = float(os.getenv("SPECULATION_MAX_EXTRA", "0.15"))
+# Tamanho de cada fila entre as etapas do pipeline de legendas
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# Cache de traduções (vazio em TRANSLATION_CACHE_FILE = só em memória)
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2000"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))
+TRANSLATION_CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", "translation_cache.json")
+# Clientes do ProPresenter por idioma (conexão keep-alive + fila com agrupamento)
+presenter_clients = {}
+# Motor de reconhecimento (Google ou local), criado e carregado em main()
+recognition_backend = None
+# Compressão do áudio enviado ao Google (None = LINEAR16), criada em main()
+audio_encoder = None
+# Gerenciador dos streams do Google (criado em transcribe_stream)
+transcription_manager = None
+# Reinícios do reconhecimento (criado em transcribe_stream)
+recognition_supervisor = None
+# Pipelines normalização → tradução → formatação → envio, um por idioma
+caption_pipelines = {}
+# Agendadores de tela (tempo mínimo, limite de taxa, limpeza), um por ProPresenter
+display_schedulers = {}
+# Servidor de legendas para celulares (None = desligado), criado em main()
+broadcast_server = None
+# Gravação da transcrição (None = desligada), criada em main()
+transcript_recorder = None
+# Traduções especulativas dos parciais estáveis, uma por idioma
+speculators = {}
+# Captura de áudio (callback do PyAudio + buffer circular)
+audio_capture = None
+# Downmix, reamostragem e filtros entre a captura e o filtro de voz
+audio_preprocessor = None
+# Filtro de voz: decide o que é enviado (e cobrado) pelo Google
+speech_gate = None
+# Quebra de linha e paginação pela largura em pixels (cache de larguras das palavras)
+caption_layout = CaptionLayout(
+    load_font_metrics(CAPTION_FONT_METRICS, CAPTION_FONT_SIZE),
+    max_width=CAPTION_MAX_WIDTH,
+    max_lines=CAPTION_MAX_LINES,
+    reading_speed=CAPTION_READING_SPEED,
+    min_duration=CAPTION_MIN_DURATION,
+    max_duration=CAPTION_MAX_DURATION
+)
+# Histogramas de latência por etapa (captura → Google → tradução → ProPresenter)
+metrics = Metrics()
+# Estado de cada componente (normal/degradado/reiniciando), com as transições no console
+health = HealthMonitor(metrics)
+
+def create_breaker(name, degraded_mode):
+    """Circuito de um serviço remoto; `degraded_mode` descreve como o sistema segue sem ele."""
+    return health.breaker(name, degraded_mode, failure_threshold=CIRCUIT_FAILURES, reset_timeout=CIRCUIT_RESET)
+
+def create_presenter_breaker(language):
+    return create_breaker(f"propresenter {language}", "legendas só no console, celulares e transcrição")
+
+def translation_degraded_mode():
+    if "local" in TRANSLATION_BACKEND:
+        return "usando só a tradução local"
+    if TRANSLATION_DEGRADED_MODE == "vazio":
+        return "tela limpa até a tradução voltar"
+    return "texto original em inglês na tela"
+
+async def translate_text_with_google_cloud(text: str, target_language=None) -> str:
     """
     Traduz o texto usando a Google Cloud Translation API.
     Otimizado para frases completas de pregação.
+    Usa o cliente único criado em main() (sem abrir canal novo por legenda).
+    O texto chega já normalizado (preprocess_biblical_references) pelo pipeline.
     """
     if not text or len(text.strip()) < 3:
         return text
     
     try:
-        client = translate.TranslationServiceClient()
-        parent = f"projects/{GCP_PROJECT_ID}/locations/global"
-        
-        # Pré-processa o texto para melhorar referências bíblicas
-        processed_text = preprocess_biblical_references(text)
-        
-        response = client.translate_text(
-            parent=parent,
-            contents=[processed_text],
-            source_language_code="en",
-            target_language_code="pt-BR",
-            mime_type="text/plain"
-        )
+        translated = await translation_client.translate(text, target_language)
         
-        if response.translations:
+        if translated:
             session_stats['frases_traduzidas'] += 1
-            translated = response.translations[0].translated_text
             # Pós-processa a tradução para corrigir referências
-            return postprocess_biblical_references(translated)
+            return postprocess_biblical_references(translated, target_language or TARGET_LANGUAGES[0])
         return text
         
+    except CircuitOpenError:
+        # Já informado pelo monitor ([ESTADO] traducao: ... → degradado)
+        pass
     except Exception as e:
-        print(f"\n[ERRO TRADUÇÃO] {e}")
-        return text
+        print(f"\n[ERRO TRADUÇÃO] {type(e).__name__}: {e}")
+    # Modo degradado: sem tradução, mostra o texto original ou limpa a tela
+    session_stats['frases_sem_traducao'] += 1
+    return "" if TRANSLATION_DEGRADED_MODE == "vazio" else text
 
-def preprocess_biblical_references(text: str) -> str:
+async def translate_speculatively(text: str, target_language=None):
     """
-    Pré-processa o texto em inglês para melhorar o reconhecimento de referências bíblicas.
-    Converte padrões comuns de erro para o formato correto.
+    Tradução de um parcial estável (antes do final). Diferente de
+    translate_text_with_google_cloud, erros são propagados: o pipeline
+    então traduz o trecho comitado pelo caminho normal.
     """
-   
-    # Dicionário de correções comuns (erros de transcrição → correto)
-    common_errors = {
-        r'\bnumber\s+eleven\b': 'Numbers 11',
-        r'\bnumbers?\s+(\w+)\s+(\d+)': lambda m: f'Numbers {word_to_number(m.group(1))}:{m.group(2)}',
-        r'\b(genesis|exodus|leviticus|deuteronomy)\s+(\w+)\s+(\d+)': 
-            lambda m: f'{m.group(1).title()} {word_to_number(m.group(2))}:{m.group(3)}',
-    }
-    
-    text_lower = text.lower()
-    result = text
-    
-    # Padrão: "Nome_do_Livro palavra_número número"
-    # Ex: "Numbers eleven seventeen" → "Numbers 11:17"
-    bible_pattern = re.compile(
-        r'\b(genesis|exodus|leviticus|numbers|deuteronomy|joshua|judges|ruth|samuel|kings|chronicles|'
-        r'ezra|nehemiah|esther|job|psalms|proverbs|ecclesiastes|isaiah|jeremiah|ezekiel|daniel|'
-        r'hosea|joel|amos|obadiah|jonah|micah|nahum|habakkuk|zephaniah|haggai|zechariah|malachi|'
-        r'matthew|mark|luke|john|acts|romans|corinthians|galatians|ephesians|philippians|'
-        r'colossians|thessalonians|timothy|titus|philemon|hebrews|james|peter|jude|revelation)\s+'
-        r'(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
-        r'sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred)\s+'
-        r'(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|fifteen|'
-        r'sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred|'
-        r'\d+)',
-        re.IGNORECASE
-    )
-    
-    def replace_reference(match):
-        book = match.group(1).title()
-        chapter = word_to_number(match.group(2))
-        verse = match.group(3)
-        if verse.isdigit():
-            verse_num = verse
-        else:
-            verse_num = str(word_to_number(verse))
-        return f'{book} {chapter}:{verse_num}'
-    
-    result = bible_pattern.sub(replace_reference, result)
-    
-    return result
+    session_stats['traducoes_especulativas'] += 1
+    translated = await translation_client.translate(preprocess_biblical_references(text), target_language)
+    if not translated:
+        return None
+    return postprocess_biblical_references(translated, target_language or TARGET_LANGUAGES[0])
 
-def word_to_number(word: str) -> int:
+async def use_speculative_translation(prepared):
     """
-    Converte palavra numérica em inglês para número.
-    Ex: "eleven" → 11, "seventeen" → 17
+    Aguarda a tradução especulativa aceita para um trecho comitado. Só ela
+    conta como frase traduzida; as descartadas ficam em traducoes_especulativas.
     """
-    word = word.lower().strip()
-    
-    numbers = {
-        'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-        'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
-        'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
-        'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18,
-        'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40,
-        'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80,
-        'ninety': 90, 'hundred': 100
-    }
-    
-    if word in numbers:
-        return numbers[word]
-    
-    # Se já for número, retorna
-    if word.isdigit():
-        return int(word)
-    
-    return word  # Retorna original se não conseguir converter
+    translated = await prepared
+    if translated:
+        session_stats['frases_traduzidas'] += 1
+    return translated
 
-def postprocess_biblical_references(text: str) -> str:
-    """
-    Pós-processa a tradução para corrigir nomes de livros bíblicos em português.
-    """
-   
-    # Mapeamento de nomes em inglês para português
-    book_translations = {
-        'Genesis': 'Gênesis',
-        'Exodus': 'Êxodo',
-        'Leviticus': 'Levítico',
-        'Numbers': 'Números',
-        'Deuteronomy': 'Deuteronômio',
-        'Joshua': 'Josué',
-        'Judges': 'Juízes',
-        'Samuel': 'Samuel',
-        'Kings': 'Reis',
-        'Chronicles': 'Crônicas',
-        'Psalms': 'Salmos',
-        'Proverbs': 'Provérbios',
-        'Ecclesiastes': 'Eclesiastes',
-        'Isaiah': 'Isaías',
-        'Jeremiah': 'Jeremias',
-        'Ezekiel': 'Ezequiel',
-        'Daniel': 'Daniel',
-        'Matthew': 'Mateus',
-        'Mark': 'Marcos',
-        'Luke': 'Lucas',
-        'John': 'João',
-        'Acts': 'Atos',
-        'Romans': 'Romanos',
-        'Corinthians': 'Coríntios',
-        'Galatians': 'Gálatas',
-        'Ephesians': 'Efésios',
-        'Philippians': 'Filipenses',
-        'Colossians': 'Colossenses',
-        'Thessalonians': 'Tessalonicenses',
-        'Timothy': 'Timóteo',
-        'Hebrews': 'Hebreus',
-        'James': 'Tiago',
-        'Peter': 'Pedro',
-        'Revelation': 'Apocalipse'
-    }
-    
-    result = text
-    
-    # Substitui nomes de livros
-    for eng, por in book_translations.items():
-        # Padrão: Nome seguido de número:número
-        pattern = rf'\b{eng}\s+(\d+):(\d+)\b'
-        replacement = rf'{por} \1:\2'
-        result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    
-    return result
-
-def format_text_for_display(text, max_chars_per_line=55, max_lines=2):
+def format_text_for_display(text):
     """
     Formata texto para exibição no ProPresenter.
-    Otimizado para frases de pregação (geralmente curtas).
+    Quebra as linhas pela largura real na tela (métricas da fonte) e divide
+    textos longos em várias telas, cada uma com tempo de leitura; nada é cortado.
+    Retorna a lista de telas (caption_layout.Frame).
     """
     if not text:
-        return ""
-    
-    # Remove espaços extras
-    text = ' '.join(text.split())
-    
-    if len(text) <= max_chars_per_line:
-        return text
-
-    words = text.split()
-    lines = []
-    current_line = []
-    current_length = 0
-
-    for word in words:
-        word_length = len(word) + (1 if current_line else 0)
-        if current_length + word_length <= max_chars_per_line:
-            current_line.append(word)
-            current_length += word_length
-        else:
-            if current_line:
-                lines.append(' '.join(current_line))
-                if len(lines) >= max_lines:
-                    break
-            current_line = [word]
-            current_length = len(word)
-    
-    if current_line and len(lines) < max_lines:
-        lines.append(' '.join(current_line))
-    
-    return '\n'.join(lines)
+        return []
+    return caption_layout.paginate(' '.join(text.split()))
 
 async def monitor_keyboard():
     """
@@ -295,8 +332,13 @@ async def monitor_keyboard():
             elif key == "c":
                 print("\n[SISTEMA] 🗑 Limpando tela do ProPresenter...")
                 try:
-                    send_text_to_presenter("")
-                    print("[SISTEMA] ✓ Tela limpa")
+                    for language, client in presenter_clients.items():
+                        scheduler = display_schedulers.get(language)
+                        if scheduler is not None:
+                            scheduler.clear_now()
+                        else:
+                            client.submit("")
+                    print("[SISTEMA] ✓ Limpeza enviada")
                 except Exception as e:
                     print(f"[ERRO] Não foi possível limpar: {e}")
             elif key == "s":
@@ -310,6 +352,104 @@ async def monitor_keyboard():
                 print(f"  Tempo decorrido: {mins}min {secs}s")
                 print(f"  Frases transcritas: {session_stats['frases_transcritas']}")
                 print(f"  Frases traduzidas: {session_stats['frases_traduzidas']}")
+                if session_stats['traducoes_especulativas']:
+                    print(f"  Traduções especulativas (usadas ou não): {session_stats['traducoes_especulativas']}")
+                if session_stats['frases_sem_traducao']:
+                    print(f"  Frases sem tradução (modo degradado): {session_stats['frases_sem_traducao']}")
+                degraded = health.degraded()
+                print(f"  Estado: {'normal' if not degraded else ', '.join(f'{name} {state}' for name, state, _ in degraded)}"
+                      f" ({len(health.transitions)} transições)")
+                if recognition_supervisor is not None and recognition_supervisor.stats['reinicios']:
+                    print(f"  Reconexões do reconhecimento: {recognition_supervisor.stats['reinicios']} "
+                          f"({recognition_supervisor.stats['espera_total']:.1f}s esperando)")
+                print(f"  Caracteres para tradução: {session_stats['caracteres_traducao']} "
+                      f"({session_stats['caracteres_traducao'] / max(elapsed / 60, 1):.0f}/min)")
+                if translation_client is not None:
+                    print(f"  Latência média da tradução: {translation_client.average_latency()*1000:.0f}ms "
+                          f"({translation_client.stats['chamadas']} chamadas, "
+                          f"{translation_client.average_batch_size():.2f} trechos por chamada, "
+                          f"motor {translation_client.backend.name})")
+                    backend_stats = getattr(translation_client.backend, 'stats', None)
+                    if backend_stats and 'reserva' in backend_stats:
+                        print(f"  Tradução reserva: {backend_stats['reserva']} chamadas "
+                              f"({backend_stats['estouros']} por latência, {backend_stats['falhas']} por erro, "
+                              f"{backend_stats['recusadas']} com o circuito aberto)")
+                    print(f"  Economia por legenda (cliente reutilizado): {translation_client.saved_per_caption()*1000:.0f}ms")
+                    cache = translation_client.cache
+                    print(f"  Cache de tradução: {cache.hit_rate()*100:.0f}% de acertos "
+                          f"({cache.stats['acertos']} de {cache.stats['acertos'] + cache.stats['falhas']}), "
+                          f"{translation_client.cache_time_saved():.1f}s economizados")
+                if audio_capture is not None:
+                    audio_stats = audio_capture.stats()
+                    print(f"  Áudio: {audio_stats['overflows']} overflows, {audio_stats['underruns']} underruns, "
+                          f"jitter médio {audio_stats['jitter_medio']*1000:.1f}ms "
+                          f"(máx. {audio_stats['jitter_max']*1000:.1f}ms)")
+                if audio_preprocessor is not None:
+                    print(f"  Pré-processamento: {audio_preprocessor.bandwidth_ratio()*100:.0f}% da banda original, "
+                          f"{audio_preprocessor.real_time_factor()*100:.2f}% de CPU por segundo de áudio, "
+                          f"ganho {20 * math.log10(audio_preprocessor.gain.gain) if audio_preprocessor.gain else 0:+.1f} dB")
+                if speech_gate is not None:
+                    print(f"  Áudio enviado ao Google: {speech_gate.sent_fraction()*100:.1f}% "
+                          f"({speech_gate.stats['bytes_enviados']/1e6:.1f} de "
+                          f"{speech_gate.stats['bytes_recebidos']/1e6:.1f} MB)")
+                if audio_encoder is not None and audio_encoder.stats['audio']:
+                    linear16 = audio_encoder.stats['bytes_entrada'] / audio_encoder.stats['audio'] * 60
+                    print(f"  Codec {audio_encoder.codec.upper()}: {audio_encoder.bytes_per_minute()/1024:.0f} KB/min "
+                          f"(LINEAR16: {linear16/1024:.0f} KB/min), "
+                          f"atraso médio {audio_encoder.average_delay()*1000:.0f}ms, "
+                          f"CPU {audio_encoder.average_encode_time()*1e6:.0f}µs por chunk")
+                if recognition_backend is not None and hasattr(recognition_backend, 'real_time_factor'):
+                    print(f"  Reconhecimento local: {recognition_backend.stats['finais']} finais, "
+                          f"RTF {recognition_backend.real_time_factor():.2f} "
+                          f"({recognition_backend.stats['audio']:.0f}s de áudio)")
+                if transcription_manager is not None:
+                    print(f"  Streams do Google: {transcription_manager.stats['sessoes']} "
+                          f"({transcription_manager.stats['trocas']} trocas, "
+                          f"gap máx. {transcription_manager.stats['gap_max']*1000:.0f}ms, "
+                          f"{transcription_manager.stats['finais_duplicados']} finais duplicados removidos)")
+                for language, speculator in speculators.items():
+                    print(f"  Especulação [{language}]: {speculator.hit_rate()*100:.0f}% de acertos "
+                          f"({speculator.stats['acertos']} de {speculator.stats['especulacoes']}), "
+                          f"{speculator.average_saved()*1000:.0f}ms economizados por acerto, "
+                          f"{speculator.stats['caracteres_extras']} caracteres extras")
+                for language, pipeline in caption_pipelines.items():
+                    queues = pipeline.queue_stats()
+                    print(f"  Pipeline [{language}]: filas {pipeline.queue_depths()}, "
+                          f"{sum(q['agrupadas'] for q in queues.values())} agrupadas, "
+                          f"{sum(q['descartadas'] for q in queues.values())} descartadas, "
+                          f"{pipeline.stats['fora_de_ordem']} traduções reordenadas")
+                print(f"  Diagramação: {caption_layout.stats['diagramacoes']} legendas, "
+                      f"{caption_layout.stats['varias_telas']} em mais de uma tela, "
+                      f"{caption_layout.stats['incrementais']} incrementais, "
+                      f"cache de larguras {caption_layout.cache_hit_rate()*100:.0f}%")
+                for language, scheduler in display_schedulers.items():
+                    print(f"  Tela [{language}]: {scheduler.stats['atualizacoes']} atualizações, "
+                          f"{scheduler.stats['suprimidas']} legendas unidas a outras, "
+                          f"{scheduler.stats['telas_descartadas']} telas puladas pelo atraso máximo, "
+                          f"{scheduler.stats['limpezas']} limpezas por inatividade, "
+                          f"espera total {scheduler.stats['espera_total']:.1f}s")
+                if broadcast_server is not None:
+                    print(f"  Celulares: {broadcast_server.client_count()} conectados "
+                          f"({broadcast_server.stats['conexoes']} conexões), "
+                          f"{broadcast_server.stats['enviadas']} mensagens enviadas, "
+                          f"{broadcast_server.stats['descartadas']} descartadas, "
+                          f"{broadcast_server.stats['lentos_desconectados']} lentos desconectados")
+                if transcript_recorder is not None:
+                    print(f"  Transcrição: {transcript_recorder.stats['gravados']} registros gravados "
+                          f"({transcript_recorder.stats['fsyncs']} fsyncs), "
+                          f"{transcript_recorder.average_record_time()*1e6:.0f}µs por legenda no loop"
+                          + (f", {transcript_recorder.audio.seconds()/60:.1f} min de áudio" if transcript_recorder.audio else ""))
+                for language, client in presenter_clients.items():
+                    print(f"  ProPresenter [{language}]: {client.stats['enviadas']} enviadas, "
+                          f"{client.stats['agrupadas']} agrupadas, "
+                          f"{client.stats['falhas']} falhas, "
+                          f"{client.stats['recusadas']} com o circuito aberto, "
+                          f"média {client.average_latency()*1000:.0f}ms")
+                report = metrics.report()
+                if report:
+                    print("  Latência por etapa:")
+                    for line in report:
+                        print(f"    {line}")
                 print("="*60 + "\n")
             elif key == "m":
                 OPERATION_MODE = "continuous" if OPERATION_MODE == "interpreter" else "interpreter"
@@ -327,53 +467,96 @@ async def monitor_keyboard():
         
         await asyncio.sleep(0.1)
 
-def audio_generator(stream):
+def audio_generator(capture, stop):
     """
-    Captura áudio do microfone.
+    Lê o áudio do microfone do buffer circular preenchido pela captura.
     Otimizado para detectar pausas entre pregador e intérprete.
+    Gera (chunk, em_pausa) - em_pausa indica um bom momento para trocar de stream.
+    `stop` (threading.Event) encerra esta geração do reconhecimento: depois de
+    uma reconexão, a thread antiga não lê mais o buffer.
     """
-    consecutive_silence = 0
-    silence_chunks_needed = int((PAUSE_DETECTION_TIME * RATE) / CHUNK)
-    
     while not STOP.is_set():
+        with AUDIO_READ_LOCK:
+            if stop.is_set():
+                return
+            if DROP_BUFFERED_AUDIO.is_set():
+                DROP_BUFFERED_AUDIO.clear()
+                capture.buffer.clear()
+            if not RUNNING.is_set():
+                # Pausado: descarta o áudio para o buffer não encher
+                capture.buffer.clear()
+                data = None
+            else:
+                data = capture.read()
+            if data:
+                metrics.observe('captura', capture.buffered_seconds())
+                if transcript_recorder is not None:
+                    transcript_recorder.write_audio(data)
+                if audio_preprocessor is not None:
+                    data = audio_preprocessor.process(data)
+
+                # O filtro mantém alguns chunks de silêncio (PAUSE_DETECTION_TIME)
+                # para o Google detectar a pausa, e o pre-roll antes da fala
+                chunks, in_pause = speech_gate.process(data)
         if not RUNNING.is_set():
             time.sleep(0.1)
             continue
-
-        try:
-            data = stream.read(CHUNK, exception_on_overflow=False)
-        except IOError as e:
-            print(f"\n[ERRO ÁUDIO] {e}")
-            continue
-
         if not data:
             continue
+        for chunk in chunks:
+            yield chunk, in_pause
 
-        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
-        rms = np.sqrt(np.mean(samples**2)) / 32768.0
-
-        if rms > SILENCE_THRESHOLD:
-            consecutive_silence = 0
-            yield data
-        else:
-            consecutive_silence += 1
-            # Mesmo em silêncio, envia alguns chunks para o Google detectar pausa
-            if consecutive_silence < silence_chunks_needed:
-                yield data
-        
-        time.sleep(0.002)
+def publish_caption(caption, language):
+    """
+    Publica a legenda (já traduzida e formatada) no console, na transmissão e
+    na transcrição. Chamada pelo pipeline para toda legenda, na ordem da fala,
+    antes da fila de envio (que pode descartar legendas atrasadas).
+    """
+    translated = caption.translated
+    tag = "[LEGENDA]" if len(TARGET_LANGUAGES) == 1 else f"[LEGENDA {language}]"
+    if caption.short_log:
+        print(f"{tag} {translated[:80]}{'...' if len(translated) > 80 else ''}")
+    else:
+        print(f"{tag} {translated}")
+    print(f"{'─'*60}\n")
+    
+    if broadcast_server is not None:
+        broadcast_server.publish(language, translated)
+    if transcript_recorder is not None:
+        trace = caption.trace
+        transcript_recorder.record(
+            language, caption.text, translated,
+            duration=sum(frame.duration for frame in caption.formatted or ()),
+            confidence=trace.fields.get('confianca') if trace is not None else None,
+            kind=trace.fields.get('tipo') if trace is not None else None
+        )
 
-async def transcribe_stream(stream):
+async def show_caption(caption, language):
     """
-    Transcrição otimizada para pregação com intérprete.
-    Foco em frases curtas e pausas naturais.
+    Última etapa do pipeline: envia a legenda para o ProPresenter do idioma.
+    Recebe uma legenda por vez, na ordem da fala. Idioma sem ProPresenter
+    configurado só aparece no console.
     """
-    client = speech.SpeechAsyncClient()
+    # Não bloqueia: o agendador decide quando cada tela aparece (tempo
+    # mínimo, limite de taxa, legendas unidas se estiver atrasado)
+    scheduler = display_schedulers.get(language)
+    if scheduler is None:
+        if caption.trace is not None:
+            caption.trace.finish()
+    else:
+        scheduler.submit(caption.translated, caption.formatted, caption.trace)
 
+def build_streaming_config():
+    """Configuração do streaming do Google (usada pelo GoogleRecognitionBackend)."""
+    from google.cloud import speech_v1p1beta1 as speech
+    
     # CONFIGURAÇÃO OTIMIZADA PARA PREGAÇÃO COM INTÉRPRETE
     recognition_config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=RATE,
+        encoding=speech.RecognitionConfig.AudioEncoding[
+            audio_encoder.google_encoding if audio_encoder is not None else "LINEAR16"
+        ],
+        sample_rate_hertz=STT_RATE,
+        audio_channel_count=STT_CHANNELS,
         language_code="en-US",
         
         # Essencial para pregações
@@ -423,139 +606,208 @@ async def transcribe_stream(stream):
         interim_results=True,  # Mostra progresso em tempo real
         single_utterance=False  # Permite múltiplas frases na mesma sessão
     )
+    return streaming_config
 
-    def audio_requests():
-        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
-        for chunk in audio_generator(stream):
-            if STOP.is_set():
-                break
-            yield speech.StreamingRecognizeRequest(audio_content=chunk)
-
-    responses = await client.streaming_recognize(requests=audio_requests())
+async def transcribe_stream(capture, client=None):
+    """
+    Transcrição otimizada para pregação com intérprete.
+    Foco em frases curtas e pausas naturais.
+    `client` permite trocar o Google por um serviço local (modo replay);
+    sem ele, usa o motor de reconhecimento criado em main().
+    """
+    global recognition_supervisor
+    backend = recognition_backend
+    if backend is None or client is not None:
+        from recognition_backends import GoogleRecognitionBackend
+        backend = GoogleRecognitionBackend(build_streaming_config(), CHUNK / RATE, client, audio_encoder)
+    await backend.start()
     
     print("[SISTEMA] ✓ Transcrição iniciada - Aguardando pregador...\n")
 
+    # Etapas depois do reconhecimento, ligadas por filas limitadas (um pipeline
+    # por idioma: um idioma lento não atrasa as legendas dos outros)
+    for language in TARGET_LANGUAGES:
+        pipeline = CaptionPipeline(
+            normalize=preprocess_biblical_references,
+            translate=lambda text, language=language: translate_text_with_google_cloud(text, language),
+            format_text=format_text_for_display,
+            deliver=lambda caption, language=language: show_caption(caption, language),
+            publish=lambda caption, language=language: publish_caption(caption, language),
+            translation_workers=MAX_CONCURRENT_TRANSLATIONS,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            metrics=metrics,
+            name=language
+        )
+        caption_pipelines[language] = pipeline
+        pipeline.start()
+        client = presenter_clients.get(language)
+        if client is not None:
+            scheduler = DisplayScheduler(
+                client.submit, caption_layout.layout,
+                min_dwell=DISPLAY_MIN_DWELL,
+                max_rate=DISPLAY_MAX_RATE,
+                idle_clear=DISPLAY_IDLE_CLEAR,
+                max_lag=DISPLAY_MAX_LAG
+            )
+            display_schedulers[language] = scheduler
+            scheduler.start()
+        if SPECULATION_UPDATES:
+            speculators[language] = SpeculativeTranslator(
+                lambda text, language=language: translate_speculatively(text, language),
+                stable_updates=SPECULATION_UPDATES,
+                max_extra_ratio=SPECULATION_MAX_EXTRA
+            )
+
     # Variáveis de controle
     current_sentence = ""
     last_final_time = time.time()
     sentence_buffer = deque(maxlen=3)  # Mantém últimas 3 frases para contexto
+    commit_tracker = CommitTracker(max_words=MAX_WORDS_BEFORE_COMMIT)
+    # Tempos (time.monotonic) para as etapas do Google
+    received_at = time.monotonic()
+    last_final_at = 0.0
+    waiting_first_interim = True
     
-    async for response in responses:
-        if STOP.is_set():
-            break
+    def schedule_caption(text, kind, short_log=False, confidence=0):
+        """Entrega o trecho aos pipelines sem bloquear a leitura das respostas."""
+        for language, pipeline in caption_pipelines.items():
+            session_stats['caracteres_traducao'] += len(text)
+            trace = metrics.trace(text, started_at=received_at, language=language, tipo=kind)
+            if confidence > 0:
+                trace.fields['confianca'] = round(confidence, 3)
+            # Usa a tradução especulativa se o trecho for o mesmo texto já em tradução
+            speculator = speculators.get(language)
+            prepared = speculator.take(text) if speculator is not None else None
+            if prepared is not None:
+                prepared = asyncio.ensure_future(use_speculative_translation(prepared))
+            pipeline.submit(text, trace, short_log=short_log, prepared=prepared)
+    
+    async def recognize():
+        """Lê as respostas do reconhecimento; o Supervisor a chama de novo se o stream cair."""
+        stop = threading.Event()
+        try:
+            await read_recognition(stop)
+        finally:
+            # Encerra a thread de áudio desta geração antes da próxima começar
+            stop.set()
+
+    async def read_recognition(stop):
+        """Uma geração do reconhecimento: um stream com a sua thread de áudio."""
+        global transcription_manager
+        nonlocal current_sentence, last_final_time, received_at, last_final_at, waiting_first_interim
+        responses = backend.responses(iterate_in_thread(audio_generator(capture, stop)))
+        # Troca de stream automática antes do limite de duração do Google (só no motor do Google)
+        transcription_manager = getattr(backend, 'manager', None)
         
-        if not response.results:
-            continue
+        async for response in responses:
+            if STOP.is_set():
+                break
+            health.set("reconhecimento", "normal")
+        
+            if not response.results:
+                continue
 
-        result = response.results[0]
-        if not result.alternatives:
-            continue
+            result = response.results[0]
+            if not result.alternatives:
+                continue
 
-        transcript = result.alternatives[0].transcript.strip()
-        confidence = result.alternatives[0].confidence if result.is_final else 0
+            transcript = result.alternatives[0].transcript.strip()
+            confidence = result.alternatives[0].confidence if result.is_final else 0
         
-        if not transcript:
-            continue
-
-        # RESULTADO FINAL - Frase completa do pregador
-        if result.is_final:
-            # Evita duplicatas
-            if transcript == current_sentence:
+            if not transcript:
                 continue
+
+            received_at = time.monotonic()
+            if result.is_final:
+                # Fim da fala (último chunk com voz) → final do Google
+                if speech_gate is not None and speech_gate.last_speech is not None:
+                    metrics.observe('final', received_at - speech_gate.last_speech)
+                last_final_at = received_at
+                waiting_first_interim = True
+            elif waiting_first_interim:
+                # Início da fala (depois da última pausa ou do último final) → primeiro parcial
+                waiting_first_interim = False
+                if speech_gate is not None and speech_gate.speech_started is not None:
+                    metrics.observe('primeiro_parcial', received_at - max(speech_gate.speech_started, last_final_at))
+
+            # Só o trecho ainda não legendado vai para tradução
+            segments = commit_tracker.update(transcript, result.is_final)
+
+            # RESULTADO FINAL - Frase completa do pregador
+            if result.is_final:
+                # Evita duplicatas
+                if transcript == current_sentence:
+                    continue
             
-            session_stats['frases_transcritas'] += 1
-            current_sentence = transcript
-            last_final_time = time.time()
-            
-            # Adiciona ao buffer de contexto
-            sentence_buffer.append(transcript)
-            
-            # Log da transcrição
-            confidence_pct = int(confidence * 100) if confidence > 0 else 0
-            print(f"\n{'─'*60}")
-            print(f"[PREGADOR] {transcript}")
-            if confidence > 0:
-                print(f"[CONFIANÇA] {confidence_pct}%")
-            
-            # Traduz imediatamente
-            print("[TRADUZINDO...]", end=" ")
-            translated = translate_text_with_google_cloud(transcript)
-            print("✓")
-            print(f"[LEGENDA] {translated}")
-            print(f"{'─'*60}\n")
-            
-            # Envia para ProPresenter
-            formatted = format_text_for_display(translated)
-            send_text_to_presenter(formatted)
-            
-            # Pequena pausa para sincronizar com o intérprete
-            await asyncio.sleep(0.3)
-            
-        else:
-            # RESULTADO PARCIAL - Mostra progresso enquanto pregador fala
-            time_since_last = time.time() - last_final_time
-            
-            words = transcript.split()
-            word_count = len(words)
+                session_stats['frases_transcritas'] += 1
+                current_sentence = transcript
+                last_final_time = time.time()
             
-            # Detecta pontuação que indica fim de pensamento
-            has_punctuation = any(p in transcript for p in ['. ', '? ', '! '])
+                # Adiciona ao buffer de contexto
+                sentence_buffer.append(transcript)
             
-            # ESTRATÉGIA ANTI-PREVIEW-GIGANTE:
-            # Força commit em frases longas para evitar acúmulo
+                # Log da transcrição
+                confidence_pct = int(confidence * 100) if confidence > 0 else 0
+                print(f"\n{'─'*60}")
+                print(f"[PREGADOR] {transcript}")
+                if confidence > 0:
+                    print(f"[CONFIANÇA] {confidence_pct}%")
             
-            # 1. PRIORIDADE MÁXIMA: Detecta pontuação e comita até ela
-            if has_punctuation and word_count >= 5:
-                # Pega até o último ponto/exclamação/interrogação
-                last_punct_idx = max(
-                    transcript.rfind('. '),
-                    transcript.rfind('? '),
-                    transcript.rfind('! ')
-                )
-                
-                if last_punct_idx > 0:
-                    complete_part = transcript[:last_punct_idx + 1].strip()
-                    
-                    # Evita duplicatas e frases muito curtas
-                    if complete_part != current_sentence and len(complete_part) > 10:
-                        print(f"\n{'─'*60}")
-                        print(f"[FRASE DETECTADA] {complete_part[:80]}{'...' if len(complete_part) > 80 else ''}")
-                        
-                        translated = translate_text_with_google_cloud(complete_part)
-                        print(f"[LEGENDA] {translated[:80]}{'...' if len(translated) > 80 else ''}")
-                        print(f"{'─'*60}\n")
-                        
-                        formatted = format_text_for_display(translated)
-                        send_text_to_presenter(formatted)
-                        
-                        current_sentence = complete_part
-                        session_stats['frases_transcritas'] += 1
-                        last_final_time = time.time()  # Reseta o timer
+                # Traduz em segundo plano - o stream continua sendo lido
+                for segment, kind in segments:
+                    print("[TRADUZINDO...]")
+                    schedule_caption(segment, kind, confidence=confidence)
             
-            # 2. LIMITE DE PALAVRAS: Se passar de X palavras, força commit
-            elif word_count >= MAX_WORDS_BEFORE_COMMIT:
-                # Evita duplicatas
-                if transcript != current_sentence and len(transcript) > 20:
+            elif segments:
+                # RESULTADO PARCIAL - Trecho estável novo (pontuação ou limite de palavras)
+                # ESTRATÉGIA ANTI-PREVIEW-GIGANTE: comita frases longas em partes
+                for segment, kind in segments:
                     print(f"\n{'─'*60}")
-                    print(f"[FORÇANDO COMMIT] {word_count} palavras")
-                    print(f"[TEXTO] {transcript[:80]}{'...' if len(transcript) > 80 else ''}")
-                    
-                    translated = translate_text_with_google_cloud(transcript)
-                    print(f"[LEGENDA] {translated[:80]}{'...' if len(translated) > 80 else ''}")
-                    print(f"{'─'*60}\n")
-                    
-                    formatted = format_text_for_display(translated)
-                    send_text_to_presenter(formatted)
-                    
-                    current_sentence = transcript
+                    if kind == "pontuacao":
+                        print(f"[FRASE DETECTADA] {segment[:80]}{'...' if len(segment) > 80 else ''}")
+                    else:
+                        print(f"[FORÇANDO COMMIT] {len(segment.split())} palavras")
+                        print(f"[TEXTO] {segment[:80]}{'...' if len(segment) > 80 else ''}")
+                
+                    schedule_caption(segment, kind, short_log=True)
+                
                     session_stats['frases_transcritas'] += 1
-                    last_final_time = time.time()
-            
-            # 3. PREVIEW SIMPLES: Apenas mostra progresso (sem traduzir)
-            elif word_count >= 3:
-                # Mostra apenas primeiras 50 chars para não poluir
-                preview_text = transcript if len(transcript) <= 50 else transcript[:50] + "..."
-                print(f"[•••] {preview_text}", end='\r')
+                    last_final_time = time.time()  # Reseta o timer
+        
+            else:
+                # PREVIEW SIMPLES: Apenas mostra progresso (a tradução só começa se o
+                # parcial se repetir - especulação)
+                pending = commit_tracker.pending_words(transcript)
+                for speculator in speculators.values():
+                    speculator.observe(" ".join(pending))
+                if len(pending) >= 3:
+                    # Mostra apenas primeiras 50 chars para não poluir
+                    preview_text = " ".join(pending)
+                    preview_text = preview_text if len(preview_text) <= 50 else preview_text[:50] + "..."
+                    print(f"[•••] {preview_text}", end='\r')
+
+    def restart_recognition():
+        """Antes de reconectar: o áudio acumulado na espera só atrasaria as legendas."""
+        nonlocal waiting_first_interim
+        # O buffer só pode ser limpo pelo consumidor: o próximo audio_generator descarta
+        DROP_BUFFERED_AUDIO.set()
+        commit_tracker.reset()
+        waiting_first_interim = True
+    
+    # Erro no streaming (rede, Google fora do ar) reinicia o reconhecimento
+    # com espera crescente, sem derrubar o programa
+    recognition_supervisor = Supervisor(
+        "reconhecimento", recognize,
+        health=health,
+        max_delay=RESTART_MAX_DELAY,
+        stop=STOP,
+        on_restart=restart_recognition
+    )
+    await recognition_supervisor.run()
+
+    # Espera as legendas em andamento antes de encerrar
+    await asyncio.gather(*(pipeline.close() for pipeline in caption_pipelines.values()))
+    await asyncio.gather(*(scheduler.close() for scheduler in display_schedulers.values()))
 
     print("\n[SISTEMA] Stream de transcrição encerrado.")
 
@@ -563,7 +815,7 @@ async def main():
     """Função principal do sistema."""
     print("\n" + "="*60)
     print("  SISTEMA DE LEGENDAS PARA PREGAÇÃO COM INTÉRPRETE")
-    print("  Transcrição (EN) → Tradução (PT-BR) → ProPresenter")
+    print(f"  Transcrição (EN) → Tradução ({', '.join(TARGET_LANGUAGES).upper()}) → ProPresenter")
     print("="*60)
     
     # Validação
@@ -571,8 +823,166 @@ async def main():
         print("\n[ERRO] Configure GCP_PROJECT_ID no arquivo .env")
         return
     
-    # Inicializa áudio
-    audio_system = pyaudio.PyAudio()
+    timer = StartupTimer(STARTED_AT)
+    timer.mark("importacoes")
+    global translation_client, audio_capture, speech_gate, recognition_backend, audio_preprocessor, audio_encoder, broadcast_server
+    global transcript_recorder
+    translation_cache = TranslationCache(
+        max_entries=TRANSLATION_CACHE_SIZE,
+        ttl=TRANSLATION_CACHE_TTL,
+        path=TRANSLATION_CACHE_FILE or None
+    )
+    loaded = translation_cache.load()
+    if loaded:
+        print(f"[SISTEMA] Cache de tradução: {loaded} frases carregadas")
+    translation_client = TranslationClient(
+        GCP_PROJECT_ID,
+        target_language=TARGET_LANGUAGES[0],
+        max_concurrent=MAX_CONCURRENT_TRANSLATIONS * len(TARGET_LANGUAGES),
+        cache=translation_cache,
+        metrics=metrics,
+        batch_window=TRANSLATION_BATCH_WINDOW,
+        batch_size=TRANSLATION_BATCH_SIZE,
+        backend=create_translation_backend(
+            TRANSLATION_BACKEND, GCP_PROJECT_ID,
+            model_paths=LOCAL_TRANSLATION_MODELS,
+            threads=LOCAL_TRANSLATION_THREADS,
+            latency_budget=TRANSLATION_LATENCY_BUDGET,
+            breaker=create_breaker("traducao", translation_degraded_mode()),
+            timeout=TRANSLATION_TIMEOUT
+        )
+    )
+    
+    # Tradução, reconhecimento, ProPresenter e áudio ficam prontos ao mesmo
+    # tempo: as importações pesadas rodam numa thread enquanto as conexões abrem
+    audio_system = None
+    
+    async def prepare_translation():
+        if "google" in TRANSLATION_BACKEND:
+            await preload("google.cloud.translate")
+        await translation_client.start()
+        print(f"[SISTEMA] ✓ Tradução pronta ({TRANSLATION_BACKEND}, {translation_client.stats['setup']*1000:.0f}ms)")
+    
+    async def prepare_recognition():
+        global recognition_backend, audio_encoder
+        modules = ["google.cloud.speech_v1p1beta1", "recognition_backends"]
+        if AUDIO_ENCODING.lower() != "linear16":
+            modules.append("soundfile")
+        await preload(*modules)
+        from recognition_backends import create_recognition_backend
+        audio_encoder = create_audio_encoder(AUDIO_ENCODING, STT_RATE, STT_CHANNELS)
+        recognition_backend = create_recognition_backend(
+            RECOGNITION_BACKEND, build_streaming_config(), CHUNK / RATE, STT_RATE, STT_CHANNELS,
+            model_path=LOCAL_RECOGNITION_MODEL,
+            encoder=audio_encoder
+        )
+        # O modelo local leva alguns segundos para carregar: melhor antes do culto
+        await recognition_backend.start()
+        await recognition_backend.warm_up()
+        if hasattr(recognition_backend, 'real_time_factor'):
+            print(f"[SISTEMA] ✓ Modelo de reconhecimento carregado ({recognition_backend.stats['carga']:.1f}s)")
+        print(f"[SISTEMA] ✓ Reconhecimento pronto ({recognition_backend.name})")
+    
+    async def prepare_presenters():
+        await preload("presenter_api")
+        from presenter_api import PresenterClient, parse_presenter_targets
+        targets = parse_presenter_targets(PRESENTER_TARGETS)
+        for language in TARGET_LANGUAGES:
+            breaker = create_presenter_breaker(language)
+            if language in targets:
+                ip, port, path = targets[language]
+                client = PresenterClient(ip, port, metrics=metrics, path=path, language=language, breaker=breaker)
+            elif language == TARGET_LANGUAGES[0]:
+                client = PresenterClient(metrics=metrics, language=language, breaker=breaker)
+            else:
+                print(f"[AVISO] Sem ProPresenter para '{language}' em PRESENTER_TARGETS: legendas só no console")
+                continue
+            await client.start()
+            presenter_clients[language] = client
+        await asyncio.gather(*(client.warm_up() for client in presenter_clients.values()))
+    
+    def open_audio_system():
+        # Importado aqui para o módulo funcionar sem PyAudio no replay; a
+        # criação lista os dispositivos (lenta no Windows)
+        import pyaudio
+        return pyaudio.PyAudio()
+    
+    async def prepare_audio():
+        nonlocal audio_system
+        await preload("numpy", "audio_capture", "vad", "audio_preprocessing",
+                      *(["webrtcvad"] if VAD_MODE == "webrtc" else []))
+        audio_system = await asyncio.to_thread(open_audio_system)
+    
+    print("\n[SISTEMA] Preparando tradução, reconhecimento, ProPresenter e áudio...")
+    durations = await prewarm({
+        'traducao': prepare_translation(),
+        'reconhecimento': prepare_recognition(),
+        'propresenter': prepare_presenters(),
+        'audio': prepare_audio(),
+    })
+    timer.mark("servicos")
+    print(f"[SISTEMA] ✓ Serviços prontos em {max(durations.values()):.2f}s ("
+          + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in durations.items()) + ")")
+    
+    # Métricas: log JSON-lines + endpoint HTTP para o Prometheus
+    metrics.open_log(METRICS_LOG)
+    metrics.register('frases_transcritas', lambda: session_stats['frases_transcritas'],
+                     "Frases transcritas na sessão", kind="counter")
+    metrics.register('frases_traduzidas', lambda: session_stats['frases_traduzidas'],
+                     "Frases traduzidas na sessão", kind="counter")
+    metrics.register('traducoes_especulativas', lambda: session_stats['traducoes_especulativas'],
+                     "Traduções de parciais estáveis, usadas ou descartadas", kind="counter")
+    metrics.register('frases_sem_traducao', lambda: session_stats['frases_sem_traducao'],
+                     "Frases mostradas sem tradução (modo degradado)", kind="counter")
+    metrics.register('componentes_degradados', lambda: len(health.degraded()),
+                     "Componentes fora do estado normal (circuito aberto, reconectando)")
+    if hasattr(recognition_backend, 'real_time_factor'):
+        metrics.register('reconhecimento_rtf', recognition_backend.real_time_factor,
+                         "Tempo de decodificação local por segundo de áudio")
+    for language, client in presenter_clients.items():
+        metrics.register(f"fila_propresenter_{language.lower().replace('-', '_')}", client.queue_depth,
+                         f"Legendas esperando envio ao ProPresenter ({language})")
+    metrics_server = None
+    if METRICS_PORT:
+        try:
+            metrics_server = MetricsServer(metrics, port=METRICS_PORT).start()
+            print(f"[SISTEMA] Métricas em http://127.0.0.1:{metrics_server.port}/metrics")
+        except OSError as e:
+            print(f"[AVISO] Endpoint de métricas desligado: {e}")
+    if BROADCAST_PORT:
+        try:
+            broadcast_server = await BroadcastServer(
+                TARGET_LANGUAGES,
+                host=BROADCAST_HOST,
+                port=BROADCAST_PORT,
+                backfill=BROADCAST_BACKFILL,
+                client_buffer=BROADCAST_CLIENT_BUFFER,
+                max_clients=BROADCAST_MAX_CLIENTS
+            ).start()
+            metrics.register('clientes_legendas', broadcast_server.client_count,
+                             "Celulares e telas conectados ao servidor de legendas")
+            print(f"[SISTEMA] Legendas para celulares em http://<ip-deste-computador>:{broadcast_server.port}/")
+        except OSError as e:
+            print(f"[AVISO] Servidor de legendas para celulares desligado: {e}")
+    # Gravação da transcrição (e do áudio bruto, se pedido)
+    transcript_recorder = create_transcript_recorder(
+        TRANSCRIPT_DIR, TARGET_LANGUAGES,
+        audio=TRANSCRIPT_AUDIO,
+        rate=RATE,
+        channels=CHANNELS,
+        flush_interval=TRANSCRIPT_FLUSH_INTERVAL
+    )
+    if transcript_recorder is not None:
+        print(f"[SISTEMA] Gravando a transcrição em {transcript_recorder.path}"
+              f"{' (com áudio)' if transcript_recorder.audio else ''}")
+    
+    timer.mark("configuracao")
+    
+    # Já importados pelo prepare_audio (numa thread)
+    import pyaudio
+    from audio_capture import AudioCapture
+    from audio_preprocessing import create_preprocessor
+    from vad import SpeechGate, create_vad
     
     print(f"\n[CONFIGURAÇÃO DE ÁUDIO]")
     print(f"  Modo de operação: {OPERATION_MODE.upper()}")
@@ -582,6 +992,9 @@ async def main():
         print(f"    → Otimizado para pregação contínua")
     print(f"  Taxa de amostragem: {RATE} Hz")
     print(f"  Canais: {CHANNELS}")
+    if AUDIO_TARGET_RATE:
+        print(f"  Pré-processamento: {RATE} Hz/{CHANNELS} canal(is) → {STT_RATE} Hz mono "
+              f"(passa-altas {AUDIO_HIGHPASS_HZ:.0f} Hz, ganho máx. {AUDIO_MAX_GAIN:.0f} dB)")
     print(f"  Tamanho do chunk: {CHUNK} frames")
     print(f"  Limiar de silêncio: {SILENCE_THRESHOLD}")
     print(f"  Detecção de pausa: {PAUSE_DETECTION_TIME}s")
@@ -595,22 +1008,42 @@ async def main():
         print(f"  Dispositivo: Padrão do sistema")
         device_index = None
     
+    # A captura roda no callback do PyAudio e só escreve no buffer circular
+    audio_capture = AudioCapture(rate=RATE, channels=CHANNELS, chunk=CHUNK)
+    audio_preprocessor = create_preprocessor(
+        RATE, CHANNELS, AUDIO_TARGET_RATE, AUDIO_HIGHPASS_HZ, AUDIO_TARGET_LEVEL, AUDIO_MAX_GAIN
+    )
+    vad = create_vad(VAD_MODE, STT_RATE, VAD_FRAME_MS, SILENCE_THRESHOLD, VAD_AGGRESSIVENESS)
+    speech_gate = SpeechGate(
+        vad, STT_RATE, STT_CHANNELS, STT_CHUNK,
+        frame_ms=VAD_FRAME_MS,
+        hangover=PAUSE_DETECTION_TIME,
+        preroll=VAD_PREROLL,
+        pause_time=ROLLOVER_PAUSE_TIME
+    )
+    print(f"  Detecção de voz: {vad.name}")
     stream = audio_system.open(
-        format=FORMAT,
+        format=pyaudio.paInt16,
         channels=CHANNELS,
         rate=RATE,
         input=True,
         input_device_index=device_index,
-        frames_per_buffer=CHUNK
+        frames_per_buffer=CHUNK,
+        stream_callback=audio_capture.callback
     )
 
+    ready = timer.mark("audio")
+    metrics.log("pronto", segundos=round(ready, 3), fases={phase: round(seconds, 3) for phase, seconds in timer.phases.items()},
+                servicos={name: round(seconds, 3) for name, seconds in durations.items()})
+    metrics.register('inicio_segundos', lambda: round(ready, 3), "Tempo da abertura do programa até ficar pronto")
+    print(f"\n[SISTEMA] ✓ Pronto em {ready:.2f}s desde a abertura ({timer.summary()})")
     print("\n[STATUS] Sistema pronto! Aguardando início da pregação...")
     print("[DICA] O pregador deve falar frases curtas e pausar para o intérprete\n")
 
     try:
         await asyncio.gather(
             monitor_keyboard(),
-            transcribe_stream(stream)
+            transcribe_stream(audio_capture)
         )
     except KeyboardInterrupt:
         print("\n\n[SISTEMA] Interrompido pelo usuário (Ctrl+C)")
@@ -636,6 +1069,11 @@ async def main():
             print(f"  Duração da sessão: {mins}min {secs}s")
             print(f"  Total de frases: {session_stats['frases_transcritas']}")
             print(f"  Total traduzido: {session_stats['frases_traduzidas']}")
+            if health.transitions:
+                print(f"  Mudanças de estado: {len(health.transitions)} "
+                      f"({', '.join(f'{name} → {state}' for _, name, _, state, _ in list(health.transitions)[-5:])})")
+            for line in metrics.report():
+                print(f"  {line}")
         except:
             pass
         
@@ -652,11 +1090,32 @@ async def main():
         except Exception as e:
             print(f"[AVISO] Erro ao terminar PyAudio: {e}")
         
-        # Limpa a tela do ProPresenter
-        try:
-            send_text_to_presenter("")
-        except:
-            pass
+        await translation_client.close()
+        translation_client.cache.save()
+        await recognition_backend.close()
+        if audio_encoder is not None:
+            audio_encoder.close()
+        
+        metrics.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if broadcast_server is not None:
+            await broadcast_server.close()
+        if transcript_recorder is not None:
+            transcript_recorder.close()
+            try:
+                exported = export_session(transcript_recorder.path)
+                print(f"[SISTEMA] ✓ Transcrição salva em {transcript_recorder.path} ({len(exported)} arquivos exportados)")
+            except (OSError, ValueError) as e:
+                print(f"[AVISO] Não foi possível exportar a transcrição: {e}")
+        
+        # Limpa as telas do ProPresenter e fecha as conexões
+        for client in presenter_clients.values():
+            try:
+                client.submit("")
+                await client.close()
+            except:
+                pass
         
         print("\n[SISTEMA] ✓ Encerrado com sucesso")
         print("="*60 + "\n")
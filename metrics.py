@@ -0,0 +1,290 @@
+"""
+Métricas de latência por etapa de cada legenda.
+Cada etapa (captura, Google, tradução, ProPresenter...) vira um histograma
+com p50/p95/p99, servido em HTTP no formato do Prometheus e gravado em um
+log JSON-lines, para saber de onde vem uma legenda lenta.
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Etapas medidas (nome → descrição usada no HELP do Prometheus)
+STAGES = {
+    'captura': "Tempo do áudio no buffer circular até ser lido para o Google",
+    'primeiro_parcial': "Início da fala até o primeiro resultado parcial",
+    'final': "Fim da fala até o resultado final do Google",
+    'preprocessamento': "Normalização das referências bíblicas",
+    'traducao': "Tradução da legenda (cache, fila e chamada)",
+    'traducao_rpc': "Chamada à Translation API",
+    'formatacao': "format_text_for_display",
+    'envio_propresenter': "Envio ao ProPresenter (com tentativas)",
+    'legenda_total': "Resultado do Google até a legenda entregue no ProPresenter",
+}
+
+QUANTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    """Percentil com interpolação linear (p de 0 a 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100.0
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+class LatencyHistogram:
+    """
+    Guarda as últimas `window` medições (para os percentis) e os totais
+    desde o início (contagem e soma, como um summary do Prometheus).
+    """
+
+    def __init__(self, window=2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self):
+        samples = list(self._samples)
+        summary = {f"p{q}": percentile(samples, q) for q in QUANTILES}
+        summary.update(count=self.count, sum=self.total, max=self.max)
+        return summary
+
+
+def stage_key(stage, language=None):
+    """Nome da etapa no snapshot/relatório: "traducao" ou "traducao[es]"."""
+    return f"{stage}[{language}]" if language else stage
+
+
+class CaptionTrace:
+    """
+    Medições de uma legenda (em um idioma): cada etapa vai para o histograma
+    geral e fica guardada aqui; `finish()` grava a linha da legenda no log JSON.
+    """
+
+    def __init__(self, metrics, text, started_at=None, language=None, **fields):
+        self.metrics = metrics
+        self.text = text
+        self.started_at = metrics.clock() if started_at is None else started_at
+        self.language = language
+        self.fields = fields
+        self.spans = {}
+
+    def observe(self, stage, seconds):
+        self.spans[stage] = seconds
+        self.metrics.observe(stage, seconds, self.language)
+
+    @contextmanager
+    def span(self, stage):
+        start = self.metrics.clock()
+        try:
+            yield
+        finally:
+            self.observe(stage, self.metrics.clock() - start)
+
+    def finish(self, delivered=True):
+        total = self.metrics.clock() - self.started_at
+        if delivered:
+            self.metrics.observe('legenda_total', total, self.language)
+        if self.language:
+            self.fields['idioma'] = self.language
+        self.metrics.log(
+            "legenda",
+            texto=self.text,
+            entregue=delivered,
+            total=round(total, 4),
+            etapas={stage: round(seconds, 4) for stage, seconds in self.spans.items()},
+            **self.fields
+        )
+
+
+class Metrics:
+    """
+    Registro das métricas da sessão. Seguro entre threads: a captura, o
+    envio ao ProPresenter e o servidor HTTP rodam fora do loop asyncio.
+    """
+
+    def __init__(self, window=2048, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._histograms = {}      # (etapa, idioma) → LatencyHistogram
+        self._values = {}          # nome → (função, ajuda, tipo)
+        self._lock = threading.Lock()
+        self._log = None
+        self._log_queue = None     # Linhas para a thread que grava o log
+        self._log_thread = None
+
+    def observe(self, stage, seconds, language=None):
+        key = (stage, language or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.window)
+            histogram.observe(max(seconds, 0.0))
+
+    @contextmanager
+    def span(self, stage, language=None):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(stage, self.clock() - start, language)
+
+    def trace(self, text, started_at=None, language=None, **fields):
+        return CaptionTrace(self, text, started_at, language, **fields)
+
+    def _stage_snapshots(self):
+        with self._lock:
+            return {key: h.snapshot() for key, h in self._histograms.items()}
+
+    def register(self, name, fn, help_text="", kind="gauge"):
+        """Valor lido na hora da coleta (ex: profundidade de fila, contadores)."""
+        self._values[name] = (fn, help_text, kind)
+
+    def snapshot(self):
+        stages = {stage_key(stage, language): summary
+                  for (stage, language), summary in self._stage_snapshots().items()}
+        values = {}
+        for name, (fn, _, _) in list(self._values.items()):
+            try:
+                values[name] = fn()
+            except Exception:
+                continue
+        return {"etapas": stages, "valores": values}
+
+    def open_log(self, path):
+        """
+        Abre o log JSON-lines (uma linha por legenda/evento). Uma thread só
+        grava o arquivo: quem chama log() (loop asyncio, envio ao ProPresenter,
+        disjuntores) só enfileira a linha, sem esperar o disco.
+        """
+        if path:
+            self._log = open(path, "a", encoding="utf-8", buffering=1)
+            self._log_queue = queue.SimpleQueue()
+            self._log_thread = threading.Thread(target=self._write_log, name="metrics-log", daemon=True)
+            self._log_thread.start()
+
+    def _write_log(self):
+        log = self._log
+        while True:
+            line = self._log_queue.get()
+            if line is None:
+                break
+            if log is None:
+                continue
+            try:
+                log.write(line)
+            except (OSError, ValueError) as e:
+                print(f"[AVISO] Log de métricas desativado: {e}")
+                self._log = None
+                try:
+                    log.close()
+                except OSError:
+                    pass
+                log = None
+
+    def log(self, event, **fields):
+        if self._log is None:
+            return
+        record = {"t": round(time.time(), 3), "evento": event}
+        record.update(fields)
+        self._log_queue.put(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._log_thread is None:
+            return
+        self.log("resumo", **self.snapshot())
+        self._log_queue.put(None)
+        self._log_thread.join()
+        self._log_thread = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus."""
+        lines = [
+            "# HELP legendas_etapa_segundos Latência de cada etapa da legenda",
+            "# TYPE legendas_etapa_segundos summary",
+        ]
+        for (stage, language), summary in sorted(self._stage_snapshots().items()):
+            labels = f'etapa="{stage}"' + (f',idioma="{language}"' if language else "")
+            for q in QUANTILES:
+                lines.append(f'legendas_etapa_segundos{{{labels},quantile="{q / 100}"}} '
+                             f'{summary[f"p{q}"]:.6f}')
+            lines.append(f'legendas_etapa_segundos_sum{{{labels}}} {summary["sum"]:.6f}')
+            lines.append(f'legendas_etapa_segundos_count{{{labels}}} {summary["count"]}')
+        for name, value in sorted(self.snapshot()["valores"].items()):
+            _, help_text, kind = self._values[name]
+            lines.append(f"# HELP legendas_{name} {help_text}")
+            lines.append(f"# TYPE legendas_{name} {kind}")
+            lines.append(f"legendas_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        """Tabela p50/p95/p99 por etapa e idioma (para o comando 's' e o replay)."""
+        snapshots = self._stage_snapshots()
+        order = list(STAGES)
+        keys = sorted(snapshots, key=lambda k: (order.index(k[0]) if k[0] in order else len(order), k))
+        lines = []
+        for stage, language in keys:
+            summary = snapshots[(stage, language)]
+            lines.append(f"{stage_key(stage, language):<26} p50 {summary['p50']*1000:6.0f}ms  p95 {summary['p95']*1000:6.0f}ms  "
+                         f"p99 {summary['p99']*1000:6.0f}ms  ({summary['count']})")
+        return lines
+
+
+class MetricsServer:
+    """
+    Servidor HTTP local: /metrics (Prometheus) e /metrics.json.
+    Roda numa thread daemon, fora do loop asyncio.
+    """
+
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.host, self.port = self._httpd.server_address
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
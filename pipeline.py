@@ -0,0 +1,326 @@
+"""
+Pipeline de legendas em etapas asyncio ligadas por filas limitadas:
+
+    reconhecimento → normalização → tradução (N em paralelo) → formatação → envio
+
+O reconhecimento nunca espera: se uma fila enche, as legendas são agrupadas
+(normalização/tradução: textos unidos, nada se perde) ou a mais antiga é
+descartada (envio: uma legenda mais nova já vai substituí-la na tela).
+As traduções terminam fora de ordem, mas a formatação só libera as legendas
+na ordem em que foram faladas.
+"""
+import asyncio
+import contextlib
+from collections import deque
+
+
+class Caption:
+    """Uma legenda passando pelas etapas."""
+
+    def __init__(self, text, trace=None, short_log=False, pause_after=0.0, prepared=None):
+        self.text = text
+        self.trace = trace              # metrics.CaptionTrace (opcional)
+        self.prepared = prepared        # Tarefa com a tradução já em andamento (especulação)
+        self.short_log = short_log
+        self.pause_after = pause_after
+        self.seq = None                 # Ordem de saída (definida ao entrar na tradução)
+        self.processed = None           # Texto normalizado (referências bíblicas)
+        self.translated = None
+        self.formatted = None
+
+    def span(self, stage):
+        return self.trace.span(stage) if self.trace is not None else contextlib.nullcontext()
+
+    def absorb(self, other):
+        """Agrupa uma legenda que chegou depois (fila cheia)."""
+        self.text = f"{self.text} {other.text}"
+        if self.processed is not None and other.processed is not None:
+            self.processed = f"{self.processed} {other.processed}"
+        self.short_log = self.short_log or other.short_log
+        self.pause_after = max(self.pause_after, other.pause_after)
+        # O texto mudou: traduções preparadas não servem mais
+        for caption in (self, other):
+            if caption.prepared is not None:
+                caption.prepared.cancel()
+                caption.prepared = None
+        if self.trace is not None:
+            self.trace.text = self.text
+
+
+class StageQueue:
+    """
+    Fila limitada entre duas etapas. `put` nunca bloqueia: com a fila cheia,
+    "agrupar" junta o item no último da fila e "descartar" remove o mais antigo.
+    Retorna o item que deixou de seguir sozinho (o agrupado ou o descartado).
+    """
+
+    def __init__(self, name, maxsize, policy="agrupar"):
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._items = deque()
+        self._not_empty = asyncio.Event()
+
+        self.stats = {
+            'entradas': 0,
+            'agrupadas': 0,
+            'descartadas': 0,
+            'profundidade_max': 0,
+        }
+
+    def __len__(self):
+        return len(self._items)
+
+    def full(self):
+        return len(self._items) >= self.maxsize
+
+    def put(self, item):
+        self.stats['entradas'] += 1
+        dropped = None
+        if self.full():
+            if self.policy == "agrupar":
+                self._items[-1].absorb(item)
+                self.stats['agrupadas'] += 1
+                return item
+            dropped = self._items.popleft()
+            self.stats['descartadas'] += 1
+        self._items.append(item)
+        self.stats['profundidade_max'] = max(self.stats['profundidade_max'], len(self._items))
+        self._not_empty.set()
+        return dropped
+
+    async def get(self):
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self._items.popleft()
+
+
+class CaptionPipeline:
+    """
+    Liga as etapas. As funções vêm de quem usa o pipeline:
+      normalize(texto) → texto       (síncrona, rápida)
+      translate(texto) → texto       (async; N traduções em voo)
+      format_text(texto) → texto     (síncrona)
+      deliver(caption)               (async; uma legenda por vez, em ordem)
+      publish(caption)               (opcional, síncrona; toda legenda, em ordem,
+                                      antes da fila de envio, que pode descartar)
+    """
+
+    def __init__(self, normalize, translate, format_text, deliver,
+                 translation_workers=4, queue_size=8, metrics=None, name=None, publish=None):
+        self.normalize = normalize
+        self.translate = translate
+        self.format_text = format_text
+        self.deliver = deliver
+        self.publish = publish
+        self.translation_workers = translation_workers
+
+        self.normalize_queue = StageQueue("normalizacao", queue_size, "agrupar")
+        self.translate_queue = StageQueue("traducao", queue_size, "agrupar")
+        self.deliver_queue = StageQueue("envio", queue_size, "descartar")
+        # Traduções prontas esperando a vez (seq → legenda)
+        self._reorder = {}
+        self._reorder_ready = asyncio.Event()
+        self._next_seq = 0      # Próxima legenda a entrar na tradução
+        self._release_seq = 0   # Próxima legenda a sair para a formatação
+
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+
+        self.stats = {
+            'recebidas': 0,
+            'entregues': 0,
+            'fora_de_ordem': 0,   # Traduções que terminaram antes de uma anterior
+        }
+
+        # `name` (ex: idioma) diferencia as métricas de vários pipelines
+        self.name = name
+        if metrics is not None:
+            suffix = "" if not name else "_" + name.lower().replace("-", "_")
+            for stage in self.queue_depths():
+                metrics.register(f"fila_{stage}{suffix}", lambda stage=stage: self.queue_depths()[stage],
+                                 f"Legendas esperando na etapa de {stage}" + (f" ({name})" if name else ""))
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._normalize_stage()),
+            *(asyncio.create_task(self._translate_stage()) for _ in range(self.translation_workers)),
+            asyncio.create_task(self._format_stage()),
+            asyncio.create_task(self._deliver_stage()),
+        ]
+
+    def submit(self, text, trace=None, short_log=False, pause_after=0.0, prepared=None):
+        """
+        Entrada do pipeline (chamada pelo reconhecimento; nunca bloqueia).
+        `prepared` é uma tarefa que já está traduzindo o texto.
+        """
+        self.stats['recebidas'] += 1
+        caption = Caption(text, trace, short_log, pause_after, prepared)
+        if self.normalize_queue.put(caption) is None:
+            self._enter()
+
+    def _enter(self):
+        self._in_flight += 1
+        self._idle.clear()
+
+    def _leave(self):
+        self._in_flight -= 1
+        if self._in_flight == 0:
+            self._idle.set()
+
+    async def _normalize_stage(self):
+        while True:
+            caption = await self.normalize_queue.get()
+            with caption.span('preprocessamento'):
+                caption.processed = self.normalize(caption.text)
+            # A ordem de saída é definida aqui, numa etapa única e sequencial
+            if not self.translate_queue.full():
+                caption.seq = self._next_seq
+                self._next_seq += 1
+            if self.translate_queue.put(caption) is caption:
+                self._leave()   # Agrupada na última legenda da fila
+
+    async def _translate_stage(self):
+        while True:
+            caption = await self.translate_queue.get()
+            try:
+                with caption.span('traducao'):
+                    caption.translated = await self._prepared_translation(caption)
+                    if caption.translated is None:
+                        caption.translated = await self.translate(caption.processed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Nunca deixa um buraco na ordem: segue com o texto original
+                print(f"\n[ERRO TRADUÇÃO] {e}")
+                caption.translated = caption.processed
+            if caption.seq != self._release_seq:
+                self.stats['fora_de_ordem'] += 1
+            self._reorder[caption.seq] = caption
+            self._reorder_ready.set()
+
+    @staticmethod
+    async def _prepared_translation(caption):
+        """Resultado da tradução especulativa; None se não houver ou falhar."""
+        if caption.prepared is None:
+            return None
+        try:
+            return await caption.prepared
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            return None
+        except Exception:
+            return None
+
+    async def _format_stage(self):
+        while True:
+            while self._release_seq not in self._reorder:
+                self._reorder_ready.clear()
+                await self._reorder_ready.wait()
+            caption = self._reorder.pop(self._release_seq)
+            self._release_seq += 1
+            with caption.span('formatacao'):
+                caption.formatted = self.format_text(caption.translated)
+            if self.publish is not None:
+                try:
+                    self.publish(caption)
+                except Exception as e:
+                    print(f"[ERRO PUBLICAÇÃO] {e}")
+            dropped = self.deliver_queue.put(caption)
+            if dropped is not None:
+                if dropped.trace is not None:
+                    dropped.trace.finish(delivered=False)
+                self._leave()
+
+    async def _deliver_stage(self):
+        while True:
+            caption = await self.deliver_queue.get()
+            try:
+                await self.deliver(caption)
+                self.stats['entregues'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERRO ENVIO] {e}")
+            finally:
+                self._leave()
+
+    def queue_depths(self):
+        return {
+            'normalizacao': len(self.normalize_queue),
+            'traducao': len(self.translate_queue),
+            'ordenacao': len(self._reorder),
+            'envio': len(self.deliver_queue),
+        }
+
+    def queue_stats(self):
+        return {q.name: q.stats for q in (self.normalize_queue, self.translate_queue, self.deliver_queue)}
+
+    async def close(self, timeout=10.0):
+        """Espera as legendas em andamento (até `timeout`) e encerra as etapas."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"[AVISO] {self._in_flight} legenda(s) não entregue(s) ao encerrar")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+if __name__ == '__main__':
+    # Rajada de legendas com traduções de duração aleatória:
+    # confere a ordem de entrega e mostra o agrupamento sob carga
+    import random
+    import time
+
+    async def run(count=200, queue_size=8, workers=4, deliver_delay=0.01):
+        rng = random.Random(0)
+        delivered = []
+        published = []
+
+        async def translate(text):
+            await asyncio.sleep(rng.uniform(0.02, 0.25))
+            return text.upper()
+
+        async def deliver(caption):
+            delivered.append(caption.formatted)
+            await asyncio.sleep(deliver_delay)
+
+        pipeline = CaptionPipeline(str.strip, translate, str, deliver,
+                                   translation_workers=workers, queue_size=queue_size,
+                                   publish=lambda caption: published.append(caption.formatted))
+        pipeline.start()
+        start = time.perf_counter()
+        max_depths = {}
+        for i in range(count):
+            pipeline.submit(f"legenda {i}")
+            for name, depth in pipeline.queue_depths().items():
+                max_depths[name] = max(max_depths.get(name, 0), depth)
+            await asyncio.sleep(rng.uniform(0.0, 0.04))
+        await pipeline.close()
+        elapsed = time.perf_counter() - start
+
+        numbers = [int(n) for text in delivered for n in text.split()[1::2]]
+        print(f"{count} legendas em {elapsed:.1f}s → {len(delivered)} entregas "
+              f"({pipeline.stats['fora_de_ordem']} traduções terminaram fora de ordem)")
+        print(f"Ordem preservada: {numbers == sorted(numbers)}  "
+              f"Perdidas: {count - len(numbers) - sum(q['descartadas'] for q in pipeline.queue_stats().values())}")
+        for name, stats in pipeline.queue_stats().items():
+            print(f"  fila {name:<13} máx {stats['profundidade_max']:2d}  "
+                  f"agrupadas {stats['agrupadas']:3d}  descartadas {stats['descartadas']:3d}")
+        print(f"  profundidade máx. observada: {max_depths}")
+        # Descartadas no envio continuam na transcrição e na transmissão
+        published_numbers = [int(n) for text in published for n in text.split()[1::2]]
+        print(f"  publicadas (transcrição/transmissão): {len(published_numbers)} de {count} legendas, "
+              f"em ordem: {published_numbers == sorted(published_numbers)}")
+        return numbers == sorted(numbers) and published_numbers == list(range(count))
+
+    ok = asyncio.run(run())
+    print("Envio lento (descarta na fila de envio):")
+    ok = asyncio.run(run(count=60, deliver_delay=0.3)) and ok
+    raise SystemExit(0 if ok else 1)
@@ -1,6 +1,10 @@
+import asyncio
+import time
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
@@ -9,38 +13,251 @@ PROPRESENTER_IP = os.getenv("PROPRESENTER_IP")
 PROPRESENTER_PORT = int(os.getenv("PROPRESENTER_PORT"))
 PASSWORD = os.getenv("PROPRESENTER_PASSWORD")
 
+# Tempo máximo (segundos) para entregar uma legenda, somando todas as tentativas
+PRESENTER_LATENCY_BUDGET = float(os.getenv("PRESENTER_LATENCY_BUDGET", "2.0"))
+
+# Endpoint padrão das legendas (mensagem da tela de palco)
+STAGE_MESSAGE_PATH = "/v1/stage/message"
+
+# Marca "nenhuma legenda pendente" ("" é válido: limpa a tela)
+_NOTHING = object()
+
+
+class PresenterClient:
+    """
+    Cliente HTTP do ProPresenter com uma conexão keep-alive reutilizada.
+    Os envios rodam numa thread própria, fora do loop asyncio. Se uma legenda
+    nova chega antes da anterior ser enviada, a antiga é descartada (agrupada
+    na nova), então um ProPresenter lento nunca acumula fila.
+    Com `breaker` (supervisor.CircuitBreaker), um ProPresenter fora do ar não
+    custa o orçamento de latência a cada legenda: os envios são recusados na
+    hora e a última legenda é reenviada quando o circuito deixa testar de novo.
+    """
+
+    def __init__(self, ip=PROPRESENTER_IP, port=PROPRESENTER_PORT, password=PASSWORD,
+                 latency_budget=PRESENTER_LATENCY_BUDGET, metrics=None, path=STAGE_MESSAGE_PATH,
+                 language=None, breaker=None):
+        self.base_url = f"http://{ip}:{port}"
+        self.url = self.base_url + path
+        self.latency_budget = latency_budget
+        # Métricas opcionais (metrics.Metrics): etapa "envio_propresenter" do idioma
+        self.metrics = metrics
+        self.language = language
+        self.breaker = breaker
+
+        self.session = requests.Session()
+        # Uma única conexão no pool, sem retries automáticos (controlados abaixo)
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+        self.session.auth = ("pro", password)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="presenter")
+        self._pending = _NOTHING     # (texto, trace) da legenda esperando envio
+        self._wakeup = asyncio.Event()
+        self._worker = None
+
+        self.stats = {
+            'enviadas': 0,
+            'agrupadas': 0,      # Legendas substituídas antes de serem enviadas
+            'falhas': 0,
+            'recusadas': 0,      # Não enviadas: circuito aberto
+            'tentativas': 0,
+            'latencia_total': 0.0,
+        }
+
+    def _put(self, text, timeout):
+        response = self.session.put(self.url, json=text, timeout=timeout)
+        response.raise_for_status()
+
+    def send(self, text, is_stale=lambda: False):
+        """
+        Envia o texto (bloqueante). Tenta de novo com backoff enquanto houver
+        orçamento de latência; desiste se uma legenda mais nova já estiver esperando.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            self.stats['recusadas'] += 1
+            return False
+        try:
+            delivered = self._send(text, is_stale)
+        except Exception:
+            # Erro fora do previsto: conta como falha (e libera o teste do meio-aberto)
+            self.stats['falhas'] += 1
+            if self.breaker is not None:
+                self.breaker.failure()
+            raise
+        if self.breaker is not None:
+            if delivered:
+                self.breaker.success()
+            else:
+                self.breaker.failure()
+        return delivered
+
+    def _send(self, text, is_stale):
+        """
+        Tentativas de envio. Só repete erros passageiros (conexão, tempo
+        esgotado, 5xx); 4xx e outros erros de requisição desistem na hora.
+        """
+        start = time.monotonic()
+        deadline = start + self.latency_budget
+        backoff = 0.05
+
+        while True:
+            remaining = deadline - time.monotonic()
+            self.stats['tentativas'] += 1
+            try:
+                self._put(text, timeout=max(remaining, 0.05))
+                elapsed = time.monotonic() - start
+                self.stats['enviadas'] += 1
+                self.stats['latencia_total'] += elapsed
+                if self.metrics is not None:
+                    self.metrics.observe('envio_propresenter', elapsed, self.language)
+                return True
+            except requests.exceptions.HTTPError as errh:
+                print(f"Erro HTTP: {errh.response.status_code} - {errh.response.reason}")
+                print(f"Resposta do Servidor: {errh.response.text}")
+                if errh.response.status_code < 500:
+                    self.stats['falhas'] += 1
+                    return False
+            except requests.exceptions.ConnectionError as errc:
+                print(f"Erro de Conexão: Verifique o IP e a porta do ProPresenter. {errc}")
+            except requests.exceptions.Timeout as errt:
+                print(f"Tempo esgotado no ProPresenter: {errt}")
+            except requests.exceptions.RequestException as err:
+                print(f"Ocorreu um erro inesperado: {err}")
+                self.stats['falhas'] += 1
+                return False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= backoff or is_stale():
+                self.stats['falhas'] += 1
+                return False
+            time.sleep(backoff)
+            backoff *= 2
+
+    async def start(self):
+        """Inicia a tarefa que entrega as legendas em segundo plano."""
+        self._worker = asyncio.create_task(self._run())
+
+    async def warm_up(self, timeout=1.0):
+        """
+        Abre a conexão keep-alive antes da primeira legenda (GET /version).
+        Se o ProPresenter ainda não responde, a conexão abre na primeira legenda.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor, lambda: self.session.get(self.base_url + "/version", timeout=timeout)
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"[AVISO] ProPresenter {self.base_url} ainda não responde ({type(e).__name__})")
+
+    def submit(self, text, trace=None):
+        """
+        Enfileira uma legenda sem bloquear o loop (substitui a pendente).
+        `trace` (metrics.CaptionTrace) é finalizado quando a legenda é entregue.
+        """
+        if self._pending is not _NOTHING:
+            self.stats['agrupadas'] += 1
+            _, replaced = self._pending
+            if replaced is not None:
+                replaced.finish(delivered=False)
+        self._pending = (text, trace)
+        self._wakeup.set()
+
+    def _has_newer(self):
+        return self._pending is not _NOTHING
+
+    async def _wait_for_caption(self, unsent):
+        """
+        Espera uma legenda nova. Com o circuito aberto e uma legenda que não
+        chegou à tela, ela volta para a fila quando o circuito deixa testar.
+        """
+        retry = self.breaker.retry_in() if self.breaker is not None and unsent is not _NOTHING else None
+        if retry is None:
+            await self._wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), max(retry, 0.01))
+        except asyncio.TimeoutError:
+            if self._pending is _NOTHING:
+                self._pending = (unsent, None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        unsent = _NOTHING       # Última legenda que não chegou à tela
+        while True:
+            await self._wait_for_caption(unsent)
+            self._wakeup.clear()
+            if self._pending is _NOTHING:
+                continue
+            (text, trace), self._pending = self._pending, _NOTHING
+            delivered = False
+            try:
+                delivered = await loop.run_in_executor(self._executor, self.send, text, self._has_newer)
+            except Exception as e:
+                print(f"[ERRO PROPRESENTER] {e}")
+            unsent = _NOTHING if delivered else text
+            if trace is not None:
+                trace.finish(delivered)
+
+    def queue_depth(self):
+        return 0 if self._pending is _NOTHING else 1
+
+    def average_latency(self):
+        if not self.stats['enviadas']:
+            return 0.0
+        return self.stats['latencia_total'] / self.stats['enviadas']
+
+    async def close(self):
+        """Entrega a legenda pendente (se houver) e encerra a conexão."""
+        if self._worker is not None:
+            while self._pending is not _NOTHING and not self._worker.done():
+                await asyncio.sleep(0.05)
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+
+def parse_presenter_targets(spec):
+    """
+    Lê PRESENTER_TARGETS: "idioma=ip:porta[/caminho]" separados por vírgula,
+    ex: "pt-BR=10.5.0.2:20562,es=10.5.0.3:20562/v1/stage/message".
+    Retorna {idioma: (ip, porta, caminho)}.
+    """
+    targets = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        language, _, address = entry.partition("=")
+        host, _, path = address.strip().partition("/")
+        ip, _, port = host.partition(":")
+        if not language or not ip or not port.isdigit():
+            raise ValueError(f"PRESENTER_TARGETS inválido: '{entry}' (use idioma=ip:porta[/caminho])")
+        targets[language.strip()] = (ip, int(port), "/" + path if path else STAGE_MESSAGE_PATH)
+    return targets
+
+
+_default_client = None
+
+
 def send_text_to_presenter(text):
     """
     Envia o texto para a camada de legendas (Props) do ProPresenter 7.
+    Versão síncrona; reutiliza a mesma conexão keep-alive entre chamadas.
     """
-    # URL CORRIGIDA
-    url = f"http://{PROPRESENTER_IP}:{PROPRESENTER_PORT}/v1/stage/message"
-
-    payload = text
-    try:
-        response = requests.put(
-            url,
-            json=payload,                # ← enviar como JSON
-            auth=("pro", PASSWORD),
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        # response = requests.post(url, data=json.dumps(payload), headers=headers)
-        response.raise_for_status()
-        # print("Texto enviado com sucesso para o ProPresenter!")
-        return True
-    except requests.exceptions.HTTPError as errh:
-        print(f"Erro HTTP: {errh.response.status_code} - {errh.response.reason}")
-        print(f"Resposta do Servidor: {errh.response.text}")
-    except requests.exceptions.ConnectionError as errc:
-        print(f"Erro de Conexão: Verifique o IP e a porta do ProPresenter. {errc}")
-    except requests.exceptions.RequestException as err:
-        print(f"Ocorreu um erro inesperado: {err}")
-    
-    return False
+    global _default_client
+    if _default_client is None:
+        _default_client = PresenterClient()
+    return _default_client.send(text)
 
 if __name__ == '__main__':
     # Exemplo de uso:
     # test_text = "Esta é uma mensagem de teste para o ProPresenter2."
     # send_text_to_presenter(test_text)
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,367 @@
+"""
+Motores de reconhecimento de fala usados por transcribe_stream. Todos têm a
+mesma forma e entregam respostas no formato de StreamingRecognizeResponse
+(results[0].alternatives[0].transcript, is_final, result_end_time):
+
+    name                            (texto para logs)
+    await start()                   (carrega o modelo/cria o cliente uma vez)
+    responses(chunks)               (async iterável de (chunk, em_pausa) → respostas)
+    await close()
+
+- GoogleRecognitionBackend: streaming do Google (com troca automática de stream)
+- LocalRecognitionBackend: reconhecimento na CPU (Vosk), sem rede, numa
+  thread própria para nunca travar o loop asyncio
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+
+def make_response(transcript, is_final, confidence=0.9, end_time=None):
+    """Resposta no mesmo formato de StreamingRecognizeResponse."""
+    alternative = SimpleNamespace(transcript=transcript, confidence=confidence if is_final else 0.0)
+    result = SimpleNamespace(alternatives=[alternative], is_final=is_final,
+                             result_end_time=timedelta(seconds=end_time) if end_time is not None else None)
+    return SimpleNamespace(results=[result])
+
+
+class GoogleRecognitionBackend:
+    name = "google"
+
+    def __init__(self, streaming_config, chunk_seconds, client=None, encoder=None):
+        self.streaming_config = streaming_config
+        self.chunk_seconds = chunk_seconds
+        # Compressão do áudio enviado (audio_encoding.AudioEncoder); None = LINEAR16
+        self.encoder = encoder
+        # Cliente já pronto (ex: ScriptedSpeechClient no replay); senão criado em start()
+        self.client = client
+        # StreamSessionManager da transcrição atual (estatísticas das trocas de stream)
+        self.manager = None
+
+    async def start(self):
+        if self.client is None:
+            from google.cloud import speech_v1p1beta1 as speech
+            self.client = speech.SpeechAsyncClient()
+
+    async def warm_up(self, timeout=5.0):
+        """Abre o canal gRPC (DNS + TLS) antes da primeira frase, sem requisição cobrada."""
+        channel = getattr(getattr(self.client, "transport", None), "grpc_channel", None)
+        if channel is None:
+            return
+        try:
+            await asyncio.wait_for(channel.channel_ready(), timeout)
+        except Exception as e:
+            print(f"[AVISO] Canal do Speech ainda não conectou ({type(e).__name__}); conecta na primeira frase")
+
+    def responses(self, chunks):
+        from google.cloud import speech_v1p1beta1 as speech
+        from stream_session import StreamSessionManager
+
+        self.manager = StreamSessionManager(
+            self.client,
+            self.streaming_config,
+            speech.StreamingRecognizeRequest,
+            chunk_seconds=self.chunk_seconds,
+            encoder=self.encoder
+        )
+        return self.manager.responses(chunks)
+
+    async def close(self):
+        if self.client is not None and hasattr(self.client, "transport"):
+            try:
+                await self.client.transport.close()
+            except Exception:
+                pass
+
+
+class VoskModel:
+    """Modelo Vosk/Kaldi (pasta baixada de alphacephei.com/vosk/models)."""
+
+    def __init__(self, path):
+        import vosk
+
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(path)
+
+    def recognizer(self, rate):
+        recognizer = self._vosk.KaldiRecognizer(self.model, rate)
+        recognizer.SetWords(True)
+        return recognizer
+
+
+class StubRecognizer:
+    """
+    Reconhecedor falso com a interface do KaldiRecognizer: uma palavra
+    ("w0", "w1"...) a cada `word_seconds` de áudio com voz e um final depois
+    de `endpoint_silence` de silêncio. `cpu_factor` simula o custo de
+    decodificação (segundos de CPU por segundo de áudio).
+    """
+
+    def __init__(self, rate, word_seconds=0.3, endpoint_silence=0.5, threshold=0.01, cpu_factor=0.05):
+        self.rate = rate
+        self.word_seconds = word_seconds
+        self.endpoint_silence = endpoint_silence
+        self.threshold = threshold
+        self.cpu_factor = cpu_factor
+        self._position = 0.0
+        self._voiced = 0.0
+        self._silence = 0.0
+        self._words = []
+        self._next_word = 0
+
+    def AcceptWaveform(self, data):
+        samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        seconds = len(samples) / self.rate
+        time.sleep(self.cpu_factor * seconds)
+        self._position += seconds
+        if len(samples) and np.sqrt(np.mean(samples * samples)) > self.threshold:
+            self._silence = 0.0
+            self._voiced += seconds
+            while self._voiced >= self.word_seconds:
+                self._voiced -= self.word_seconds
+                self._words.append({"word": f"w{self._next_word}", "end": self._position, "conf": 1.0})
+                self._next_word += 1
+            return False
+        self._silence += seconds
+        return bool(self._words) and self._silence >= self.endpoint_silence
+
+    def _take(self):
+        words, self._words = self._words, []
+        self._voiced = 0.0
+        return json.dumps({"text": " ".join(w["word"] for w in words), "result": words})
+
+    def Result(self):
+        return self._take()
+
+    def FinalResult(self):
+        return self._take()
+
+    def PartialResult(self):
+        return json.dumps({"partial": " ".join(w["word"] for w in self._words)})
+
+
+class StubRecognizerModel:
+    def __init__(self, **options):
+        self.options = options
+
+    def recognizer(self, rate):
+        return StubRecognizer(rate, **self.options)
+
+
+def load_recognition_model(path):
+    """'stub' = StubRecognizerModel; senão, pasta de um modelo Vosk."""
+    if path == "stub":
+        return StubRecognizerModel()
+    return VoskModel(path)
+
+
+class LocalRecognitionBackend:
+    """
+    Reconhecimento na CPU, sem rede. O modelo é carregado uma vez em start();
+    cada chunk é decodificado numa única thread dedicada (o reconhecedor
+    guarda estado e precisa dos chunks em ordem). O Vosk libera o GIL durante
+    a decodificação, então o loop asyncio e a captura seguem normalmente.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path, rate, channels=1, loader=load_recognition_model):
+        self.model_path = model_path
+        self.rate = rate
+        self.channels = channels
+        self.loader = loader
+        self.model = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reconhecimento-local")
+
+        self.stats = {
+            'chunks': 0,
+            'finais': 0,
+            'audio': 0.0,            # Segundos de áudio decodificados
+            'processamento': 0.0,    # Segundos gastos decodificando
+            'carga': 0.0,            # Tempo para carregar o modelo
+        }
+
+    async def start(self):
+        if self.model is not None:
+            return
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        self.model = await loop.run_in_executor(self._executor, self.loader, self.model_path)
+        self.stats['carga'] = time.perf_counter() - start
+
+    async def warm_up(self):
+        """Decodifica meio segundo de silêncio: a primeira frase não paga a inicialização do decodificador."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._decode_silence)
+
+    def _decode_silence(self):
+        recognizer = self.model.recognizer(self.rate)
+        recognizer.AcceptWaveform(bytes(self.rate))
+        recognizer.FinalResult()
+
+    def _mono(self, chunk):
+        if self.channels == 1:
+            return chunk
+        samples = np.frombuffer(chunk, dtype=np.int16).reshape(-1, self.channels)
+        return samples.mean(axis=1).astype(np.int16).tobytes()
+
+    def _response(self, result_json, is_final):
+        """JSON do Kaldi → resposta no formato do Google (None se vazio)."""
+        result = json.loads(result_json)
+        if not is_final:
+            text = result.get("partial", "")
+            return make_response(text, False) if text else None
+        text = result.get("text", "")
+        if not text:
+            return None
+        words = result.get("result") or []
+        confidence = sum(w.get("conf", 1.0) for w in words) / len(words) if words else 0.9
+        end_time = words[-1]["end"] if words else None
+        self.stats['finais'] += 1
+        return make_response(text, True, confidence, end_time)
+
+    def _accept(self, recognizer, chunk):
+        start = time.perf_counter()
+        data = self._mono(chunk)
+        if recognizer.AcceptWaveform(data):
+            response = self._response(recognizer.Result(), True)
+        else:
+            response = self._response(recognizer.PartialResult(), False)
+        self.stats['processamento'] += time.perf_counter() - start
+        self.stats['audio'] += len(data) / (2 * self.rate)
+        self.stats['chunks'] += 1
+        return response
+
+    async def responses(self, chunks):
+        await self.start()
+        loop = asyncio.get_running_loop()
+        recognizer = await loop.run_in_executor(self._executor, self.model.recognizer, self.rate)
+        async for chunk, _ in chunks:
+            response = await loop.run_in_executor(self._executor, self._accept, recognizer, chunk)
+            if response is not None:
+                yield response
+        # Fim do áudio: o que sobrou no reconhecedor vira um final
+        response = await loop.run_in_executor(
+            self._executor, lambda: self._response(recognizer.FinalResult(), True)
+        )
+        if response is not None:
+            yield response
+
+    def real_time_factor(self):
+        """Tempo de decodificação por segundo de áudio (< 1 = mais rápido que o tempo real)."""
+        if not self.stats['audio']:
+            return 0.0
+        return self.stats['processamento'] / self.stats['audio']
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def create_recognition_backend(mode, streaming_config, chunk_seconds, rate, channels=1,
+                               model_path=None, client=None, encoder=None):
+    """
+    Cria o motor configurado: "google" ou "local" (modelo em `model_path`).
+    Cai para o Google se o motor local não puder ser usado.
+    """
+    google = GoogleRecognitionBackend(streaming_config, chunk_seconds, client, encoder)
+    if mode != "local":
+        return google
+    if not model_path:
+        print("[AVISO] LOCAL_RECOGNITION_MODEL vazio; usando o Google")
+        return google
+    if model_path != "stub":
+        try:
+            import vosk  # noqa: F401 (só confere se está instalado)
+        except ImportError as e:
+            print(f"[AVISO] Reconhecimento local indisponível ({e}); usando o Google")
+            return google
+    return LocalRecognitionBackend(model_path, rate, channels)
+
+
+if __name__ == '__main__':
+    # Latência e fator de tempo real (RTF) de um WAV gravado, com o áudio
+    # entregue no ritmo real. Latência do final = final recebido − fim da
+    # última palavra (result_end_time) no relógio de parede.
+    #   python recognition_backends.py culto.wav --model modelos/vosk-en
+    #   python recognition_backends.py culto.wav --google
+    import argparse
+    import os
+    import tempfile
+    import wave
+
+    from metrics import percentile
+
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de reconhecimento")
+    parser.add_argument("wav", nargs="?", help="WAV PCM 16 bits (sem argumento: pregação sintética)")
+    parser.add_argument("--model", default="stub", help="Pasta do modelo Vosk ('stub' = modelo falso)")
+    parser.add_argument("--google", action="store_true", help="Mede também o Google (precisa de credenciais)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidade de entrega do áudio")
+    args = parser.parse_args()
+
+    async def feed(wav_path, start, speed, chunk_seconds=0.1):
+        # Cada chunk sai quando o áudio dele "termina" no relógio de parede
+        with wave.open(wav_path, "rb") as wav:
+            frames = int(wav.getframerate() * chunk_seconds)
+            position = 0.0
+            while True:
+                data = wav.readframes(frames)
+                if not data:
+                    return
+                position += chunk_seconds
+                await asyncio.sleep(max(0.0, start + position / speed - time.monotonic()))
+                yield data, False
+
+    async def measure(backend, wav_path, speed):
+        await backend.start()
+        latencies = []
+        finals = 0
+        start = time.monotonic()
+        async for response in backend.responses(feed(wav_path, start, speed)):
+            result = response.results[0]
+            if not result.is_final:
+                continue
+            finals += 1
+            if result.result_end_time is not None:
+                spoken_at = start + result.result_end_time.total_seconds() / speed
+                latencies.append(time.monotonic() - spoken_at)
+        await backend.close()
+        line = (f"  {backend.name:<8} {finals} finais, latência do final p50 {percentile(latencies, 50)*1000:.0f}ms  "
+                f"p95 {percentile(latencies, 95)*1000:.0f}ms")
+        if isinstance(backend, LocalRecognitionBackend):
+            line += f", RTF {backend.real_time_factor():.3f} (modelo carregado em {backend.stats['carga']:.1f}s)"
+        print(line)
+
+    async def run(wav_path):
+        with wave.open(wav_path, "rb") as wav:
+            rate, channels = wav.getframerate(), wav.getnchannels()
+            duration = wav.getnframes() / rate
+        print(f"{os.path.basename(wav_path)}: {duration:.0f}s de áudio, {rate} Hz, {channels} canal(is)")
+        await measure(LocalRecognitionBackend(args.model, rate, channels), wav_path, args.speed)
+        if args.google:
+            from google.cloud import speech_v1p1beta1 as speech
+            config = speech.StreamingRecognitionConfig(
+                config=speech.RecognitionConfig(
+                    encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                    sample_rate_hertz=rate,
+                    audio_channel_count=channels,
+                    language_code="en-US",
+                    enable_automatic_punctuation=True,
+                    model="command_and_search",
+                ),
+                interim_results=True,
+            )
+            await measure(GoogleRecognitionBackend(config, 0.1), wav_path, args.speed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.wav:
+            path = args.wav
+        else:
+            from replay import write_synthetic_sermon
+            path, _ = write_synthetic_sermon(tmp, phrases=12)
+        asyncio.run(run(path))
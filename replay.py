@@ -0,0 +1,372 @@
+"""
+Modo replay: roda o pipeline de main.py a partir de um WAV, sem microfone,
+com serviços locais no lugar do Google (Speech e Translation) e do ProPresenter.
+Mede a latência do fim da fala até a legenda chegar na tela.
+
+    python replay.py                          # pregação sintética
+    python replay.py culto.wav culto.json     # WAV + roteiro [{"start", "end", "text"}]
+    python replay.py culto.wav --google       # Speech/Translation reais (precisa de credenciais)
+    python replay.py culto.wav --local-recognition modelos/vosk-en   # Reconhecimento local (Vosk)
+    python replay.py --fail-translation 20:40 --fail-presenter 50:60 --fail-recognition 70:2
+                                              # Falhas injetadas (segundos de áudio)
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from fake_services import FakePresenterServer, FakeTranslationClient, ScriptedSpeechClient
+from metrics import percentile
+
+SAMPLE_PHRASES = [
+    "Good morning church, it is a joy to be with you today.",
+    "Please open your Bibles to the Gospel of John.",
+    "For God so loved the world that he gave his only Son.",
+    "Faith is not a feeling, it is a decision to trust.",
+    "Let us pray together before we continue.",
+    "The Lord is my shepherd and I shall not want.",
+]
+
+
+def write_synthetic_sermon(directory, phrases=40, rate=16000, pause=1.2, noise=0.002):
+    """
+    Gera um WAV (rajadas de tom no lugar da fala) e o roteiro correspondente.
+    `pause` é o silêncio entre as frases (s) e `noise` o RMS do ruído da sala
+    (ruído grave, como ar-condicionado e ventilação).
+    """
+    rng = np.random.default_rng(0)
+    rumble = 0.95 ** np.arange(100)
+    rumble /= np.sqrt(np.sum(rumble ** 2))
+
+    def room(seconds):
+        return noise * np.convolve(rng.standard_normal(int(rate * seconds)), rumble, mode="same")
+
+    parts = []
+    script = []
+    position = 0.5
+    parts.append(room(position))
+    for i in range(phrases):
+        text = SAMPLE_PHRASES[i % len(SAMPLE_PHRASES)]
+        duration = 0.3 * len(text.split())
+        t = np.arange(int(rate * duration)) / rate
+        parts.append(0.3 * np.sin(2 * np.pi * 200 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)))
+        script.append({"start": position, "end": position + duration, "text": text})
+        parts.append(room(pause))
+        position += duration + pause
+
+    audio = (np.concatenate(parts) * 32767).astype(np.int16)
+    wav_path = os.path.join(directory, "sintetico.wav")
+    with wave.open(wav_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(audio.tobytes())
+    script_path = os.path.join(directory, "sintetico.json")
+    with open(script_path, "w", encoding="utf-8") as f:
+        json.dump(script, f)
+    return wav_path, script_path
+
+
+def parse_window(spec):
+    """'INICIO:FIM' (segundos de áudio) → (inicio, fim); None se vazio."""
+    if not spec:
+        return None
+    start, _, end = spec.partition(":")
+    return float(start), float(end)
+
+
+async def inject_failures(position, translation=None, presenters=(), speech=None,
+                          fail_translation=None, fail_presenter=None, fail_recognition=None):
+    """
+    Liga e desliga as falhas nos serviços falsos conforme o áudio passa:
+    tradução sem resposta e ProPresenter com 503 durante as janelas, e o
+    stream do reconhecimento derrubado (recusando N reconexões) no instante dado.
+    """
+    recognition_failed = False
+    while True:
+        now = position()
+        if translation is not None and fail_translation:
+            translation.failure = "sem_resposta" if fail_translation[0] <= now < fail_translation[1] else None
+        if fail_presenter:
+            for server in presenters:
+                server.failing = fail_presenter[0] <= now < fail_presenter[1]
+        if speech is not None and fail_recognition and not recognition_failed and now >= fail_recognition[0]:
+            speech.fail(streams=int(fail_recognition[1]))
+            recognition_failed = True
+        await asyncio.sleep(0.05)
+
+
+def caption_latencies(script, start_wall, speed, received):
+    """Fim da fala → primeira legenda na tela que contém a última palavra da frase."""
+    latencies = []
+    for utterance in script:
+        last_word = re.sub(r"[^\w']", "", utterance["text"].split()[-1]).upper()
+        speech_start = start_wall + utterance["start"] / speed
+        speech_end = start_wall + utterance["end"] / speed
+        for shown_at, text in received:
+            if shown_at >= speech_start and last_word in re.sub(r"[^\w' ]", " ", text.upper()).split():
+                latencies.append(shown_at - speech_end)
+                break
+    return latencies
+
+
+async def run_replay(wav_path, script, speed=1.0, stt_delay=0.3, translate_delay=0.15,
+                     presenter_delay=0.02, use_google=False, verbose=False, languages=("pt-BR",),
+                     interim_repeat=0.1, recognition_model=None, transcript_dir=None,
+                     fail_translation=None, fail_presenter=None, fail_recognition=None):
+    with wave.open(wav_path, "rb") as wav:
+        rate, channels = wav.getframerate(), wav.getnchannels()
+
+    # main.py lê a configuração na importação
+    os.environ["RATE"] = str(rate)
+    os.environ["CHANNELS"] = str(channels)
+    os.environ["CHUNK"] = str(rate // 10)
+    os.environ.setdefault("SILENCE_THRESHOLD", "0.015")
+    os.environ.setdefault("GCP_PROJECT_ID", "replay")
+    # Um ProPresenter falso por idioma
+    servers = {language: FakePresenterServer(delay=presenter_delay).start() for language in languages}
+    server = servers[languages[0]]
+    os.environ["PROPRESENTER_IP"] = server.host
+    os.environ["PROPRESENTER_PORT"] = str(server.port)
+
+    import main
+    from audio_capture import AudioCapture, WavAudioSource
+    from audio_preprocessing import create_preprocessor
+    from audio_encoding import create_audio_encoder
+    from presenter_api import PresenterClient
+    from recognition_backends import LocalRecognitionBackend
+    from translator import TranslationClient
+    from translation_backends import create_translation_backend
+    from transcript_recorder import create_transcript_recorder, export_session
+    from vad import SpeechGate, create_vad
+
+    main.TARGET_LANGUAGES = list(languages)
+    # Tempos de tela no ritmo acelerado do áudio
+    main.DISPLAY_MIN_DWELL /= speed
+    main.DISPLAY_MAX_RATE *= speed
+    main.DISPLAY_IDLE_CLEAR /= speed
+    main.DISPLAY_MAX_LAG /= speed
+    main.caption_layout.reading_speed *= speed
+    main.caption_layout.min_duration /= speed
+    main.caption_layout.max_duration /= speed
+    # Timeout e esperas de recuperação também
+    main.TRANSLATION_TIMEOUT /= speed
+    main.CIRCUIT_RESET /= speed
+    main.RESTART_MAX_DELAY /= speed
+    fake_translation = None if use_google else FakeTranslationClient(delay=translate_delay)
+    output = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(output):
+        main.translation_client = TranslationClient(
+            main.GCP_PROJECT_ID,
+            target_language=languages[0],
+            max_concurrent=main.MAX_CONCURRENT_TRANSLATIONS * len(languages),
+            metrics=main.metrics,
+            batch_window=main.TRANSLATION_BATCH_WINDOW,
+            batch_size=main.TRANSLATION_BATCH_SIZE,
+            backend=create_translation_backend(
+                main.TRANSLATION_BACKEND, main.GCP_PROJECT_ID,
+                model_paths=main.LOCAL_TRANSLATION_MODELS,
+                threads=main.LOCAL_TRANSLATION_THREADS,
+                latency_budget=main.TRANSLATION_LATENCY_BUDGET,
+                client=fake_translation,
+                breaker=main.create_breaker("traducao", main.translation_degraded_mode()),
+                timeout=main.TRANSLATION_TIMEOUT
+            )
+        )
+        await main.translation_client.start()
+        for language, fake in servers.items():
+            client = PresenterClient(ip=fake.host, port=fake.port, password="",
+                                     metrics=main.metrics, language=language,
+                                     breaker=main.create_presenter_breaker(language))
+            await client.start()
+            main.presenter_clients[language] = client
+
+        main.audio_capture = AudioCapture(rate=rate, channels=channels, chunk=main.CHUNK)
+        main.audio_preprocessor = create_preprocessor(
+            rate, channels, main.AUDIO_TARGET_RATE, main.AUDIO_HIGHPASS_HZ,
+            main.AUDIO_TARGET_LEVEL, main.AUDIO_MAX_GAIN
+        )
+        main.audio_encoder = create_audio_encoder(main.AUDIO_ENCODING, main.STT_RATE, main.STT_CHANNELS)
+        main.speech_gate = SpeechGate(
+            create_vad(main.VAD_MODE, main.STT_RATE, main.VAD_FRAME_MS, main.SILENCE_THRESHOLD, main.VAD_AGGRESSIVENESS),
+            main.STT_RATE, main.STT_CHANNELS, main.STT_CHUNK,
+            frame_ms=main.VAD_FRAME_MS,
+            hangover=main.PAUSE_DETECTION_TIME,
+            preroll=main.VAD_PREROLL,
+            pause_time=main.ROLLOVER_PAUSE_TIME
+        )
+        source = WavAudioSource(main.audio_capture, wav_path, speed=speed)
+        main.transcript_recorder = create_transcript_recorder(transcript_dir, languages, audio=True,
+                                                              rate=rate, channels=channels)
+        if recognition_model:
+            main.recognition_backend = LocalRecognitionBackend(recognition_model, main.STT_RATE, main.STT_CHANNELS)
+            await main.recognition_backend.start()
+        speech_client = None if use_google or recognition_model else ScriptedSpeechClient(
+            script, audio_clock=source.position, final_delay=stt_delay, repeat_interval=interim_repeat
+        )
+
+        task = asyncio.create_task(main.transcribe_stream(main.audio_capture, client=speech_client))
+        injector = asyncio.create_task(inject_failures(
+            source.position, fake_translation, servers.values(), speech_client,
+            fail_translation, fail_presenter, fail_recognition
+        ))
+        start_wall = time.monotonic()
+        start_epoch = time.time()
+        source.start()
+        while not source.finished.is_set():
+            await asyncio.sleep(0.05)
+        # Espera as últimas legendas saírem
+        await asyncio.sleep(stt_delay + translate_delay + presenter_delay + 1.0)
+        main.STOP.set()
+        await task
+        injector.cancel()
+        elapsed = time.monotonic() - start_wall
+        for client in main.presenter_clients.values():
+            await client.close()
+        await main.translation_client.close()
+        if main.recognition_backend is not None:
+            await main.recognition_backend.close()
+        if main.audio_encoder is not None:
+            main.audio_encoder.close()
+        if main.transcript_recorder is not None:
+            main.transcript_recorder.close()
+            exported = export_session(main.transcript_recorder.path)
+    for fake in servers.values():
+        fake.stop()
+
+    latencies = caption_latencies(script, start_wall, speed, server.received)
+    capture_stats = main.audio_capture.stats()
+    print(f"\nReplay: {os.path.basename(wav_path)} ({source.duration:.0f}s de áudio, {elapsed:.1f}s reais, "
+          f"velocidade {speed}x)")
+    for language, fake in servers.items():
+        language_latencies = caption_latencies(script, start_wall, speed, fake.received)
+        print(f"Fim da fala → legenda na tela [{language}] ({len(language_latencies)}/{len(script)} frases):")
+        print(f"  p50 {percentile(language_latencies, 50)*1000:.0f}ms  "
+              f"p95 {percentile(language_latencies, 95)*1000:.0f}ms  "
+              f"p99 {percentile(language_latencies, 99)*1000:.0f}ms  "
+              f"máx {max(language_latencies, default=0)*1000:.0f}ms")
+    print("Vazão por etapa:")
+    print(f"  Captura:      {main.audio_capture.callbacks / elapsed:.1f} chunks/s "
+          f"({capture_stats['overflows']} overflows, {capture_stats['underruns']} underruns)")
+    if main.audio_preprocessor is not None:
+        print(f"  Pré-processamento: {main.audio_preprocessor.bandwidth_ratio()*100:.0f}% da banda, "
+              f"{main.audio_preprocessor.real_time_factor()*100:.2f}% de CPU")
+    print(f"  Filtro de voz: {main.speech_gate.sent_fraction()*100:.0f}% do áudio enviado")
+    if main.audio_encoder is not None:
+        print(f"  Codec {main.audio_encoder.codec.upper()}: {main.audio_encoder.bytes_per_minute()/1024:.0f} KB/min "
+              f"({main.audio_encoder.compression_ratio()*100:.0f}% do LINEAR16), "
+              f"atraso médio {main.audio_encoder.average_delay()*1000:.0f}ms")
+    if main.recognition_backend is not None:
+        print(f"  Reconhecimento local: {main.recognition_backend.stats['finais']} finais, "
+              f"RTF {main.recognition_backend.real_time_factor():.2f}")
+    if main.transcription_manager is not None:
+        finals = main.transcription_manager.stats['finais']
+        print(f"  Transcrição:  {finals / elapsed * 60:.1f} finais/min "
+              f"({main.transcription_manager.stats['sessoes']} stream(s))")
+    calls = main.translation_client.stats['chamadas']
+    print(f"  Tradução:     {calls / elapsed * 60:.1f} chamadas/min, "
+          f"{main.translation_client.average_batch_size():.2f} trechos/chamada, "
+          f"média {main.translation_client.average_latency()*1000:.0f}ms ({main.translation_client.backend.name})")
+    backend_stats = getattr(main.translation_client.backend, 'stats', None)
+    if backend_stats and 'reserva' in backend_stats:
+        print(f"  Reserva local: {backend_stats['reserva']} chamadas "
+              f"({backend_stats['estouros']} por latência, {backend_stats['falhas']} por erro)")
+    for language, speculator in main.speculators.items():
+        print(f"  Especulação [{language}]: {speculator.hit_rate()*100:.0f}% de acertos "
+              f"({speculator.stats['acertos']}/{speculator.stats['especulacoes']}), "
+              f"{speculator.average_saved()*1000:.0f}ms economizados por acerto, "
+              f"{speculator.stats['caracteres_extras']} caracteres extras "
+              f"({speculator.stats['caracteres_extras'] / max(speculator.stats['caracteres_usados'], 1)*100:.0f}%)")
+    for language, scheduler in main.display_schedulers.items():
+        print(f"  Tela [{language}]: {scheduler.stats['atualizacoes']} atualizações, "
+              f"{scheduler.stats['suprimidas']} legendas unidas a outras, "
+              f"{scheduler.stats['telas_descartadas']} telas puladas pelo atraso máximo, "
+              f"{scheduler.stats['limpezas']} limpezas por inatividade")
+    recorder = main.transcript_recorder
+    if recorder is not None:
+        print(f"  Transcrição: {recorder.stats['gravados']} registros, {recorder.stats['fsyncs']} fsyncs, "
+              f"{recorder.average_record_time()*1e6:.0f}µs por legenda no loop, "
+              f"{len(exported)} arquivos em {os.path.dirname(recorder.path)}")
+    for language, client in main.presenter_clients.items():
+        print(f"  ProPresenter [{language}]: {client.stats['enviadas'] / elapsed * 60:.1f} envios/min, "
+              f"média {client.average_latency()*1000:.0f}ms, {client.stats['agrupadas']} agrupadas, "
+              f"{client.stats['recusadas']} recusadas pelo circuito")
+    if main.health.transitions:
+        supervisor = main.recognition_supervisor
+        print(f"Estados ({main.session_stats['frases_sem_traducao']} frases sem tradução, "
+              f"{supervisor.stats['reinicios'] if supervisor else 0} reconexões do reconhecimento):")
+        for at, name, previous, state, reason in main.health.transitions:
+            print(f"  {(at - start_epoch) * speed:6.1f}s  {name}: {previous or 'início'} → {state}"
+                  + (f" ({reason})" if reason else ""))
+    print("Latência por etapa:")
+    for line in main.metrics.report():
+        print(f"  {line}")
+    return latencies
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay offline do pipeline de legendas")
+    parser.add_argument("wav", nargs="?", help="WAV PCM 16 bits (sem argumento: pregação sintética)")
+    parser.add_argument("script", nargs="?", help="Roteiro JSON (padrão: mesmo nome do WAV com .json)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidade de reprodução")
+    parser.add_argument("--stt-delay", type=float, default=0.3, help="Atraso do final do Speech (s)")
+    parser.add_argument("--translate-delay", type=float, default=0.15, help="Atraso da tradução (s)")
+    parser.add_argument("--presenter-delay", type=float, default=0.02, help="Atraso do ProPresenter (s)")
+    parser.add_argument("--google", action="store_true", help="Usa Speech/Translation reais")
+    parser.add_argument("--local-recognition", metavar="MODELO",
+                        help="Reconhecimento local (pasta do modelo Vosk) no lugar do Speech")
+    parser.add_argument("--interim-repeat", type=float, default=0.1,
+                        help="Repete o parcial atual a cada N s de áudio, como o Google (0 = não repete)")
+    parser.add_argument("--languages", default="pt-BR", help="Idiomas das legendas, separados por vírgula")
+    parser.add_argument("--transcript", metavar="PASTA", help="Grava a transcrição (e o áudio) nesta pasta")
+    parser.add_argument("--fail-translation", metavar="INICIO:FIM",
+                        help="Tradução sem resposta entre esses segundos do áudio")
+    parser.add_argument("--fail-presenter", metavar="INICIO:FIM",
+                        help="ProPresenter respondendo 503 entre esses segundos do áudio")
+    parser.add_argument("--fail-recognition", metavar="INICIO:RECONEXOES",
+                        help="Derruba o stream do reconhecimento e recusa N reconexões")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída normal do sistema")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.wav:
+            wav_path = args.wav
+            script_path = args.script or os.path.splitext(args.wav)[0] + ".json"
+        else:
+            os.environ.setdefault("VAD_MODE", "rms")
+            wav_path, script_path = write_synthetic_sermon(tmp)
+        script = []
+        if os.path.exists(script_path):
+            with open(script_path, encoding="utf-8") as f:
+                script = json.load(f)
+        elif not (args.google or args.local_recognition):
+            sys.exit(f"Roteiro não encontrado: {script_path}")
+
+        asyncio.run(run_replay(
+            wav_path, script,
+            speed=args.speed,
+            stt_delay=args.stt_delay,
+            translate_delay=args.translate_delay,
+            presenter_delay=args.presenter_delay,
+            use_google=args.google,
+            verbose=args.verbose,
+            interim_repeat=args.interim_repeat,
+            recognition_model=args.local_recognition,
+            transcript_dir=args.transcript,
+            fail_translation=parse_window(args.fail_translation),
+            fail_presenter=parse_window(args.fail_presenter),
+            fail_recognition=parse_window(args.fail_recognition),
+            languages=[lang.strip() for lang in args.languages.split(",") if lang.strip()]
+        ))
@@ -0,0 +1,133 @@
+"""
+Tradução especulativa: quando a parte ainda não legendada da hipótese do
+Google se repete em `stable_updates` parciais seguidos, a tradução começa
+antes do final chegar. Se o trecho comitado for o mesmo texto (ou só mudar
+a pontuação final), a tradução já pronta é usada; senão é cancelada.
+"""
+import asyncio
+import time
+
+TRAILING_PUNCTUATION = ".?!,;:"
+
+
+def speculation_key(text):
+    """Texto comparável: espaços colapsados, sem pontuação no final."""
+    return " ".join(text.split()).rstrip(TRAILING_PUNCTUATION + " ")
+
+
+class _Speculation:
+    def __init__(self, text, task, started_at):
+        self.text = text
+        self.key = speculation_key(text)
+        self.task = task
+        self.started_at = started_at
+        self.finished_at = None
+
+
+class SpeculativeTranslator:
+    """
+    Uma especulação em voo por vez (a hipótese mais recente). O custo extra
+    fica limitado: especula enquanto os caracteres desperdiçados não passarem
+    de `max_extra_ratio` dos caracteres realmente legendados (mais uma folga
+    inicial de `allowance` caracteres).
+    """
+
+    def __init__(self, translate, stable_updates=4, max_extra_ratio=0.15, allowance=200,
+                 min_chars=10, clock=time.monotonic):
+        self.translate = translate          # async texto → tradução
+        self.stable_updates = stable_updates
+        self.max_extra_ratio = max_extra_ratio
+        self.allowance = allowance
+        self.min_chars = min_chars
+        self.clock = clock
+        self._last_key = None
+        self._repeats = 0
+        self._current = None
+
+        self.stats = {
+            'especulacoes': 0,
+            'acertos': 0,
+            'erros': 0,               # Trecho comitado diferente do especulado
+            'canceladas': 0,
+            'caracteres_usados': 0,   # Caracteres legendados
+            'caracteres_extras': 0,   # Caracteres traduzidos sem uso
+            'latencia_economizada': 0.0,
+        }
+
+    def _within_budget(self, extra):
+        limit = self.allowance + self.max_extra_ratio * self.stats['caracteres_usados']
+        return self.stats['caracteres_extras'] + extra <= limit
+
+    def _discard(self):
+        """Abandona a especulação atual (o texto mudou ou não foi usado)."""
+        current, self._current = self._current, None
+        if current is None:
+            return
+        self.stats['caracteres_extras'] += len(current.text)
+        if not current.task.done():
+            current.task.cancel()
+            self.stats['canceladas'] += 1
+
+    def _on_done(self, speculation):
+        speculation.finished_at = self.clock()
+
+    def observe(self, pending_text):
+        """Recebe o trecho ainda não legendado de cada resultado parcial."""
+        key = speculation_key(pending_text)
+        if key != self._last_key:
+            self._last_key = key
+            self._repeats = 1
+            if self._current is not None and self._current.key != key:
+                self._discard()
+            return
+        self._repeats += 1
+        if (self._repeats < self.stable_updates or self._current is not None
+                or len(key) < self.min_chars or not self._within_budget(len(pending_text))):
+            return
+        task = asyncio.ensure_future(self.translate(pending_text))
+        speculation = _Speculation(pending_text, task, self.clock())
+        task.add_done_callback(lambda _: self._on_done(speculation))
+        self._current = speculation
+        self.stats['especulacoes'] += 1
+
+    def take(self, text):
+        """
+        Chamado quando um trecho é comitado. Retorna uma tarefa com a
+        tradução já em andamento (acerto) ou None (erro: tradução normal).
+        """
+        self.stats['caracteres_usados'] += len(text)
+        self._last_key = None
+        self._repeats = 0
+        current = self._current
+        if current is None:
+            return None
+        if current.key != speculation_key(text):
+            self.stats['erros'] += 1
+            self._discard()
+            return None
+        self._current = None
+        self.stats['acertos'] += 1
+        return asyncio.ensure_future(self._finish(current, text, self.clock()))
+
+    async def _finish(self, speculation, text, committed_at):
+        translated = await speculation.task
+        # Economia: o quanto a tradução já tinha andado quando o trecho foi comitado
+        duration = (speculation.finished_at or self.clock()) - speculation.started_at
+        waited = max(0.0, (speculation.finished_at or self.clock()) - committed_at)
+        self.stats['latencia_economizada'] += max(0.0, duration - waited)
+        # O final costuma trazer a pontuação que o parcial não tinha
+        ending = text.rstrip()[-1:]
+        if translated and ending and ending in TRAILING_PUNCTUATION:
+            if not translated.rstrip().endswith(tuple(TRAILING_PUNCTUATION)):
+                translated = translated.rstrip() + ending
+        return translated
+
+    def hit_rate(self):
+        if not self.stats['especulacoes']:
+            return 0.0
+        return self.stats['acertos'] / self.stats['especulacoes']
+
+    def average_saved(self):
+        if not self.stats['acertos']:
+            return 0.0
+        return self.stats['latencia_economizada'] / self.stats['acertos']
@@ -0,0 +1,173 @@
+"""
+Inicialização rápida (importante para reiniciar no meio do culto):
+
+- main.py só importa o necessário; google.cloud, numpy, PyAudio e os módulos
+  de áudio são importados numa thread enquanto as conexões abrem
+- tradução, reconhecimento, ProPresenter e áudio ficam prontos ao mesmo
+  tempo (prewarm), cada um com a sua requisição de aquecimento
+- StartupTimer mede cada fase e o instante "pronto"
+
+`python startup.py` mede a importação do main.py num interpretador novo e
+falha se um módulo pesado voltar a ser importado no topo.
+"""
+import asyncio
+import importlib
+import time
+
+# Pesados demais para a importação do main.py (vão para preload)
+HEAVY_MODULES = ("google.cloud.speech_v1p1beta1", "google.cloud.translate", "grpc", "numpy",
+                 "pyaudio", "soundfile", "webrtcvad", "vosk", "ctranslate2")
+
+
+class StartupTimer:
+    """Tempo de cada fase da inicialização, a partir de `started_at` (perf_counter)."""
+
+    def __init__(self, started_at=None, clock=time.perf_counter):
+        self.clock = clock
+        self.started_at = clock() if started_at is None else started_at
+        self.phases = {}
+        self._last = self.started_at
+
+    def mark(self, phase):
+        """Fecha a fase; retorna o tempo desde o início."""
+        now = self.clock()
+        self.phases[phase] = now - self._last
+        self._last = now
+        return now - self.started_at
+
+    def elapsed(self):
+        return self.clock() - self.started_at
+
+    def summary(self):
+        return ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items())
+
+
+def _import_all(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # Opcional ausente: quem usa avisa na hora (fallback de sempre)
+            pass
+
+
+async def preload(*modules):
+    """Importa os módulos numa thread: o loop continua livre para abrir as conexões."""
+    await asyncio.to_thread(_import_all, modules)
+
+
+async def prewarm(steps):
+    """
+    Roda as etapas (nome → corrotina) ao mesmo tempo e retorna {nome: segundos}.
+    Cada etapa trata os seus avisos; um erro cancela as outras e é repassado.
+    """
+    durations = {}
+
+    async def timed(name, coroutine):
+        start = time.perf_counter()
+        await coroutine
+        durations[name] = time.perf_counter() - start
+
+    tasks = [asyncio.create_task(timed(name, coroutine)) for name, coroutine in steps.items()]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return durations
+
+
+if __name__ == '__main__':
+    # Benchmark de inicialização (cada medida num interpretador novo):
+    #   1. importação do main.py: tempo, maiores importações diretas e
+    #      módulos pesados que não deveriam estar lá
+    #   2. preload: importar google.cloud + numpy em paralelo com a espera de
+    #      rede (simulada) vs. um depois do outro
+    #   python startup.py [--runs 5] [--budget 0.2]
+    # O tempo de importação varia com a máquina: só reprova com --budget.
+    import argparse
+    import os
+    import statistics
+    import subprocess
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Tempo máximo para importar o main.py (s); sem ele o tempo só é mostrado")
+    parser.add_argument("--network", type=float, default=0.4, help="Espera de rede simulada no preload (s)")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    for name, value in (("RATE", "48000"), ("CHANNELS", "1"), ("CHUNK", "4800"), ("PROPRESENTER_IP", "127.0.0.1"),
+                        ("PROPRESENTER_PORT", "1"), ("SILENCE_THRESHOLD", "0.015"), ("GCP_PROJECT_ID", "benchmark")):
+        env.setdefault(name, value)
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    def import_profile():
+        """{módulo: (profundidade, acumulado em s)} de `import main` (sem a partida do interpretador)."""
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=here, env=env,
+                                capture_output=True, text=True, check=True)
+        entries = []
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package" (indentação = profundidade)
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, label = line.split("|", 2)
+            if not cumulative.strip().isdigit():
+                continue
+            depth = (len(label) - len(label.lstrip()) - 1) // 2
+            entries.append((label.strip(), depth, int(cumulative) / 1e6))
+        # A árvore do main vem logo antes dele, depois da última importação de nível 0
+        end = next(i for i, (name, depth, _) in enumerate(entries) if name == "main" and depth == 0)
+        begin = max((i for i in range(end) if entries[i][1] == 0), default=-1) + 1
+        return {name: (depth, seconds) for name, depth, seconds in entries[begin:end + 1]}
+
+    results = []
+    profiles = [import_profile() for _ in range(args.runs)]
+    total = statistics.median(p["main"][1] for p in profiles)
+    profile = profiles[-1]
+    print(f"Importação do main.py: mediana {total*1000:.0f}ms em {args.runs} execuções")
+    direct = sorted(((seconds, name) for name, (depth, seconds) in profile.items() if depth == 1), reverse=True)
+    for seconds, name in direct[:8]:
+        print(f"    {seconds*1000:6.1f}ms  {name}")
+    heavy = [name for name in profile if name in HEAVY_MODULES]
+    results.append(check("nenhum módulo pesado no topo", not heavy, ", ".join(heavy) or "google.cloud, numpy, PyAudio adiados"))
+    if args.budget is not None:
+        results.append(check(f"importação abaixo de {args.budget*1000:.0f}ms", total < args.budget, f"{total*1000:.0f}ms"))
+
+    program = """
+import asyncio, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {here!r})
+from startup import preload, prewarm
+async def network():
+    await asyncio.sleep({network})
+async def run(parallel):
+    modules = ("google.cloud.speech_v1p1beta1", "google.cloud.translate", "numpy")
+    if parallel:
+        await prewarm({{"modulos": preload(*modules), "rede": network()}})
+    else:
+        await preload(*modules)
+        await network()
+asyncio.run(run({parallel}))
+print(time.perf_counter() - start)
+"""
+    timings = {}
+    for parallel in (False, True):
+        runs = [float(subprocess.run([sys.executable, "-c", program.format(here=here, network=args.network, parallel=parallel)],
+                                     env=env, capture_output=True, text=True, check=True).stdout)
+                for _ in range(args.runs)]
+        timings[parallel] = statistics.median(runs)
+    print(f"Importações pesadas + {args.network*1000:.0f}ms de rede: em sequência {timings[False]*1000:.0f}ms, "
+          f"em paralelo {timings[True]*1000:.0f}ms")
+    results.append(check("preload em paralelo com a rede", timings[True] < timings[False] - args.network / 2,
+                         f"{(timings[False] - timings[True])*1000:.0f}ms economizados"))
+    print("Tudo certo." if all(results) else "Há conferências com falha.")
+    raise SystemExit(0 if all(results) else 1)
@@ -0,0 +1,336 @@
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# O Google encerra streams após ~305s; trocamos antes disso, numa pausa da fala
+STREAM_ROLLOVER_AFTER = float(os.getenv("STREAM_ROLLOVER_AFTER", "270"))
+# Troca forçada (mesmo sem pausa) para nunca bater no limite
+STREAM_MAX_DURATION = float(os.getenv("STREAM_MAX_DURATION", "295"))
+# Áudio recente reenviado ao stream novo para não perder palavras na emenda
+STREAM_REPLAY_SECONDS = float(os.getenv("STREAM_REPLAY_SECONDS", "1.0"))
+# Antecedência com que o próximo stream é aberto
+PREOPEN_LEAD = 2.0
+# Stream pré-aberto sem áudio expira no Google; reabre depois desse tempo
+PREOPEN_MAX_IDLE = 5.0
+
+_STREAM_DONE = object()
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def _normalize_words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def strip_overlap(previous: str, text: str) -> str:
+    """
+    Remove do início de `text` as palavras que repetem o final de `previous`.
+    Ex: ("we read in John three", "John three sixteen says") → "sixteen says"
+    Retorna "" se `text` for inteiramente repetido.
+    """
+    prev_words = _normalize_words(previous)
+    words = text.split()
+    norm = [_normalize_words(w) for w in words]
+    flat = [w for ws in norm for w in ws]
+    if not prev_words or not flat:
+        return text
+
+    # Texto inteiro já contido na frase anterior
+    joined_prev = " " + " ".join(prev_words) + " "
+    if " " + " ".join(flat) + " " in joined_prev:
+        return ""
+
+    # Maior sobreposição sufixo(previous) == prefixo(text), mínimo 2 palavras
+    best = 0
+    for k in range(min(len(prev_words), len(flat)), 1, -1):
+        if prev_words[-k:] == flat[:k]:
+            best = k
+            break
+    if not best:
+        return text
+
+    # Converte a contagem de palavras normalizadas de volta para tokens originais
+    consumed = 0
+    for i, ws in enumerate(norm):
+        consumed += len(ws)
+        if consumed >= best:
+            return " ".join(words[i + 1:])
+    return ""
+
+
+class _Stream:
+    def __init__(self, index, opened_at):
+        self.index = index
+        self.opened_at = opened_at
+        self.queue = asyncio.Queue()
+        self.reader = None
+        self.responses = 0
+        self.last_response_at = None
+
+
+class StreamSessionManager:
+    """
+    Mantém a transcrição viva além do limite de duração do streaming do Google.
+    Abre o próximo stream com antecedência, troca numa pausa da fala, reenvia
+    um pequeno buffer de áudio recente e remove finais duplicados na emenda.
+    """
+
+    def __init__(self, client, streaming_config, request_factory, chunk_seconds,
+                 rollover_after=STREAM_ROLLOVER_AFTER, max_duration=STREAM_MAX_DURATION,
+                 replay_seconds=STREAM_REPLAY_SECONDS, clock=time.monotonic, encoder=None):
+        self.client = client
+        self.streaming_config = streaming_config
+        self.request_factory = request_factory
+        # audio_encoding.AudioEncoder (FLAC/OGG_OPUS); None = LINEAR16 como vem
+        self.encoder = encoder
+        self.rollover_after = rollover_after
+        self.max_duration = max_duration
+        self.clock = clock
+
+        self.ring = deque(maxlen=max(1, int(replay_seconds / chunk_seconds)))
+        self.seam_window = replay_seconds + 3.0
+
+        self._responses = asyncio.Queue()
+        self._active = None
+        self._next = None
+        self._previous = None
+        self._force_handover = False
+        self._handover_at = None
+        self._seam_until = 0.0
+        self._recent_finals = deque(maxlen=5)
+
+        self.stats = {
+            'sessoes': 0,
+            'trocas': 0,
+            'finais': 0,
+            'finais_duplicados': 0,   # Descartados inteiros
+            'finais_aparados': 0,     # Tiveram a sobreposição removida
+            'gap_total': 0.0,
+            'gap_max': 0.0,
+        }
+
+    async def _open_stream(self):
+        stream = _Stream(self.stats['sessoes'], self.clock())
+        self.stats['sessoes'] += 1
+
+        async def requests():
+            # Cada stream começa com o cabeçalho do codec: um codificador por stream
+            encoder = self.encoder.new_stream() if self.encoder is not None else None
+            try:
+                yield self.request_factory(streaming_config=self.streaming_config)
+                while True:
+                    chunk = await stream.queue.get()
+                    if chunk is None:
+                        return
+                    if encoder is not None:
+                        chunk = await self.encoder.encode(encoder, chunk)
+                        if not chunk:
+                            continue    # O codec ainda está juntando um quadro
+                    yield self.request_factory(audio_content=chunk)
+            finally:
+                if encoder is not None:
+                    encoder.close()
+
+        call = await self.client.streaming_recognize(requests=requests())
+        stream.reader = asyncio.create_task(self._read(stream, call))
+        return stream
+
+    async def _read(self, stream, call):
+        try:
+            async for response in call:
+                await self._responses.put((stream, response))
+        except Exception as e:
+            await self._responses.put((stream, e))
+        finally:
+            await self._responses.put((stream, _STREAM_DONE))
+
+    def _handover(self):
+        old, new = self._active, self._next
+        self._next = None
+        # Reenvia o áudio recente para o stream novo
+        for chunk in self.ring:
+            new.queue.put_nowait(chunk)
+        self._active = new
+        self._previous = old
+        self._handover_at = self.clock()
+        self._seam_until = self._handover_at + self.seam_window
+        # O stream antigo ainda entrega os finais pendentes antes de fechar
+        old.queue.put_nowait(None)
+        self.stats['trocas'] += 1
+
+    async def _pump(self, audio_chunks):
+        """
+        Distribui os chunks de áudio para o stream ativo, trocando quando preciso.
+        Se o stream novo não abre (ex: rede fora), o erro vai para `responses`.
+        """
+        try:
+            await self._pump_chunks(audio_chunks)
+        except Exception as e:
+            await self._responses.put((None, e))
+
+    async def _pump_chunks(self, audio_chunks):
+        async for data, in_pause in audio_chunks:
+            now = self.clock()
+            age = now - self._active.opened_at
+
+            if self._next is not None and now - self._next.opened_at > PREOPEN_MAX_IDLE:
+                self._next.queue.put_nowait(None)
+                self._next = None
+
+            if self._next is None and (age >= self.rollover_after - PREOPEN_LEAD or self._force_handover):
+                self._next = await self._open_stream()
+
+            if self._next is not None and (
+                (in_pause and age >= self.rollover_after)
+                or age >= self.max_duration
+                or self._force_handover
+            ):
+                self._force_handover = False
+                self._handover()
+
+            self.ring.append(data)
+            self._active.queue.put_nowait(data)
+
+        self._active.queue.put_nowait(None)
+        if self._next is not None:
+            self._next.queue.put_nowait(None)
+
+    def _dedupe(self, stream, response):
+        now = self.clock()
+        if stream.responses == 0 and stream is self._active and self._handover_at is not None:
+            last_old = self._previous.last_response_at if self._previous else None
+            gap = max(0.0, now - (last_old if last_old is not None else self._handover_at))
+            self.stats['gap_total'] += gap
+            self.stats['gap_max'] = max(self.stats['gap_max'], gap)
+        stream.responses += 1
+        stream.last_response_at = now
+
+        if not response.results or not response.results[0].alternatives:
+            return response
+        result = response.results[0]
+        alternative = result.alternatives[0]
+
+        if stream is self._active and stream.index > 0 and now < self._seam_until and self._recent_finals:
+            stripped = strip_overlap(self._recent_finals[-1], alternative.transcript.strip())
+            if not stripped:
+                if result.is_final:
+                    self.stats['finais'] += 1
+                    self.stats['finais_duplicados'] += 1
+                return None
+            if stripped != alternative.transcript.strip():
+                alternative.transcript = stripped
+                if result.is_final:
+                    self.stats['finais_aparados'] += 1
+
+        if result.is_final:
+            self.stats['finais'] += 1
+            self._recent_finals.append(alternative.transcript)
+        return response
+
+    async def responses(self, audio_chunks):
+        """
+        Iterador assíncrono de respostas que atravessa as trocas de stream.
+        `audio_chunks` é um iterador assíncrono de (bytes, em_pausa).
+        """
+        self._active = await self._open_stream()
+        pump = asyncio.create_task(self._pump(audio_chunks))
+        try:
+            while True:
+                stream, item = await self._responses.get()
+                if stream is None:
+                    raise item
+                if item is _STREAM_DONE:
+                    if stream is self._active:
+                        if pump.done():
+                            break
+                        # O servidor encerrou o stream ativo: troca no próximo chunk
+                        self._force_handover = True
+                    continue
+                if isinstance(item, Exception):
+                    if stream is self._active and stream.responses == 0:
+                        raise item
+                    continue
+                response = self._dedupe(stream, item)
+                if response is not None:
+                    yield response
+        finally:
+            pump.cancel()
+            for s in (self._active, self._next, self._previous):
+                if s is not None and s.reader is not None:
+                    s.reader.cancel()
+
+    def duplicate_rate(self):
+        if not self.stats['finais']:
+            return 0.0
+        return self.stats['finais_duplicados'] / self.stats['finais']
+
+
+async def iterate_in_thread(generator):
+    """
+    Consome um gerador bloqueante numa thread, sem travar o loop asyncio.
+    Ao sair (fim, erro ou cancelamento) o gerador é fechado; se a thread ainda
+    estiver dentro de next(), ele é fechado quando ela devolver.
+    """
+    loop = asyncio.get_running_loop()
+    end = object()
+    pending = None
+    try:
+        while True:
+            # shield: cancelar a espera não solta o gerador ainda em execução
+            pending = loop.run_in_executor(None, next, generator, end)
+            item = await asyncio.shield(pending)
+            if item is end:
+                return
+            yield item
+    finally:
+        if pending is not None and not pending.done():
+            pending.add_done_callback(lambda done: _close_generator(generator, done))
+        else:
+            generator.close()
+
+
+def _close_generator(generator, done):
+    if not done.cancelled():
+        done.exception()     # Já não há quem espere pelo resultado
+    generator.close()
+
+
+if __name__ == '__main__':
+    # Mede a emenda entre streams com o servidor falso (sem rede)
+    from fake_services import FakeSpeechClient, synthetic_sentences, synthetic_sermon
+
+    async def run():
+        clock = [0.0]
+        client = FakeSpeechClient(max_duration=30.0, clock=lambda: clock[0])
+        manager = StreamSessionManager(
+            client, None, lambda **kw: kw, chunk_seconds=0.1,
+            rollover_after=20.0, max_duration=28.0, replay_seconds=1.0,
+            clock=lambda: clock[0]
+        )
+        sentences = synthetic_sentences(200)
+
+        async def chunks():
+            for item in synthetic_sermon(sentences):
+                clock[0] += 0.1
+                yield item
+                await asyncio.sleep(0)
+
+        finals = []
+        async for response in manager.responses(chunks()):
+            if response.results[0].is_final:
+                finals.append(response.results[0].alternatives[0].transcript)
+
+        spoken = " ".join(sentences).split()
+        got = " ".join(finals).split()
+        print(f"Streams: {manager.stats['sessoes']}  Trocas: {manager.stats['trocas']}")
+        print(f"Palavras faladas: {len(spoken)}  Transcritas: {len(got)}  "
+              f"Perdidas: {len(set(spoken) - set(got))}  Repetidas: {len(got) - len(set(got))}")
+        print(f"Finais duplicados removidos: {manager.duplicate_rate()*100:.1f}%  "
+              f"(aparados: {manager.stats['finais_aparados']})")
+        print(f"Gap máximo na troca: {manager.stats['gap_max']*1000:.0f}ms")
+
+    asyncio.run(run())
@@ -0,0 +1,454 @@
+"""
+Resiliência durante o culto:
+
+- CircuitBreaker: depois de `failure_threshold` falhas seguidas o serviço
+  (tradução, ProPresenter) fica "aberto" e as chamadas falham na hora, sem
+  pagar o timeout a cada legenda; passados `reset_timeout` segundos uma
+  chamada de teste ("meio-aberto") decide se ele volta ao normal
+- Supervisor: reinicia uma etapa que caiu (ex: streaming do Google) com
+  espera exponencial e jitter, em vez de encerrar o programa
+- HealthMonitor: estado de cada componente ("normal", "degradado",
+  "reiniciando", ...) e as transições no console e no log de métricas
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+CLOSED = "fechado"
+OPEN = "aberto"
+HALF_OPEN = "meio-aberto"
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem tentar: o circuito do serviço está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um serviço remoto. Pode ser usado de duas formas:
+      await breaker.call(funcao_async, *args)            (tradução)
+      breaker.allow() → chamada → success()/failure()    (ProPresenter, numa thread)
+    `on_change(nome, de, para)` é chamado a cada mudança de estado.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=10.0, clock=time.monotonic, on_change=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.on_change = on_change
+        self.state = CLOSED
+
+        self._failures = 0          # Falhas seguidas
+        self._opened_at = 0.0
+        self._probing = False       # Chamada de teste em andamento (meio-aberto)
+        # O ProPresenter envia de uma thread própria
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'falhas': 0,
+            'recusadas': 0,     # Chamadas que falharam na hora (circuito aberto)
+            'aberturas': 0,
+        }
+
+    def _set(self, state):
+        """Muda o estado (com o lock); retorna a transição para notificar fora do lock."""
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = self.clock()
+            self.stats['aberturas'] += 1
+        return previous, state
+
+    def _notify(self, change):
+        if change is not None and self.on_change is not None:
+            self.on_change(self.name, *change)
+
+    def allow(self):
+        """True se a chamada pode ser feita agora (no meio-aberto, só uma por vez)."""
+        change = None
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    self.stats['recusadas'] += 1
+                    return False
+                change = self._set(HALF_OPEN)
+            elif self.state == HALF_OPEN and self._probing:
+                self.stats['recusadas'] += 1
+                return False
+            if self.state == HALF_OPEN:
+                self._probing = True
+        self._notify(change)
+        return True
+
+    def success(self):
+        change = None
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                change = self._set(CLOSED)
+        self._notify(change)
+
+    def failure(self):
+        change = None
+        with self._lock:
+            self._failures += 1
+            self.stats['falhas'] += 1
+            self._probing = False
+            if self.state != OPEN and (self.state == HALF_OPEN or self._failures >= self.failure_threshold):
+                change = self._set(OPEN)
+        self._notify(change)
+
+    def release(self):
+        """A chamada foi cancelada (sem sucesso nem falha): libera o teste do meio-aberto."""
+        with self._lock:
+            self._probing = False
+
+    def retry_in(self):
+        """Segundos até a próxima chamada de teste; None se o circuito não está aberto."""
+        if self.state != OPEN:
+            return None
+        return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def describe(self):
+        retry = self.retry_in()
+        if retry is None:
+            return f"{self.name}: circuito {self.state}"
+        return f"{self.name}: circuito aberto (nova tentativa em {retry:.0f}s)"
+
+    async def call(self, fn, *args):
+        """Chama `await fn(*args)` pelo disjuntor; CircuitOpenError se estiver aberto."""
+        if not self.allow():
+            raise CircuitOpenError(self.describe())
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception:
+            self.failure()
+            raise
+        self.success()
+        return result
+
+
+def backoff_delays(base=0.5, maximum=30.0, rng=random):
+    """
+    Esperas entre tentativas: o teto dobra a cada tentativa (até `maximum`) e
+    a espera é sorteada entre metade do teto e o teto, para os serviços não
+    receberem todas as reconexões no mesmo instante.
+    """
+    attempt = 0
+    while True:
+        ceiling = min(maximum, base * 2 ** attempt)
+        yield ceiling / 2 + rng.uniform(0, ceiling / 2)
+        attempt += 1
+
+
+class Supervisor:
+    """
+    Roda a etapa `factory()` (corrotina) e a cria de novo quando ela cai com
+    erro, esperando `backoff_delays` entre as tentativas. Retorna quando a
+    etapa termina normalmente ou quando `stop` (asyncio.Event) é ligado.
+    Se a etapa ficou de pé por `stable_after` segundos, a espera recomeça
+    do início. `on_restart()` roda antes de cada nova tentativa.
+    """
+
+    def __init__(self, name, factory, health=None, base_delay=0.5, max_delay=30.0, stable_after=60.0,
+                 max_restarts=None, stop=None, on_restart=None, clock=time.monotonic, sleep=asyncio.sleep,
+                 rng=random):
+        self.name = name
+        self.factory = factory
+        self.health = health
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.max_restarts = max_restarts
+        self.stop = stop
+        self.on_restart = on_restart
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+
+        self.stats = {
+            'falhas': 0,
+            'reinicios': 0,
+            'espera_total': 0.0,
+        }
+
+    def _stopped(self):
+        return self.stop is not None and self.stop.is_set()
+
+    async def _pause(self, seconds):
+        """Espera antes de reiniciar; volta antes se o programa estiver encerrando."""
+        if self.stop is None:
+            await self.sleep(seconds)
+            return
+        try:
+            await asyncio.wait_for(self.stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        delays = None
+        restarts = 0
+        while True:
+            started = self.clock()
+            try:
+                return await self.factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._stopped():
+                    return None
+                self.stats['falhas'] += 1
+                if delays is None or self.clock() - started >= self.stable_after:
+                    delays = backoff_delays(self.base_delay, self.max_delay, self.rng)
+                    restarts = 0
+                if self.max_restarts is not None and restarts >= self.max_restarts:
+                    if self.health is not None:
+                        self.health.set(self.name, "parado", f"{type(e).__name__}: {e}")
+                    raise
+                delay = next(delays)
+                if self.health is not None:
+                    self.health.set(self.name, "reiniciando",
+                                    f"{type(e).__name__}: {e}; nova tentativa em {delay:.1f}s")
+                else:
+                    print(f"\n[AVISO] {self.name} caiu ({type(e).__name__}: {e}); nova tentativa em {delay:.1f}s")
+                self.stats['espera_total'] += delay
+                await self._pause(delay)
+                if self._stopped():
+                    return None
+                restarts += 1
+                self.stats['reinicios'] += 1
+                if self.on_restart is not None:
+                    self.on_restart()
+
+
+class HealthMonitor:
+    """
+    Estado de cada componente. Mudanças aparecem no console ([ESTADO]) e no
+    log de métricas (evento "estado"); as últimas ficam em `transitions`.
+    """
+
+    NORMAL = "normal"
+
+    def __init__(self, metrics=None, history=100):
+        self.metrics = metrics
+        self.components = {}                    # nome → (estado, motivo, desde)
+        self.transitions = deque(maxlen=history)  # (instante, nome, de, para, motivo)
+
+    def set(self, name, state, reason=""):
+        """Muda o estado do componente; retorna False se ele já estava nesse estado."""
+        previous = self.components.get(name, (None,))[0]
+        if previous == state:
+            return False
+        self.components[name] = (state, reason, time.time())
+        self.transitions.append((time.time(), name, previous, state, reason))
+        if previous is not None or state != self.NORMAL:
+            print(f"\n[ESTADO] {name}: {previous or 'início'} → {state}" + (f" ({reason})" if reason else ""))
+        if self.metrics is not None:
+            self.metrics.log("estado", componente=name, de=previous, para=state, motivo=reason)
+        return True
+
+    def state(self, name):
+        return self.components.get(name, (self.NORMAL,))[0]
+
+    def degraded(self):
+        """[(nome, estado, motivo)] dos componentes fora do normal."""
+        return [(name, state, reason) for name, (state, reason, _) in self.components.items()
+                if state != self.NORMAL]
+
+    def breaker(self, name, degraded_reason, **options):
+        """
+        CircuitBreaker ligado a este monitor: aberto = "degradado" (com o
+        modo em que o sistema segue, ex: "texto original na tela"),
+        meio-aberto = "testando", fechado = "normal".
+        """
+        states = {OPEN: "degradado", HALF_OPEN: "testando", CLOSED: self.NORMAL}
+
+        def on_change(_, previous, state):
+            self.set(name, states[state], degraded_reason if state == OPEN else "")
+
+        return CircuitBreaker(name, on_change=on_change, **options)
+
+
+if __name__ == '__main__':
+    # Conferências com os serviços falsos (injeção de falhas, sem rede):
+    #   python supervisor.py
+    import contextlib
+    import io
+
+    from fake_services import FakePresenterServer, FakeSpeechClient, FakeTranslationClient
+    from fake_services import synthetic_sentences, synthetic_sermon
+    from presenter_api import PresenterClient
+    from stream_session import StreamSessionManager
+    from translation_backends import GoogleTranslationBackend
+    from translator import TranslationClient
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    def check_breaker():
+        results = []
+        now = [0.0]
+        health = HealthMonitor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            breaker = health.breaker("servico", "modo reserva", failure_threshold=3, reset_timeout=10.0,
+                                     clock=lambda: now[0])
+            for _ in range(3):
+                breaker.allow()
+                breaker.failure()
+            refused = not breaker.allow()
+            now[0] = 10.0
+            probe, second = breaker.allow(), breaker.allow()
+            breaker.success()
+        states = [state for _, _, _, state, _ in health.transitions]
+        results.append(check("circuito abre depois de 3 falhas e recusa na hora", refused and breaker.stats['aberturas'] == 1,
+                             f"{breaker.stats['recusadas']} recusada(s)"))
+        results.append(check("meio-aberto deixa passar uma chamada de teste", probe and not second,
+                             "teste liberado, segunda chamada recusada"))
+        results.append(check("transições informadas", states == ["degradado", "testando", "normal"], " → ".join(states)))
+        return results
+
+    async def check_translation(captions=8, timeout=0.2):
+        """Google "fora do ar" (não responde): cada legenda espera o timeout sem o circuito."""
+        results = []
+        elapsed = {}
+        for with_breaker in (False, True):
+            fake = FakeTranslationClient(delay=0.01)
+            fake.failure = "sem_resposta"
+            breaker = CircuitBreaker("traducao", failure_threshold=3, reset_timeout=60.0) if with_breaker else None
+            client = TranslationClient("teste", backend=GoogleTranslationBackend("teste", fake, breaker=breaker,
+                                                                                 timeout=timeout))
+            with contextlib.redirect_stdout(io.StringIO()):
+                await client.start()    # O aquecimento já conta uma falha
+            start = time.perf_counter()
+            for i in range(captions):
+                try:
+                    await client.translate(f"Caption {i}.")
+                except Exception:
+                    pass
+            elapsed[with_breaker] = time.perf_counter() - start
+        results.append(check("tradução fora do ar falha na hora com o circuito aberto",
+                             elapsed[True] < 3 * timeout < elapsed[False],
+                             f"{captions} legendas: {elapsed[False]*1000:.0f}ms sem circuito, "
+                             f"{elapsed[True]*1000:.0f}ms com circuito"))
+
+        # Recuperação: a chamada de teste volta a traduzir
+        fake = FakeTranslationClient(delay=0.01)
+        breaker = CircuitBreaker("traducao", failure_threshold=2, reset_timeout=0.1)
+        client = TranslationClient("teste", backend=GoogleTranslationBackend("teste", fake, breaker=breaker))
+        await client.start()
+        fake.failure = "erro"
+        for _ in range(3):
+            with contextlib.suppress(Exception):
+                await client.translate("Amen")
+        fake.failure = None
+        await asyncio.sleep(0.15)
+        translated = await client.translate("Amen")
+        results.append(check("tradução volta depois que o serviço volta", translated == "AMEN" and breaker.state == CLOSED,
+                             f"{fake.calls} chamadas ao serviço, {breaker.stats['recusadas']} recusada(s)"))
+        return results
+
+    async def check_presenter(captions=10):
+        """ProPresenter respondendo 503: o circuito abre e a última legenda é reenviada quando ele volta."""
+        results = []
+        server = FakePresenterServer().start()
+        server.failing = True
+        breaker = CircuitBreaker("propresenter", failure_threshold=2, reset_timeout=0.3)
+        client = PresenterClient(server.host, server.port, password="", latency_budget=0.2, breaker=breaker)
+        await client.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for i in range(captions):
+                client.submit(f"Legenda {i}")
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            attempts = client.stats['tentativas']
+            server.failing = False
+            await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - start
+        await client.close()
+        server.stop()
+        last = server.received[-1][1] if server.received else None
+        results.append(check("ProPresenter fora do ar: legendas recusadas sem tentar",
+                             breaker.stats['recusadas'] > 0 and attempts < 3 * captions,
+                             f"{attempts} tentativas HTTP para {captions} legendas, "
+                             f"{client.stats['recusadas']} recusadas pelo circuito"))
+        results.append(check("última legenda reenviada quando o ProPresenter volta",
+                             last == f"Legenda {captions - 1}" and breaker.state == CLOSED,
+                             f"tela com '{last}' {elapsed:.1f}s depois"))
+        return results
+
+    async def check_supervisor():
+        results = []
+        waits = []
+        failures = [3]
+
+        async def fake_sleep(seconds):
+            waits.append(seconds)
+
+        async def stage():
+            if failures[0]:
+                failures[0] -= 1
+                raise ConnectionError("UNAVAILABLE")
+            return "ok"
+
+        supervisor = Supervisor("etapa", stage, base_delay=0.5, max_delay=30.0, sleep=fake_sleep,
+                                rng=random.Random(0))
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await supervisor.run()
+        ceilings = [0.5 * 2 ** i for i in range(len(waits))]
+        results.append(check("etapa reiniciada até voltar", result == "ok" and supervisor.stats['reinicios'] == 3,
+                             f"{supervisor.stats['reinicios']} reinícios"))
+        results.append(check("espera exponencial com jitter",
+                             all(c / 2 <= w <= c for w, c in zip(waits, ceilings)) and len(set(waits)) == len(waits),
+                             ", ".join(f"{w:.2f}s" for w in waits)))
+
+        # Reconhecimento: o stream cai e o Google recusa 2 reconexões
+        sentences = synthetic_sentences(60)
+        client = FakeSpeechClient()
+        finals = []
+        audio = synthetic_sermon(sentences)
+        fed = [0]
+
+        async def chunks():
+            for item in audio:
+                fed[0] += 1
+                if fed[0] == 150:
+                    client.fail(streams=2)
+                yield item
+                await asyncio.sleep(0)
+
+        async def recognize():
+            manager = StreamSessionManager(client, None, lambda **kw: kw, chunk_seconds=0.1)
+            async for response in manager.responses(chunks()):
+                if response.results[0].is_final:
+                    finals.append(response.results[0].alternatives[0].transcript)
+
+        health = HealthMonitor()
+        supervisor = Supervisor("reconhecimento", recognize, health=health, base_delay=0.02, max_delay=0.1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.wait_for(supervisor.run(), 30)
+        got = set(" ".join(finals).split())
+        spoken = " ".join(sentences).split()
+        lost = len(set(spoken) - got)
+        results.append(check("reconhecimento reinicia depois de o stream cair",
+                             supervisor.stats['reinicios'] >= 2 and lost < len(spoken) * 0.05,
+                             f"{supervisor.stats['reinicios']} reinícios, {client.streams_opened} streams, "
+                             f"{lost} de {len(spoken)} palavras perdidas"))
+        return results
+
+    async def run():
+        results = check_breaker()
+        results += await check_translation()
+        results += await check_presenter()
+        results += await check_supervisor()
+        print("Tudo certo." if all(results) else "Há conferências com falha.")
+        return all(results)
+
+    raise SystemExit(0 if asyncio.run(run()) else 1)
@@ -0,0 +1,382 @@
+"""
+Gravação da transcrição do culto: cada par original/tradução (com horário,
+tempo na tela e confiança) vai para um log JSON-lines só de acréscimo.
+
+O loop asyncio só coloca o registro numa fila; uma thread grava em lotes e
+faz fsync (no máximo um por `flush_interval`). Se o programa cair, perde-se
+no máximo o último lote, e uma linha cortada no fim é ignorada na leitura.
+Depois do culto o log vira SRT, WebVTT ou texto corrido.
+
+O áudio bruto pode ser guardado junto num WAV mapeado em memória: escrever
+um chunk é só copiar bytes (o cabeçalho é atualizado a cada chunk, então o
+arquivo é válido mesmo se o programa cair).
+"""
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+_CLOSE = object()
+
+
+class MappedWavWriter:
+    """WAV PCM 16 bits gravado por mmap; o arquivo cresce em blocos de `grow_seconds`."""
+
+    HEADER = 44
+
+    def __init__(self, path, rate, channels=1, grow_seconds=600):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self._step = rate * channels * 2 * grow_seconds
+        self._file = open(path, "w+b")
+        self._map = None
+        self._size = 0
+        self._capacity = 0
+        self._lock = threading.Lock()
+        self._grow(self._step)
+        self._map[:self.HEADER] = struct.pack(
+            "<4sI4s4sIHHIIHH4sI", b"RIFF", 36, b"WAVE", b"fmt ", 16, 1, channels, rate,
+            rate * channels * 2, channels * 2, 16, b"data", 0
+        )
+
+    def _grow(self, capacity):
+        # Fecha o mapa antes de mudar o tamanho do arquivo (no Windows não dá com ele aberto)
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(self.HEADER + capacity)
+        self._map = mmap.mmap(self._file.fileno(), self.HEADER + capacity)
+        self._capacity = capacity
+
+    def write(self, data):
+        with self._lock:
+            end = self._size + len(data)
+            if end > self._capacity:
+                self._grow(max(end, self._capacity + self._step))
+            self._map[self.HEADER + self._size:self.HEADER + end] = data
+            self._size = end
+            struct.pack_into("<I", self._map, 4, 36 + end)
+            struct.pack_into("<I", self._map, 40, end)
+
+    def seconds(self):
+        return self._size / (self.rate * self.channels * 2)
+
+    def flush(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(self.HEADER + self._size)
+            self._file.close()
+
+
+class TranscriptRecorder:
+    """
+    `record(...)` e `write_audio(...)` não fazem E/S: podem ser chamados do
+    loop asyncio e da thread de áudio. `start()` abre a thread de gravação.
+    """
+
+    def __init__(self, path, languages=(), audio_path=None, rate=16000, channels=1,
+                 flush_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.languages = list(languages)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.started_at = clock()
+        self.audio = MappedWavWriter(audio_path, rate, channels) if audio_path else None
+        self._audio_started = False
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue = queue.SimpleQueue()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._write_loop, name="transcricao", daemon=True)
+
+        self.stats = {
+            'registros': 0,
+            'gravados': 0,
+            'fsyncs': 0,
+            'tempo_fsync': 0.0,
+            'tempo_registro': 0.0,    # Gasto no loop asyncio (record)
+        }
+
+    def start(self):
+        self._queue.put({
+            "evento": "sessao",
+            "t": round(time.time(), 3),
+            "idiomas": self.languages,
+            "audio": os.path.basename(self.audio.path) if self.audio else None,
+        })
+        self._thread.start()
+        return self
+
+    def record(self, language, original, translated, duration=0.0, confidence=None, kind=None):
+        start = time.perf_counter()
+        record = {
+            "evento": "legenda",
+            "t": round(time.time(), 3),
+            "inicio": round(self.clock() - self.started_at, 3),
+            "duracao": round(duration, 2),
+            "idioma": language,
+            "original": original,
+            "traducao": translated,
+        }
+        if confidence:
+            record["confianca"] = round(confidence, 3)
+        if kind:
+            record["tipo"] = kind
+        self._queue.put(record)
+        self.stats['registros'] += 1
+        self.stats['tempo_registro'] += time.perf_counter() - start
+
+    def write_audio(self, chunk):
+        if self.audio is None:
+            return
+        if not self._audio_started:
+            # Marca onde o áudio começa para alinhar as legendas ao WAV
+            self._audio_started = True
+            self._queue.put({"evento": "audio", "inicio": round(self.clock() - self.started_at, 3),
+                             "taxa": self.audio.rate, "canais": self.audio.channels})
+        self.audio.write(chunk)
+
+    def average_record_time(self):
+        if not self.stats['registros']:
+            return 0.0
+        return self.stats['tempo_registro'] / self.stats['registros']
+
+    def _write_loop(self):
+        done = False
+        while not done:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = _CLOSE in batch
+            records = [item for item in batch if item is not _CLOSE]
+            if records and self._file is not None:
+                try:
+                    self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+                    self._file.flush()
+                    start = time.perf_counter()
+                    os.fsync(self._file.fileno())
+                    self.stats['tempo_fsync'] += time.perf_counter() - start
+                    self.stats['fsyncs'] += 1
+                    self.stats['gravados'] += len(records)
+                except (OSError, ValueError) as e:
+                    print(f"[AVISO] Gravação da transcrição desativada: {e}")
+                    self._file = None
+            if self.audio is not None:
+                self.audio.flush()
+            if not done:
+                # Agrupa: no máximo um fsync por intervalo
+                self._closing.wait(self.flush_interval)
+
+    def close(self):
+        """Grava o que falta e fecha os arquivos (bloqueia até a thread terminar)."""
+        self._closing.set()
+        self._queue.put(_CLOSE)
+        if self._thread.is_alive():
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.audio is not None:
+            self.audio.close()
+
+
+# Exportação -------------------------------------------------------------
+
+def load_transcript(path):
+    """Registros do log; ignora uma linha cortada (queda no meio da gravação)."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def transcript_languages(records):
+    return list(dict.fromkeys(r["idioma"] for r in records if r.get("evento") == "legenda"))
+
+
+def caption_cues(records, language=None, default_duration=2.0):
+    """
+    [(início, fim, texto)] de um idioma; language=None = texto original.
+    Os tempos contam do início do áudio gravado (ou da sessão, sem áudio), e
+    cada legenda termina quando sai da tela ou quando a próxima aparece.
+    """
+    base = next((r["inicio"] for r in records if r.get("evento") == "audio"), 0.0)
+    if language is None:
+        language = next(iter(transcript_languages(records)), None)
+        field = "original"
+    else:
+        field = "traducao"
+    captions = [r for r in records if r.get("evento") == "legenda" and r["idioma"] == language and r.get(field)]
+    cues = []
+    for i, record in enumerate(captions):
+        start = max(record["inicio"] - base, 0.0)
+        end = start + (record.get("duracao") or default_duration)
+        if i + 1 < len(captions):
+            end = min(end, max(captions[i + 1]["inicio"] - base, start))
+        cues.append((start, end, record[field]))
+    return cues
+
+
+def _timestamp(seconds, separator):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def export_srt(cues):
+    return "".join(f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n\n"
+                   for i, (start, end, text) in enumerate(cues, 1))
+
+
+def export_vtt(cues):
+    return "WEBVTT\n\n" + "".join(f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n\n"
+                                  for start, end, text in cues)
+
+
+def export_text(cues):
+    return "\n".join(text for _, _, text in cues) + "\n"
+
+
+EXPORTERS = {'srt': export_srt, 'vtt': export_vtt, 'txt': export_text}
+
+
+def export_session(path, formats=("srt", "vtt", "txt")):
+    """Um arquivo por idioma e formato ao lado do log (original = "original"). Retorna os caminhos."""
+    records = load_transcript(path)
+    stem = os.path.splitext(path)[0]
+    written = []
+    for language in [None] + transcript_languages(records):
+        cues = caption_cues(records, language)
+        if not cues:
+            continue
+        for fmt in formats:
+            output = f"{stem}.{language or 'original'}.{fmt}"
+            with open(output, "w", encoding="utf-8") as f:
+                f.write(EXPORTERS[fmt](cues))
+            written.append(output)
+    return written
+
+
+def create_transcript_recorder(directory, languages, audio=False, rate=16000, channels=1, flush_interval=1.0):
+    """Recorder com arquivos nomeados pela hora de início; None se `directory` vazio."""
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, time.strftime("culto-%Y%m%d-%H%M%S"))
+        return TranscriptRecorder(stem + ".jsonl", languages, audio_path=stem + ".wav" if audio else None,
+                                  rate=rate, channels=channels, flush_interval=flush_interval).start()
+    except OSError as e:
+        print(f"[AVISO] Transcrição não será gravada: {e}")
+        return None
+
+
+if __name__ == '__main__':
+    # Com um log: exporta SRT/VTT/texto ao lado dele
+    #   python transcript_recorder.py transcricoes/culto-20250105-1830.jsonl [--formatos srt,txt]
+    # Sem argumentos: mede o custo no caminho da legenda e confere a
+    # recuperação depois de uma queda e a exportação
+    import argparse
+    import shutil
+    import tempfile
+    import wave
+
+    from metrics import percentile
+
+    parser = argparse.ArgumentParser(description="Exporta ou testa a gravação da transcrição")
+    parser.add_argument("log", nargs="?")
+    parser.add_argument("--formatos", default="srt,vtt,txt")
+    args = parser.parse_args()
+
+    if args.log:
+        for output in export_session(args.log, args.formatos.split(",")):
+            print(output)
+        raise SystemExit
+
+    def check(name, ok, detail):
+        print(f"  {'OK  ' if ok else 'FALHA'} {name}: {detail}")
+        return ok
+
+    directory = tempfile.mkdtemp()
+    results = []
+    try:
+        recorder = create_transcript_recorder(directory, ["pt-BR", "es"], audio=True, flush_interval=0.2)
+        chunk = os.urandom(3200)    # 100 ms a 16 kHz mono
+        record_times, audio_times = [], []
+        for n in range(2000):
+            start = time.perf_counter()
+            recorder.write_audio(chunk)
+            audio_times.append(time.perf_counter() - start)
+            for language in ("pt-BR", "es"):
+                start = time.perf_counter()
+                recorder.record(language, f"And God said, let there be light {n}.", f"E disse Deus: Haja luz {n}.",
+                                duration=2.0, confidence=0.93, kind="final")
+                record_times.append(time.perf_counter() - start)
+            if n % 20 == 0:
+                time.sleep(0.01)    # A thread de gravação trabalha enquanto isso
+
+        # Queda: lê o log e o WAV antes de fechar (só o que a thread já gravou)
+        time.sleep(0.5)
+        log_path = recorder.path
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write('{"evento": "legenda", "inicio": 12')    # Linha cortada no meio
+        crashed = load_transcript(log_path)
+        with wave.open(recorder.audio.path, "rb") as wav:
+            crashed_frames = wav.getnframes()
+        results.append(check("log legível depois de uma queda", len(crashed) == 4002,
+                             f"{len(crashed)} registros, linha cortada ignorada"))
+        results.append(check("WAV válido antes de fechar", crashed_frames == 2000 * 1600,
+                             f"{crashed_frames / 16000:.0f}s de áudio no cabeçalho"))
+
+        recorder.close()
+        print(f"  Custo no caminho da legenda ({len(record_times)} registros): "
+              f"p50 {percentile(record_times, 50)*1e6:.1f}µs  p99 {percentile(record_times, 99)*1e6:.1f}µs  "
+              f"máx. {max(record_times)*1e6:.0f}µs")
+        print(f"  Custo por chunk de áudio (100 ms): p50 {percentile(audio_times, 50)*1e6:.1f}µs  "
+              f"p99 {percentile(audio_times, 99)*1e6:.1f}µs")
+        print(f"  Thread de gravação: {recorder.stats['fsyncs']} fsyncs, "
+              f"{recorder.stats['gravados'] / max(recorder.stats['fsyncs'], 1):.0f} registros por fsync, "
+              f"média {recorder.stats['tempo_fsync'] / max(recorder.stats['fsyncs'], 1)*1000:.2f}ms")
+        results.append(check("registro abaixo de 1ms", percentile(record_times, 99) < 0.001,
+                             f"p99 {percentile(record_times, 99)*1e6:.1f}µs"))
+
+        start = time.perf_counter()
+        written = export_session(log_path)
+        elapsed = time.perf_counter() - start
+        with open(next(p for p in written if p.endswith(".es.srt")), encoding="utf-8") as f:
+            srt = f.read()
+        results.append(check("exportação", len(written) == 9 and srt.startswith("1\n00:00:00,"),
+                             f"{len(written)} arquivos (original + 2 idiomas × 3 formatos) em {elapsed*1000:.0f}ms"))
+        cues = caption_cues(load_transcript(log_path), "pt-BR")
+        results.append(check("legendas não se sobrepõem", all(a[1] <= b[0] for a, b in zip(cues, cues[1:])),
+                             f"{len(cues)} legendas"))
+        expected = "1\n00:01:01,500 --> 00:01:03,000\nHaja luz.\n\n2\n00:01:03,000 --> 00:01:05,000\nE houve luz.\n\n"
+        sample = export_srt([(61.5, 63.0, "Haja luz."), (63.0, 65.0, "E houve luz.")])
+        results.append(check("formato SRT", sample == expected, "tempos e numeração"))
+    finally:
+        shutil.rmtree(directory)
+    print("Tudo certo." if all(results) else "Há conferências com falha.")
+    raise SystemExit(0 if all(results) else 1)
@@ -0,0 +1,304 @@
+"""
+Motores de tradução usados pelo TranslationClient. Todos têm a mesma forma:
+
+    name                                          (texto para logs)
+    await start()                                 (carrega/conecta uma vez)
+    await translate(contents, source, target)     (lista → lista, mesma ordem)
+    await close()
+
+- GoogleTranslationBackend: Cloud Translation API (um canal gRPC reutilizado),
+  opcionalmente com timeout e circuito (supervisor.CircuitBreaker)
+- LocalTranslationBackend: modelo local na CPU (CTranslate2/Marian), sem rede
+- FallbackTranslationBackend: usa o principal e cai para o reserva quando ele
+  falha ou passa do orçamento de latência
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from supervisor import CircuitOpenError
+
+
+class FallbackText(str):
+    """Tradução feita pelo motor reserva (não vai para o cache)."""
+    fallback = True
+
+
+class GoogleTranslationBackend:
+    name = "google"
+
+    def __init__(self, project_id, client=None, breaker=None, timeout=None):
+        self.parent = f"projects/{project_id}/locations/global"
+        # Cliente gRPC já pronto (ex: FakeTranslationClient no replay); senão criado em start()
+        self._client = client
+        # Circuito (supervisor.CircuitBreaker): com o Google fora do ar as
+        # chamadas falham na hora em vez de esperar `timeout` a cada legenda
+        self.breaker = breaker
+        self.timeout = timeout
+
+    async def start(self):
+        if self._client is None:
+            from google.cloud import translate
+            self._client = translate.TranslationServiceAsyncClient()
+
+    async def translate(self, contents, source_language, target_language):
+        if self.breaker is not None:
+            return await self.breaker.call(self._translate, contents, source_language, target_language)
+        return await self._translate(contents, source_language, target_language)
+
+    async def _translate(self, contents, source_language, target_language):
+        call = self._client.translate_text(
+            parent=self.parent,
+            contents=contents,
+            source_language_code=source_language,
+            target_language_code=target_language,
+            mime_type="text/plain"
+        )
+        if self.timeout:
+            try:
+                response = await asyncio.wait_for(call, self.timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"sem resposta do Google em {self.timeout:.1f}s") from None
+        else:
+            response = await call
+        return [t.translated_text for t in response.translations]
+
+    async def close(self):
+        if self._client is not None:
+            try:
+                await self._client.transport.close()
+            except Exception:
+                pass
+            self._client = None
+
+
+class CTranslate2Model:
+    """
+    Modelo Marian/OPUS-MT convertido para CTranslate2, com os tokenizadores
+    SentencePiece na mesma pasta:
+        ct2-transformers-converter --model Helsinki-NLP/opus-mt-en-ROMANCE \\
+            --output_dir modelos/en-pt --copy_files source.spm target.spm
+    `prefix` é o token de idioma dos modelos multilíngues (ex: ">>pt_BR<<").
+    """
+
+    def __init__(self, path, threads=2, beam_size=2, prefix=None):
+        import ctranslate2
+        import sentencepiece
+
+        self.translator = ctranslate2.Translator(path, device="cpu", inter_threads=threads, intra_threads=1)
+        self.source_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "source.spm"))
+        self.target_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(path, "target.spm"))
+        self.beam_size = beam_size
+        self.prefix = prefix
+
+    def translate_batch(self, texts):
+        tokens = []
+        for text in texts:
+            pieces = self.source_sp.encode(text, out_type=str)
+            tokens.append(([self.prefix] if self.prefix else []) + pieces + ["</s>"])
+        results = self.translator.translate_batch(tokens, beam_size=self.beam_size, max_batch_size=16)
+        return [self.target_sp.decode(result.hypotheses[0]) for result in results]
+
+
+class StubTranslationModel:
+    """
+    Modelo falso e determinístico (texto em maiúsculas), com custo de CPU
+    simulado por lote e por caractere. Para o replay e as medições.
+    """
+
+    def __init__(self, batch_cost=0.02, char_cost=0.0002):
+        self.batch_cost = batch_cost
+        self.char_cost = char_cost
+        self.batches = 0
+
+    def translate_batch(self, texts):
+        self.batches += 1
+        time.sleep(self.batch_cost + self.char_cost * sum(len(t) for t in texts))
+        return [text.upper() for text in texts]
+
+
+def load_local_model(path, threads=2):
+    """'stub' = StubTranslationModel; senão, pasta de um modelo CTranslate2 (opcional: 'pasta>>pt_BR<<')."""
+    if path == "stub":
+        return StubTranslationModel()
+    prefix = None
+    if ">>" in path:
+        path, _, token = path.partition(">>")
+        prefix = ">>" + token
+    return CTranslate2Model(path, threads=threads, prefix=prefix)
+
+
+class LocalTranslationBackend:
+    """
+    Tradução na CPU, sem rede. Os modelos (um por idioma) são carregados uma
+    vez em start() e aquecidos; cada lote roda numa thread do pool, então
+    lotes de legendas/idiomas diferentes são traduzidos em paralelo sem
+    travar o loop asyncio.
+    """
+
+    name = "local"
+
+    def __init__(self, model_paths, threads=2, loader=load_local_model):
+        self.model_paths = model_paths      # {idioma: caminho}
+        self.threads = threads
+        self.loader = loader
+        self.models = {}
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="traducao-local")
+
+        self.stats = {
+            'lotes': 0,
+            'textos': 0,
+            'carga': 0.0,       # Tempo para carregar e aquecer os modelos
+        }
+
+    async def start(self):
+        if self.models:
+            return
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        for language, path in self.model_paths.items():
+            model = await loop.run_in_executor(self._executor, self.loader, path, self.threads)
+            await loop.run_in_executor(self._executor, model.translate_batch, ["Amen"])
+            self.models[language] = model
+        self.stats['carga'] = time.perf_counter() - start
+
+    async def translate(self, contents, source_language, target_language):
+        model = self.models.get(target_language)
+        if model is None:
+            raise ValueError(f"Sem modelo local para '{target_language}'")
+        self.stats['lotes'] += 1
+        self.stats['textos'] += len(contents)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, model.translate_batch, list(contents))
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class FallbackTranslationBackend:
+    """
+    Principal (nuvem) com reserva (local): se o principal falhar ou não
+    responder dentro de `latency_budget` segundos, a mesma chamada é feita
+    no reserva e a legenda sai assim mesmo.
+    """
+
+    def __init__(self, primary, fallback, latency_budget=1.0):
+        self.primary = primary
+        self.fallback = fallback
+        self.latency_budget = latency_budget
+        self.name = f"{primary.name}+{fallback.name}"
+
+        self.stats = {
+            'principal': 0,
+            'reserva': 0,
+            'estouros': 0,      # Principal passou do orçamento de latência
+            'falhas': 0,        # Principal retornou erro
+            'recusadas': 0,     # Principal com o circuito aberto (nem tentou)
+        }
+
+    async def start(self):
+        await asyncio.gather(self.primary.start(), self.fallback.start())
+
+    async def translate(self, contents, source_language, target_language):
+        try:
+            result = await asyncio.wait_for(
+                self.primary.translate(contents, source_language, target_language),
+                self.latency_budget
+            )
+            self.stats['principal'] += 1
+            return result
+        except asyncio.TimeoutError:
+            self.stats['estouros'] += 1
+            # Estouro também conta no circuito do principal: Google lento
+            # demais a cada legenda passa a ir direto para a reserva
+            breaker = getattr(self.primary, 'breaker', None)
+            if breaker is not None:
+                breaker.failure()
+        except CircuitOpenError:
+            self.stats['recusadas'] += 1
+        except Exception as e:
+            self.stats['falhas'] += 1
+            print(f"\n[AVISO] Tradução {self.primary.name} falhou ({e}); usando {self.fallback.name}")
+        self.stats['reserva'] += 1
+        result = await self.fallback.translate(contents, source_language, target_language)
+        return [FallbackText(text) for text in result]
+
+    async def close(self):
+        await asyncio.gather(self.primary.close(), self.fallback.close())
+
+
+def parse_model_paths(spec):
+    """LOCAL_TRANSLATION_MODELS: "pt-BR=modelos/en-pt,es=modelos/en-es" → {idioma: caminho}."""
+    paths = {}
+    for entry in (spec or "").split(","):
+        language, _, path = entry.partition("=")
+        if language.strip() and path.strip():
+            paths[language.strip()] = path.strip()
+    return paths
+
+
+def create_translation_backend(mode, project_id, model_paths=None, threads=2, latency_budget=1.0, client=None,
+                               breaker=None, timeout=None):
+    """
+    Cria o motor configurado: "google", "local" ou "google+local" (nuvem com
+    reserva local). Cai para o Google se o motor local não puder ser usado.
+    `breaker` e `timeout` valem para as chamadas ao Google.
+    """
+    google = GoogleTranslationBackend(project_id, client, breaker=breaker, timeout=timeout)
+    if mode not in ("local", "google+local"):
+        return google
+    if not model_paths:
+        print("[AVISO] LOCAL_TRANSLATION_MODELS vazio; usando só o Google")
+        return google
+    try:
+        if any(path != "stub" for path in model_paths.values()):
+            import ctranslate2  # noqa: F401 (só confere se está instalado)
+            import sentencepiece  # noqa: F401
+    except ImportError as e:
+        print(f"[AVISO] Tradução local indisponível ({e}); usando só o Google")
+        return google
+    local = LocalTranslationBackend(model_paths, threads=threads)
+    if mode == "local":
+        return local
+    return FallbackTranslationBackend(google, local, latency_budget)
+
+
+if __name__ == '__main__':
+    # Modelo falso: vazão do motor local com 1, 2 e 4 threads, e a reserva
+    # entrando quando o Google (falso) passa do orçamento de latência
+    from fake_services import FakeTranslationClient
+
+    texts = [f"Sentence number {i} of the sermon about faith and grace." for i in range(64)]
+
+    async def throughput(threads, batch=8):
+        backend = LocalTranslationBackend({"pt-BR": "stub"}, threads=threads)
+        await backend.start()
+        start = time.perf_counter()
+        batches = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+        await asyncio.gather(*(backend.translate(b, "en", "pt-BR") for b in batches))
+        elapsed = time.perf_counter() - start
+        await backend.close()
+        print(f"  local, {threads} thread(s), lotes de {batch}: {len(texts) / elapsed:.0f} textos/s")
+
+    async def fallback(delay, budget=0.3):
+        google = GoogleTranslationBackend("replay", FakeTranslationClient(delay=delay))
+        backend = FallbackTranslationBackend(google, LocalTranslationBackend({"pt-BR": "stub"}), budget)
+        await backend.start()
+        start = time.perf_counter()
+        for text in texts[:10]:
+            await backend.translate([text], "en", "pt-BR")
+        elapsed = (time.perf_counter() - start) / 10
+        await backend.close()
+        print(f"  Google com {delay*1000:.0f}ms, orçamento {budget*1000:.0f}ms: "
+              f"{backend.stats['reserva']}/10 pela reserva, {elapsed*1000:.0f}ms por legenda")
+
+    async def run():
+        print("Vazão do motor local (modelo falso):")
+        for threads in (1, 2, 4):
+            await throughput(threads)
+        print("Reserva local:")
+        await fallback(0.15)
+        await fallback(2.0)
+
+    asyncio.run(run())
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Chave do cache: espaços colapsados (maiúsculas e pontuação são mantidas)."""
+    return " ".join(text.split())
+
+
+class TranslationCache:
+    """
+    Cache de traduções com LRU + TTL.
+    Pregações repetem muito texto ("Amen", versículos lidos duas vezes,
+    commits parciais repetidos), e cada acerto economiza uma chamada à API.
+    Opcionalmente salva em disco para o próximo culto já começar aquecido.
+    """
+
+    def __init__(self, max_entries=2000, ttl=7 * 24 * 3600, path=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self._entries = OrderedDict()   # chave → (tradução, criado_em)
+
+        self.stats = {
+            'acertos': 0,
+            'falhas': 0,
+            'expirados': 0,
+            'removidos': 0,
+        }
+
+    @staticmethod
+    def _key(text, source_language, target_language):
+        return f"{source_language}|{target_language}|{normalize_text(text)}"
+
+    def get(self, text, source_language, target_language):
+        key = self._key(text, source_language, target_language)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['falhas'] += 1
+            return None
+        translation, created_at = entry
+        if self.clock() - created_at > self.ttl:
+            del self._entries[key]
+            self.stats['expirados'] += 1
+            self.stats['falhas'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['acertos'] += 1
+        return translation
+
+    def put(self, text, source_language, target_language, translation):
+        key = self._key(text, source_language, target_language)
+        self._entries[key] = (translation, self.clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['removidos'] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self):
+        total = self.stats['acertos'] + self.stats['falhas']
+        return self.stats['acertos'] / total if total else 0.0
+
+    def load(self):
+        """Carrega o cache salvo (ignora entradas expiradas). Retorna quantas entraram."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[AVISO] Cache de tradução ignorado: {e}")
+            return 0
+        now = self.clock()
+        for key, translation, created_at in data.get("entries", []):
+            if now - created_at <= self.ttl:
+                self._entries[key] = (translation, created_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return len(self._entries)
+
+    def save(self):
+        """Salva em disco de forma atômica (arquivo temporário + rename)."""
+        if not self.path:
+            return
+        data = {"entries": [[key, t, created] for key, (t, created) in self._entries.items()]}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[AVISO] Não foi possível salvar o cache de tradução: {e}")
@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+from translation_backends import GoogleTranslationBackend
+
+
+class TranslationClient:
+    """
+    Cliente de tradução de longa duração.
+    O motor (translation_backends) é criado/conectado uma vez no início do
+    culto e reutilizado para todas as legendas; por padrão é o Google, com
+    um único TranslationServiceAsyncClient (um canal gRPC).
+    Com `batch_window` > 0, os textos que chegam dentro da janela (ou até
+    `batch_size` textos / `batch_max_chars` caracteres) vão juntos numa só
+    chamada, e cada um recebe de volta a sua tradução.
+    """
+
+    def __init__(self, project_id, source_language="en", target_language="pt-BR", max_concurrent=4,
+                 cache=None, client=None, metrics=None, batch_window=0.0, batch_size=8,
+                 batch_max_chars=5000, backend=None):
+        self.source_language = source_language
+        self.target_language = target_language
+        # Motor de tradução; `client` é um cliente gRPC já pronto para o Google
+        # (ex: FakeTranslationClient no replay)
+        self.backend = backend or GoogleTranslationBackend(project_id, client)
+        self._started = False
+        # Cache opcional (TranslationCache); acertos não chamam a API
+        self.cache = cache
+        # Métricas opcionais (metrics.Metrics): etapa "traducao_rpc"
+        self.metrics = metrics
+        # Limita quantas traduções ficam em voo ao mesmo tempo
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Micro-lotes por idioma: [(texto, future)] e o timer que fecha a janela
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.batch_max_chars = batch_max_chars
+        self._batches = {}
+        self._batch_timers = {}
+
+        self.stats = {
+            'chamadas': 0,
+            'textos': 0,         # Textos enviados à API (vários por chamada com lotes)
+            'lotes': 0,          # Chamadas com mais de um texto
+            'erros': 0,
+            'latencia_total': 0.0,
+            'setup': 0.0,        # Criação do cliente + primeira chamada (canal frio)
+        }
+
+    async def start(self, warmup_text="Amen"):
+        """Conecta/carrega o motor e aquece o canal antes do culto começar."""
+        start = time.perf_counter()
+        self._started = True
+        await self.backend.start()
+        try:
+            await self._translate_raw([warmup_text])
+        except Exception as e:
+            print(f"[AVISO] Aquecimento da tradução falhou: {e}")
+        self.stats['setup'] = time.perf_counter() - start
+
+    async def close(self):
+        if self._started:
+            await self.backend.close()
+            self._started = False
+
+    async def _translate_raw(self, contents, target_language=None):
+        return await self.backend.translate(contents, self.source_language, target_language or self.target_language)
+
+    async def translate(self, text: str, target_language=None):
+        """
+        Traduz um texto (consultando o cache antes). Erros da API são propagados.
+        `target_language` permite usar o mesmo canal para vários idiomas.
+        """
+        target_language = target_language or self.target_language
+        if self.cache is not None:
+            cached = self.cache.get(text, self.source_language, target_language)
+            if cached is not None:
+                return cached
+
+        if not self._started:
+            await self.start()
+
+        if self.batch_window > 0:
+            translated = await self._enqueue(text, target_language)
+        else:
+            translations = await self._call([text], target_language)
+            translated = translations[0] if translations else None
+
+        # Traduções do motor reserva não ficam no cache (qualidade menor)
+        if translated and self.cache is not None and not getattr(translated, 'fallback', False):
+            self.cache.put(text, self.source_language, target_language, translated)
+        return translated
+
+    async def _call(self, contents, target_language):
+        """Uma chamada à API (limitada pelo semáforo), com estatísticas."""
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                return await self._translate_raw(contents, target_language)
+            except Exception:
+                self.stats['erros'] += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.stats['chamadas'] += 1
+                self.stats['textos'] += len(contents)
+                if len(contents) > 1:
+                    self.stats['lotes'] += 1
+                self.stats['latencia_total'] += elapsed
+                if self.metrics is not None:
+                    self.metrics.observe('traducao_rpc', elapsed, target_language)
+
+    def _enqueue(self, text, target_language):
+        """Coloca o texto no lote aberto do idioma; o future recebe a tradução."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._batches.setdefault(target_language, [])
+        batch.append((text, future))
+        if len(batch) >= self.batch_size or sum(len(t) for t, _ in batch) >= self.batch_max_chars:
+            self._flush(target_language)
+        elif len(batch) == 1:
+            self._batch_timers[target_language] = loop.call_later(
+                self.batch_window, self._flush, target_language
+            )
+        return future
+
+    def _flush(self, target_language):
+        timer = self._batch_timers.pop(target_language, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(target_language, None)
+        if batch:
+            asyncio.ensure_future(self._send_batch(batch, target_language))
+
+    async def _send_batch(self, batch, target_language):
+        try:
+            translations = await self._call([text for text, _ in batch], target_language)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # A API devolve as traduções na mesma ordem dos textos
+        for (_, future), translated in zip(batch, translations):
+            if not future.done():
+                future.set_result(translated)
+        for _, future in batch[len(translations):]:
+            if not future.done():
+                future.set_result(None)
+
+    def average_latency(self):
+        if not self.stats['chamadas']:
+            return 0.0
+        return self.stats['latencia_total'] / self.stats['chamadas']
+
+    def average_batch_size(self):
+        if not self.stats['chamadas']:
+            return 0.0
+        return self.stats['textos'] / self.stats['chamadas']
+
+    def saved_per_caption(self):
+        """
+        Estimativa da latência economizada por legenda: custo de criar o cliente
+        e abrir o canal (pago uma única vez) menos o custo de uma chamada quente.
+        """
+        return max(0.0, self.stats['setup'] - self.average_latency())
+
+    def cache_time_saved(self):
+        """Tempo total economizado pelo cache (acertos × latência média da API)."""
+        if self.cache is None:
+            return 0.0
+        return self.cache.stats['acertos'] * self.average_latency()
+
+
+if __name__ == '__main__':
+    # Compara chamadas/min e vazão com e sem micro-lotes, usando o serviço falso.
+    # Simula o modo contínuo: rajadas de 2-4 trechos (commits por pontuação
+    # e por limite de palavras) em poucas centenas de milissegundos.
+    import random
+    from fake_services import FakeTranslationClient
+
+    async def run(batch_window, bursts=30, workers=4):
+        rng = random.Random(0)
+        fake = FakeTranslationClient(delay=0.15)
+        client = TranslationClient("replay", max_concurrent=workers, client=fake, batch_window=batch_window)
+        latencies = []
+
+        async def caption(text):
+            start = time.perf_counter()
+            await client.translate(text)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tasks = []
+        for i in range(bursts):
+            for j in range(rng.randint(2, 4)):
+                tasks.append(asyncio.create_task(caption(f"Segment {i}.{j} of the sermon.")))
+                await asyncio.sleep(rng.uniform(0.02, 0.12))
+            await asyncio.sleep(rng.uniform(0.3, 1.0))
+        await asyncio.gather(*tasks)
+        minutes = (time.perf_counter() - start) / 60
+        latencies.sort()
+        print(f"janela {batch_window*1000:3.0f}ms: {len(tasks)} trechos, {client.stats['chamadas']} chamadas "
+              f"({client.stats['chamadas'] / minutes:.0f}/min, {client.average_batch_size():.2f} textos/chamada), "
+              f"{len(tasks) / minutes:.0f} trechos/min, latência p50 {latencies[len(latencies) // 2]*1000:.0f}ms "
+              f"máx {latencies[-1]*1000:.0f}ms")
+
+    for window in (0.0, 0.05, 0.1, 0.15):
+        asyncio.run(run(window))
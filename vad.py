@@ -0,0 +1,218 @@
+import time
+from collections import deque
+import numpy as np
+
+from audio_levels import LevelMeter
+
+# Durações de quadro aceitas pelo webrtcvad
+VALID_FRAME_MS = (10, 20, 30)
+
+
+class RmsVad:
+    """Limiar fixo de RMS (o comportamento original com SILENCE_THRESHOLD)."""
+
+    name = "rms"
+
+    def __init__(self, threshold, frame_samples):
+        self.threshold = threshold
+        self._meter = LevelMeter(frame_samples)
+
+    def is_speech(self, frame):
+        return self._meter.rms(frame) > self.threshold
+
+
+class WebRtcVad:
+    """Detector de voz do WebRTC (pacote webrtcvad). Só mono, 8/16/32/48 kHz."""
+
+    name = "webrtc"
+
+    def __init__(self, rate, aggressiveness=2):
+        import webrtcvad
+        if rate not in (8000, 16000, 32000, 48000):
+            raise ValueError(f"webrtcvad não suporta {rate} Hz")
+        self.rate = rate
+        self._vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame):
+        return self._vad.is_speech(frame, self.rate)
+
+
+class AdaptiveNoiseVad:
+    """
+    Acompanha o nível de ruído da sala (desce rápido, sobe devagar) e
+    considera fala o que estiver `margin_db` acima dele.
+    """
+
+    name = "adaptive"
+
+    def __init__(self, frame_samples, margin_db=9.0, initial_floor=0.005, min_level=0.002):
+        self._meter = LevelMeter(frame_samples)
+        self.margin = 10 ** (margin_db / 20.0)
+        self.noise_floor = initial_floor
+        self.min_level = min_level
+
+    def is_speech(self, frame):
+        level = self._meter.rms(frame)
+        speech = level > self.min_level and level > self.noise_floor * self.margin
+        if level < self.noise_floor:
+            self.noise_floor += (level - self.noise_floor) * 0.5
+        elif not speech:
+            self.noise_floor += (level - self.noise_floor) * 0.02
+        else:
+            # Fala longa também sobe o piso, bem devagar (ruído que aumentou)
+            self.noise_floor += (level - self.noise_floor) * 0.001
+        return speech
+
+
+def create_vad(mode, rate, frame_ms, threshold, aggressiveness=2):
+    """Cria o VAD configurado; cai para o limiar RMS se o webrtcvad não servir."""
+    frame_samples = rate * frame_ms // 1000
+    if mode == "webrtc":
+        try:
+            return WebRtcVad(rate, aggressiveness)
+        except (ImportError, ValueError) as e:
+            print(f"[AVISO] VAD webrtc indisponível ({e}); usando limiar RMS")
+            return RmsVad(threshold, frame_samples)
+    if mode == "adaptive":
+        return AdaptiveNoiseVad(frame_samples)
+    return RmsVad(threshold, frame_samples)
+
+
+class SpeechGate:
+    """
+    Decide quais chunks vão para o Google.
+    Divide cada chunk em quadros de 10/20/30 ms para o VAD, mantém o envio
+    por `hangover` segundos depois da fala (para o Google detectar a pausa)
+    e reenvia `preroll` segundos guardados antes da fala começar.
+    """
+
+    def __init__(self, vad, rate, channels, chunk, frame_ms=30,
+                 hangover=2.0, preroll=0.3, pause_time=0.3, clock=time.monotonic):
+        if frame_ms not in VALID_FRAME_MS:
+            raise ValueError(f"VAD_FRAME_MS deve ser 10, 20 ou 30 (recebido {frame_ms})")
+        self.vad = vad
+        self.channels = channels
+        self.frame_bytes = (rate * frame_ms // 1000) * 2
+        self._pending = bytearray()
+
+        chunk_seconds = chunk / rate
+        self.hangover_chunks = int(hangover / chunk_seconds)
+        self.pause_chunks = max(1, int(pause_time / chunk_seconds))
+        self.preroll = deque(maxlen=max(1, round(preroll / chunk_seconds)))
+        # Começa em silêncio (nada é enviado até a primeira fala)
+        self.silent_chunks = self.hangover_chunks
+        # Momentos (clock) do início da fala atual e do último chunk com voz
+        self.clock = clock
+        self.speech_started = None
+        self.last_speech = None
+
+        self.stats = {
+            'bytes_recebidos': 0,
+            'bytes_enviados': 0,
+            'quadros': 0,
+            'quadros_fala': 0,
+        }
+
+    def _has_speech(self, data):
+        if self.channels > 1:
+            # O VAD trabalha em mono: usa o primeiro canal
+            data = np.frombuffer(data, dtype=np.int16)[::self.channels].tobytes()
+        self._pending += data
+
+        speech = False
+        offset = 0
+        while len(self._pending) - offset >= self.frame_bytes:
+            frame = bytes(self._pending[offset:offset + self.frame_bytes])
+            offset += self.frame_bytes
+            self.stats['quadros'] += 1
+            # Avalia todos os quadros (o VAD adaptativo precisa ver o ruído)
+            if self.vad.is_speech(frame):
+                self.stats['quadros_fala'] += 1
+                speech = True
+        del self._pending[:offset]
+        return speech
+
+    def process(self, data):
+        """
+        Recebe um chunk e retorna (chunks_para_enviar, em_pausa).
+        """
+        self.stats['bytes_recebidos'] += len(data)
+
+        if self._has_speech(data):
+            now = self.clock()
+            if self.silent_chunks >= self.pause_chunks:
+                self.speech_started = now
+            self.last_speech = now
+            # Voltando do silêncio: manda antes o pre-roll guardado
+            out = list(self.preroll)
+            self.preroll.clear()
+            out.append(data)
+            self.silent_chunks = 0
+        else:
+            self.silent_chunks += 1
+            if self.silent_chunks < self.hangover_chunks:
+                out = [data]
+            else:
+                self.preroll.append(data)
+                out = []
+
+        for chunk in out:
+            self.stats['bytes_enviados'] += len(chunk)
+        return out, self.silent_chunks >= self.pause_chunks
+
+    def sent_fraction(self):
+        if not self.stats['bytes_recebidos']:
+            return 0.0
+        return self.stats['bytes_enviados'] / self.stats['bytes_recebidos']
+
+
+if __name__ == '__main__':
+    # Compara a fração de áudio enviada ao Google por cada VAD num culto gravado
+    # (sem WAV: pregação sintética do replay, com pausas maiores que o hangover
+    # e ruído de sala de -50 dBFS) com "sempre", que envia tudo
+    #   python vad.py [gravacao.wav] [--threshold 0.015] [--hangover 2.0]
+    import argparse
+    import tempfile
+    import wave
+
+    parser = argparse.ArgumentParser(description="Fração do áudio enviada por cada VAD")
+    parser.add_argument("wav", nargs="?", help="WAV PCM 16 bits (sem argumento: pregação sintética)")
+    parser.add_argument("--threshold", type=float, default=0.015, help="Limiar RMS do modo rms")
+    parser.add_argument("--hangover", type=float, default=2.0, help="Envio depois da fala (s)")
+    parser.add_argument("--pause", type=float, default=6.0, help="Pausa entre as frases sintéticas (s)")
+    parser.add_argument("--noise", type=float, default=0.003, help="RMS do ruído da sala sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.wav
+        if path is None:
+            from replay import write_synthetic_sermon
+            path, _ = write_synthetic_sermon(tmp, pause=args.pause, noise=args.noise)
+        with wave.open(path, "rb") as wav:
+            rate = wav.getframerate()
+            channels = wav.getnchannels()
+            audio = wav.readframes(wav.getnframes())
+    threshold = args.threshold
+
+    chunk = rate // 10
+    chunk_bytes = chunk * channels * 2
+    duration = len(audio) / (rate * channels * 2)
+    print(f"{path}: {duration/60:.1f} min, {rate} Hz, {channels} canal(is), hangover {args.hangover:.1f}s")
+    print(f"  {'sempre':>8}: 100.0% do áudio enviado")
+
+    sent = {}
+    for mode in ("rms", "webrtc", "adaptive"):
+        vad = create_vad(mode, rate, 30, threshold)
+        gate = SpeechGate(vad, rate, channels, chunk, hangover=args.hangover)
+        for i in range(0, len(audio) - chunk_bytes + 1, chunk_bytes):
+            gate.process(audio[i:i + chunk_bytes])
+        sent[mode] = gate.sent_fraction()
+        print(f"  {vad.name:>8}: {gate.sent_fraction()*100:5.1f}% do áudio enviado "
+              f"({gate.stats['quadros_fala']}/{gate.stats['quadros']} quadros com fala)")
+
+    if args.wav is None:
+        # Na pregação sintética a fala ocupa ~1/3 do tempo: um VAD que funciona
+        # envia bem menos que "sempre"
+        failed = [mode for mode, fraction in sent.items() if fraction > 0.75]
+        print(f"FALHA: {', '.join(failed)} enviam quase tudo" if failed else "Tudo certo.")
+        raise SystemExit(1 if failed else 0)